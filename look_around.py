@@ -96,6 +96,8 @@ def move_head_torso_eyes(duration, direction):
 def main():
     logger.info("Idle look-around script started.")
     setup_gpio()
+    # Idle settings changed in the web interface apply on the next cycle
+    config.start_watching(config.get('config_reload.interval_seconds', 1.0))
     direction = 'right'
     def handle_exit(signum, frame):
         logger.info(f"Received signal {signum}, cleaning up GPIO and exiting.")
@@ -105,10 +107,10 @@ def main():
     signal.signal(signal.SIGTERM, handle_exit)
     try:
         while True:
-            settings = config.get_idle_behavior_settings()
-            enabled = settings.get('enabled', False)
-            interval = settings.get('interval_seconds', 120)
-            duration = settings.get('duration_seconds', 5)
+            settings = config.snapshot.idle_behavior
+            enabled = settings.enabled
+            interval = settings.interval_seconds
+            duration = settings.duration_seconds
             if not enabled:
                 logger.info("Idle look-around is disabled. Sleeping 30s.")
                 time.sleep(30)
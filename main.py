@@ -14,9 +14,15 @@ from pathlib import Path
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
+# Started before the heavier imports so they show up in the boot breakdown
+from src.core.boot_timeline import BootTimeline
+boot = BootTimeline()
+
 from src.core.config_manager import config
 from src.core.event_handler import EventHandler
 from src.core.trigger_server import TriggerServer
+from src.core.logging_setup import setup_async_logging
+boot.mark('imports')
 
 # Global event handler instance for cleanup
 event_handler = None
@@ -24,25 +30,23 @@ event_handler = None
 def setup_logging():
     """Setup logging configuration"""
     log_config = config.get('logging', {})
-    log_level = log_config.get('level', 'INFO')
-    log_file = log_config.get('file', 'logs/ghosthost.log')
-    
-    # Create logs directory if it doesn't exist
-    log_path = Path(log_file)
-    log_path.parent.mkdir(exist_ok=True)
     
-    # Configure logging
-    logging.basicConfig(
-        level=getattr(logging, log_level),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(sys.stdout)
-        ]
+    # Log calls only enqueue; a background writer batches writes and rotates
+    # the file by logging.max_size / logging.backup_count
+    setup_async_logging(
+        log_config.get('file', 'logs/ghosthost.log'),
+        level=log_config.get('level', 'INFO'),
+        max_size=log_config.get('max_size', '10MB'),
+        backup_count=log_config.get('backup_count', 5)
     )
     
     logger = logging.getLogger(__name__)
     logger.info("Logging configured")
+    # The config was loaded at import time, before logging was set up
+    stats = config.load_stats
+    if stats:
+        logger.info(f"Config loaded from {stats['source']} in {stats['seconds'] * 1000:.1f}ms "
+                    f"({stats['loader']})")
     return logger
 
 def signal_handler(signum, frame):
@@ -63,6 +67,7 @@ def main():
     # Setup logging
     logger = setup_logging()
     logger.info("Starting Ghost Host application")
+    boot.mark('logging')
     
     # Register signal handlers for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
@@ -71,8 +76,10 @@ def main():
     try:
         # Initialize event handler (this sets up all hardware)
         logger.info("Initializing hardware systems...")
-        event_handler = EventHandler(config)
+        event_handler = EventHandler(config, boot)
+        boot.mark('hardware_init')
         # Start trigger server
+        trigger_server = None
         try:
             if config.get('network_trigger.enabled', True):
                 trigger_server = TriggerServer(event_handler, config)
@@ -81,6 +88,53 @@ def main():
         except Exception as e:
             logger.error(f"Failed to start Trigger Server: {e}")
         
+        # Start OSC/UDP trigger listener, sharing the trigger index
+        try:
+            if config.get('osc_trigger.enabled', False):
+                from src.core.osc_listener import OSCListener
+                if trigger_server:
+                    # Share the trigger index and rate limits with the HTTP listener
+                    osc_listener = OSCListener(event_handler, config, trigger_server.triggers,
+                                               trigger_server.admission)
+                    trigger_server.status_providers['osc'] = osc_listener.get_status
+                else:
+                    osc_listener = OSCListener(event_handler, config)
+                osc_listener.start()
+        except Exception as e:
+            logger.error(f"Failed to start OSC listener: {e}")
+        boot.mark('trigger_server')
+        
+        # Start timed performances from the configured schedules
+        try:
+            if config.get('scheduler.enabled', True):
+                from src.core.scheduler import Scheduler
+                scheduler = Scheduler(event_handler, config)
+                scheduler.start()
+                if trigger_server:
+                    trigger_server.scheduler = scheduler
+        except Exception as e:
+            logger.error(f"Failed to start Scheduler: {e}")
+        
+        # Join the fleet for synchronized multi-figure starts
+        try:
+            if config.get('fleet.enabled', False):
+                from src.core.fleet_sync import FleetSync
+                fleet = FleetSync(event_handler, config)
+                fleet.start()
+                if trigger_server:
+                    trigger_server.fleet = fleet
+                    trigger_server.status_providers['fleet'] = fleet.get_status
+        except Exception as e:
+            logger.error(f"Failed to start Fleet Sync: {e}")
+        
+        # Sensors are polling and the trigger server is up: ready for triggers.
+        # Caches the first trigger would otherwise fill are warmed in the background.
+        boot.ready()
+        event_handler.start_cache_warmup()
+        
+        # Pick up changes saved by the web interface without re-reading per trigger
+        config.start_watching(config.get('config_reload.interval_seconds', 1.0))
+        
         # Flash eyes to indicate system ready
         event_handler.led_controller.flash_eyes(3, 0.2)
         
@@ -3,4 +3,11 @@ Core modules for Ghost Host application
 ======================================
 """
 
-from .config_manager import config 
\ No newline at end of file
+
+def __getattr__(name):
+    # Loaded on first use so importing a core submodule does not read the
+    # config file as a side effect
+    if name == 'config':
+        from .config_manager import config
+        return config
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
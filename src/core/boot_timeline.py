@@ -0,0 +1,73 @@
+"""
+Boot Timeline for Ghost Host
+===========================
+Records how long each startup stage takes, from process start to the figure
+being ready for triggers, and logs the breakdown once per boot.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from src.core.metrics import metrics
+
+BOOT_STAGE_SECONDS = metrics.gauge('ghosthost_boot_stage_seconds', 'Duration of each startup stage', ['stage'])
+TIME_TO_READY = metrics.gauge('ghosthost_time_to_ready_seconds', 'Process start to ready for triggers')
+
+
+def process_age() -> float:
+    """Seconds since this process was started by the kernel (0 if unknown)"""
+    try:
+        with open('/proc/self/stat') as f:
+            # starttime is field 22; fields after the parenthesised comm start at 3
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class BootTimeline:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        # Anchor the timeline at process start so interpreter startup and
+        # module imports before this object existed are counted too
+        self.origin = time.monotonic() - process_age()
+        self.stages: List[Tuple[str, float]] = [('interpreter', time.monotonic() - self.origin)]
+        self._last = time.monotonic()
+        self.ready_at = None
+
+    def mark(self, stage: str):
+        """Close the current stage under the given name"""
+        now = time.monotonic()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block that may run alongside other stages"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.monotonic() - start))
+
+    def ready(self) -> float:
+        """Record time-to-ready, publish the metrics and log the breakdown"""
+        self.ready_at = time.monotonic()
+        total = self.ready_at - self.origin
+        TIME_TO_READY.set(total)
+        for stage, seconds in self.stages:
+            BOOT_STAGE_SECONDS.set(seconds, stage=stage)
+        breakdown = ', '.join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in self.stages)
+        self.logger.info(f"Ready for triggers {total:.2f}s after process start ({breakdown})")
+        return total
+
+    def to_dict(self) -> Dict[str, float]:
+        result = {stage: round(seconds, 4) for stage, seconds in self.stages}
+        if self.ready_at:
+            result['time_to_ready'] = round(self.ready_at - self.origin, 4)
+        return result
@@ -4,46 +4,313 @@ Configuration Manager for Ghost Host
 Handles loading, validating, and updating configuration settings.
 """
 
+import copy
 import yaml
 import os
+import fcntl
+import hashlib
 import logging
-from typing import Dict, Any
+import marshal
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional, Tuple
 from pathlib import Path
+from .config_snapshot import ConfigSnapshot
+
+# libyaml bindings are several times faster than the pure-Python parser
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, 'CDumper', yaml.Dumper)
+CACHE_FORMAT = 1
 
 class ConfigManager:
     def __init__(self, config_path: str = "config/default_config.yaml"):
         self.config_path = Path(config_path)
         self.config = {}
+        # Frozen, typed view for hot paths; replaced (never mutated) on change
+        self.snapshot = ConfigSnapshot()
+        # Bumped on every change; subscribers are called after the swap
+        self.version = 0
+        self._subscribers = []
+        self._file_signature = None
+        self._reload_lock = threading.Lock()
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+        # Keys set since the last save, replayed onto the on-disk copy so
+        # writers in different processes don't clobber each other
+        self._pending = OrderedDict()
+        self._write_lock = threading.RLock()
+        self._save_timer = None
+        self._batch_depth = 0
+        self._batch_dirty = False
+        self.cache_path = self.config_path.with_name(f'.{self.config_path.name}.cache')
+        # How the last load_config went: seconds, source ('cache', 'yaml' or 'defaults')
+        self.load_stats = {}
         self.logger = logging.getLogger(__name__)
         self.load_config()
     
     def load_config(self):
         """Load configuration from YAML file"""
+        started = time.perf_counter()
+        source = 'defaults'
         try:
             if self.config_path.exists():
-                with open(self.config_path, 'r') as file:
-                    self.config = yaml.safe_load(file)
-                self.logger.info(f"Configuration loaded from {self.config_path}")
+                self.config, signature, source = self._read_file()
+                self._file_signature = signature
             else:
                 self.logger.error(f"Configuration file not found: {self.config_path}")
                 self.config = self._get_default_config()
         except Exception as e:
             self.logger.error(f"Error loading configuration: {e}")
             self.config = self._get_default_config()
+        self.load_stats = {'seconds': time.perf_counter() - started, 'source': source,
+                           'loader': YAML_LOADER.__name__}
+        self.logger.info(f"Configuration loaded from {self.config_path} ({source}) "
+                         f"in {self.load_stats['seconds'] * 1000:.1f}ms")
+        self._changed()
+    
+    def _read_file(self) -> Tuple[Any, Optional[Tuple[int, int]], str]:
+        """Parse the config file, or reuse the cached parse if the file is unchanged.
+
+        Returns (data, signature, source) where source is 'cache' or 'yaml'.
+        """
+        signature = self._stat_signature()
+        raw = self.config_path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        
+        cached = self._read_cache()
+        if cached and cached.get('sha256') == digest and cached.get('signature') == signature:
+            return cached['data'], signature, 'cache'
+        
+        data = yaml.load(raw, Loader=YAML_LOADER)
+        self._write_cache(data, signature, digest)
+        return data, signature, 'yaml'
+    
+    def _read_cache(self) -> Optional[dict]:
+        try:
+            with open(self.cache_path, 'rb') as file:
+                cached = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(cached, dict) or cached.get('format') != CACHE_FORMAT:
+            return None
+        return cached
+    
+    def _write_cache(self, data: Any, signature: Optional[Tuple[int, int]], digest: str):
+        """Best-effort marshal sidecar; a missing or stale cache only costs a parse"""
+        if signature is None:
+            return
+        try:
+            payload = marshal.dumps({'format': CACHE_FORMAT, 'signature': signature,
+                                     'sha256': digest, 'data': data})
+            fd, tmp_path = tempfile.mkstemp(prefix=self.cache_path.name + '.', dir=self.cache_path.parent)
+            with os.fdopen(fd, 'wb') as file:
+                file.write(payload)
+            os.replace(tmp_path, self.cache_path)
+        except (OSError, ValueError) as e:
+            # ValueError: values marshal can't encode (e.g. YAML timestamps)
+            self.logger.debug(f"Config cache not written: {e}")
+            try:
+                os.unlink(tmp_path)
+            except (OSError, NameError):
+                pass
+    
+    def _publish_snapshot(self):
+        """Rebuild the typed snapshot and swap it in with a single assignment"""
+        self.snapshot = ConfigSnapshot.from_dict(self.config or {})
+    
+    def _changed(self):
+        """Publish a new snapshot, bump the version and notify subscribers"""
+        if self._batch_depth:
+            self._batch_dirty = True
+            return
+        self._publish_snapshot()
+        self.version += 1
+        for callback in list(self._subscribers):
+            try:
+                callback(self)
+            except Exception as e:
+                self.logger.error(f"Error in config change subscriber: {e}")
+    
+    def subscribe(self, callback: Callable[['ConfigManager'], None]):
+        """Call callback(config) after every change (reload or set)"""
+        self._subscribers.append(callback)
+    
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.config_path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def reload_if_changed(self) -> bool:
+        """Re-read the file only if its mtime or size changed; True if reloaded"""
+        with self._reload_lock:
+            signature = self._stat_signature()
+            if signature is None or signature == self._file_signature:
+                return False
+            try:
+                data, signature, _ = self._read_file()
+                if not isinstance(data, dict):
+                    raise ValueError("top level is not a mapping")
+            except Exception as e:
+                # Keep running on the last good config; retry on the next change
+                self.logger.error(f"Error reloading configuration, keeping previous: {e}")
+                self._file_signature = signature
+                return False
+            with self._write_lock:
+                # Unsaved local changes win over the file until they are written
+                for key_path, value in self._pending.items():
+                    self._apply(data, key_path, value)
+                self.config = data
+            self._file_signature = signature
+            self.logger.info(f"Configuration reloaded from {self.config_path}")
+        self._changed()
+        return True
+    
+    def start_watching(self, interval: float = 1.0):
+        """Poll the config file's mtime in the background and reload on change"""
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(target=self._watch, args=(interval,),
+                                              name='config-watch', daemon=True)
+        self._watch_thread.start()
+    
+    def stop_watching(self):
+        self._watch_stop.set()
+    
+    def _watch(self, interval: float):
+        while not self._watch_stop.wait(interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                self.logger.error(f"Error watching configuration: {e}")
+    
+    @contextmanager
+    def _file_lock(self):
+        """Advisory lock shared by every process that writes the config"""
+        lock_path = self.config_path.with_name(self.config_path.name + '.lock')
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _write_atomic(self, data: Dict[str, Any]) -> bytes:
+        """Write to a temp file, fsync, rename over the config and fsync the directory"""
+        directory = self.config_path.parent
+        raw = yaml.dump(data, Dumper=YAML_DUMPER, default_flow_style=False, indent=2).encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{self.config_path.name}.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(raw)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.config_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return raw
     
     def save_config(self):
-        """Save current configuration to file"""
+        """Save current configuration to file.
+
+        Under the file lock, re-reads the file, applies the keys set in this
+        process since the last save, and replaces the file atomically.
+        """
+        with self._write_lock:
+            self._cancel_scheduled_save()
+            try:
+                # Ensure directory exists
+                self.config_path.parent.mkdir(parents=True, exist_ok=True)
+                
+                with self._file_lock():
+                    data = self._read_for_merge()
+                    for key_path, value in self._pending.items():
+                        self._apply(data, key_path, value)
+                    raw = self._write_atomic(data)
+                    # Our own write is already in memory; don't reload it
+                    self._file_signature = self._stat_signature()
+                    self._write_cache(data, self._file_signature, hashlib.sha256(raw).hexdigest())
+                
+                self._pending.clear()
+                merged = data is not self.config
+                self.config = data
+                if merged:
+                    self._changed()
+                self.logger.info(f"Configuration saved to {self.config_path}")
+                return True
+            except Exception as e:
+                self.logger.error(f"Error saving configuration: {e}")
+                return False
+    
+    def _read_for_merge(self) -> Dict[str, Any]:
+        """Current on-disk config, or the in-memory copy if the file is unusable"""
+        if self._stat_signature() == self._file_signature or not self.config_path.exists():
+            return self.config
         try:
-            # Ensure directory exists
-            self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(self.config_path, 'w') as file:
-                yaml.dump(self.config, file, default_flow_style=False, indent=2)
-            self.logger.info(f"Configuration saved to {self.config_path}")
-            return True
+            data = self._read_file()[0]
+            if isinstance(data, dict):
+                return data
+            self.logger.warning(f"Ignoring unreadable {self.config_path} while saving")
         except Exception as e:
-            self.logger.error(f"Error saving configuration: {e}")
-            return False
+            self.logger.warning(f"Ignoring unreadable {self.config_path} while saving: {e}")
+        return self.config
+    
+    def schedule_save(self, delay: float = 0.5):
+        """Save after delay seconds; calls within the window share one write"""
+        with self._write_lock:
+            self._cancel_scheduled_save()
+            self._save_timer = threading.Timer(delay, self.save_config)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+    
+    def _cancel_scheduled_save(self):
+        if self._save_timer:
+            self._save_timer.cancel()
+            self._save_timer = None
+    
+    @contextmanager
+    def transaction(self):
+        """Group several set() calls into one notification and one disk write.
+
+        with config.transaction():
+            config.set('idle_behavior.enabled', True)
+            config.set('idle_behavior.interval_seconds', 60)
+
+        Nothing is written if nothing was set. If the block raises, its changes
+        are discarded and the exception propagates.
+        """
+        with self._write_lock:
+            outermost = self._batch_depth == 0
+            if outermost:
+                saved = (copy.deepcopy(self.config), OrderedDict(self._pending))
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if outermost:
+                    self.config, self._pending = saved
+                    self._batch_dirty = False
+                raise
+            finally:
+                self._batch_depth -= 1
+            if outermost and self._batch_dirty:
+                self._batch_dirty = False
+                self._changed()
+                self.save_config()
     
     def get(self, key_path: str, default=None):
         """Get configuration value using dot notation (e.g., 'audio.volume')"""
@@ -57,19 +324,26 @@ class ConfigManager:
         except (KeyError, TypeError):
             return default
     
-    def set(self, key_path: str, value: Any):
-        """Set configuration value using dot notation"""
+    @staticmethod
+    def _apply(data: Dict[str, Any], key_path: str, value: Any):
         keys = key_path.split('.')
-        config = self.config
         
         # Navigate to the parent of the final key
         for key in keys[:-1]:
-            if key not in config:
-                config[key] = {}
-            config = config[key]
+            if not isinstance(data.get(key), dict):
+                data[key] = {}
+            data = data[key]
         
         # Set the final value
-        config[keys[-1]] = value
+        data[keys[-1]] = value
+    
+    def set(self, key_path: str, value: Any):
+        """Set configuration value using dot notation"""
+        with self._write_lock:
+            self._apply(self.config, key_path, value)
+            self._pending[key_path] = value
+            self._pending.move_to_end(key_path)
+        self._changed()
     
     def update_from_dict(self, updates: Dict[str, Any]):
         """Update configuration from a dictionary"""
@@ -142,18 +416,89 @@ class ConfigManager:
                     'subnet': '192.168.4.0/24',
                     'timeout': 300
                 },
-                'fallback_ssid': ''
+                'backend': 'auto',
+                'connect_timeout': 45,
+                'dbus_address': '',
+                'failover': {
+                    'enabled': True,
+                    'check_interval': 5,
+                    'fallback_after': 10,
+                    'ap_after': 60,
+                    'failback_interval': 300,
+                    'failback_timeout': 20,
+                    'probe_failures': 3,
+                    'probe_port': 53,
+                    'probe_timeout': 1.0
+                },
+                'fallback_ssid': '',
+                'scan_history': 20,
+                'scan_min_interval': 10,
+                'scan_stale_seconds': 30,
+                'status_monitor': True,
+                'status_ttl': 10
             },
             'web': {
                 'host': '0.0.0.0',
                 'port': 8000,
-                'debug': False
+                'debug': False,
+                'workers': 8,
+                'backlog': 32,
+                'request_timeout': 30,
+                'max_event_streams': 8,
+                'max_upload_mb': 50
+            },
+            'config_reload': {
+                'interval_seconds': 1.0
+            },
+            'fleet': {
+                'enabled': False,
+                'port': 9100,
+                'leader': '',
+                'peers': [],
+                'unit_id': '',
+                'secret': '',
+                'lead_seconds': 1.0,
+                'max_lead_seconds': 10.0,
+                'sync_interval': 5.0
             },
             'network_trigger': {
+                'api_token': '',
                 'enabled': True,
-                'port': 5055
+                'port': 5055,
+                'rate_limit': {
+                    'enabled': True,
+                    'exempt_ips': ['127.0.0.1'],
+                    'per_ip': {'rate': 2.0, 'burst': 10},
+                    'per_trigger': {'rate': 1.0, 'burst': 5}
+                },
+                'request_timeout': 10
             },
             'network_triggers': [],
+            'osc_trigger': {
+                'enabled': False,
+                'host': '0.0.0.0',
+                'port': 9000,
+                'ack': True
+            },
+            'performance_queue': {
+                'enabled': False,
+                'depth': 5,
+                'ttl_seconds': 60,
+                'include_sensor_triggers': True
+            },
+            'scheduler': {
+                'enabled': True,
+                'max_late_seconds': 0.5,
+                'preload_seconds': 2.0
+            },
+            'schedules': [],
+            'startup': {
+                'parallel_init': True,
+                'warm_caches': True
+            },
+            'tracing': {
+                'capacity': 200
+            },
             'idle_behavior': {
                 'enabled': False,
                 'interval_seconds': 120,
@@ -0,0 +1,116 @@
+"""
+Config Snapshot for Ghost Host
+=============================
+Frozen, typed view of the settings read on hot paths (sensor edges, the
+mouth loop, trigger handling). Defaults and type coercion are applied once
+when the snapshot is built, so readers only touch plain attributes.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+def _section(data: Dict[str, Any], name: str) -> Dict[str, Any]:
+    value = data.get(name) if isinstance(data, dict) else None
+    return value if isinstance(value, dict) else {}
+
+
+def _coerce(section: Dict[str, Any], key: str, kind, default, minimum=None):
+    """Read section[key] as kind, falling back to default if missing or invalid"""
+    value = section.get(key, default)
+    if value is None:
+        return default
+    try:
+        value = kind(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid value for {key}: {value!r}, using {default!r}")
+        return default
+    if minimum is not None and value < minimum:
+        logger.warning(f"Value for {key} below {minimum}: {value!r}, using {default!r}")
+        return default
+    return value
+
+
+@dataclass(frozen=True)
+class AudioSettings:
+    default_file: str = 'HMGreeting.wav'
+    soundfiles_dir: str = 'SoundFiles'
+    volume: int = 80
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AudioSettings':
+        return cls(
+            default_file=_coerce(data, 'default_file', str, cls.default_file),
+            soundfiles_dir=_coerce(data, 'soundfiles_dir', str, cls.soundfiles_dir),
+            volume=_coerce(data, 'volume', int, cls.volume, minimum=0)
+        )
+
+
+@dataclass(frozen=True)
+class SensorSettings:
+    debounce_time: float = 0.2
+    cooldown_period: float = 30.0
+    poll_interval: float = 0.02
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SensorSettings':
+        return cls(
+            debounce_time=_coerce(data, 'debounce_time', float, cls.debounce_time, minimum=0),
+            cooldown_period=_coerce(data, 'cooldown_period', float, cls.cooldown_period, minimum=0),
+            poll_interval=_coerce(data, 'poll_interval', float, cls.poll_interval, minimum=0.001)
+        )
+
+
+@dataclass(frozen=True)
+class MotorSettings:
+    head_torso_duration: float = 0.0
+    mouth_open_duration: float = 0.1
+    mouth_close_delay: float = 0.05
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MotorSettings':
+        return cls(
+            head_torso_duration=_coerce(data, 'head_torso_duration', float, cls.head_torso_duration, minimum=0),
+            mouth_open_duration=_coerce(data, 'mouth_open_duration', float, cls.mouth_open_duration, minimum=0),
+            mouth_close_delay=_coerce(data, 'mouth_close_delay', float, cls.mouth_close_delay, minimum=0)
+        )
+
+
+@dataclass(frozen=True)
+class IdleBehaviorSettings:
+    enabled: bool = False
+    interval_seconds: float = 120.0
+    duration_seconds: float = 5.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'IdleBehaviorSettings':
+        return cls(
+            enabled=bool(data.get('enabled', cls.enabled)),
+            interval_seconds=_coerce(data, 'interval_seconds', float, cls.interval_seconds, minimum=0),
+            duration_seconds=_coerce(data, 'duration_seconds', float, cls.duration_seconds, minimum=0)
+        )
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    audio: AudioSettings = field(default_factory=AudioSettings)
+    sensors: SensorSettings = field(default_factory=SensorSettings)
+    motors: MotorSettings = field(default_factory=MotorSettings)
+    idle_behavior: IdleBehaviorSettings = field(default_factory=IdleBehaviorSettings)
+    gpio: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ConfigSnapshot':
+        """Build a validated snapshot from the raw config dict"""
+        gpio = _section(_section(data, 'hardware'), 'gpio')
+        return cls(
+            audio=AudioSettings.from_dict(_section(data, 'audio')),
+            sensors=SensorSettings.from_dict(_section(data, 'sensors')),
+            motors=MotorSettings.from_dict(_section(data, 'motors')),
+            idle_behavior=IdleBehaviorSettings.from_dict(_section(data, 'idle_behavior')),
+            gpio=MappingProxyType({k: _coerce(gpio, k, int, None) for k in gpio})
+        )
@@ -0,0 +1,206 @@
+"""
+Event Bus for Ghost Host
+=======================
+In-process publish/subscribe for state changes that viewers care about
+(performance, config, library, network). Each change is computed once by
+its publisher and fanned out to every subscriber, and the last event per
+topic is kept so a new subscriber starts from the current state.
+
+Subscribers are streamed as Server-Sent Events (`sse_stream`). The web
+interface runs in its own process, so `EventRelay` follows the main
+process's /api/events stream and republishes it on the local bus.
+"""
+
+import http.client
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from src.core.metrics import metrics
+
+PUBLISHED = metrics.counter('ghosthost_events_published_total', 'Events published on the event bus', ['topic'])
+RESYNCS = metrics.counter('ghosthost_event_resyncs_total', 'Slow subscribers reset to the latest state')
+
+
+class Event(NamedTuple):
+    id: int
+    topic: str
+    data: dict
+    time: float  # time.time() it was published
+
+
+class Subscription:
+    def __init__(self, bus: 'EventBus', topics: Optional[Iterable[str]], queue_size: int):
+        self.bus = bus
+        self.topics = frozenset(topics) if topics else None
+        self.queue_size = queue_size
+        self._queue = deque()
+        self._ready = threading.Condition()
+        self.closed = False
+
+    def wants(self, topic: str) -> bool:
+        return self.topics is None or topic in self.topics
+
+    def _push(self, events, replace: bool = False):
+        with self._ready:
+            if replace:
+                self._queue.clear()
+            self._queue.extend(e for e in events if self.wants(e.topic))
+            self._ready.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event, or None after timeout (or once closed)"""
+        with self._ready:
+            if not self._queue and not self.closed:
+                self._ready.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, history: int = 100, queue_size: int = 100):
+        self.logger = logging.getLogger(__name__)
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)
+        self._latest = OrderedDict()
+        self._subscribers = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+        metrics.gauge('ghosthost_event_subscribers', 'Open event stream subscribers',
+                      callback=lambda: len(self._subscribers))
+
+    def publish(self, topic: str, data: dict, changed_only: bool = False) -> Optional[Event]:
+        """Publish data on topic; with changed_only, skip it if equal to the last one"""
+        with self._lock:
+            last = self._latest.get(topic)
+            if changed_only and last is not None and last.data == data:
+                return None
+            event = Event(self._next_id, topic, data, time.time())
+            self._next_id += 1
+            self._history.append(event)
+            self._latest[topic] = event
+            self._latest.move_to_end(topic)
+            subscribers = list(self._subscribers)
+            latest = list(self._latest.values())
+        PUBLISHED.inc(topic=topic)
+        for subscriber in subscribers:
+            if len(subscriber._queue) >= subscriber.queue_size:
+                # Too far behind to replay; jump straight to the current state
+                RESYNCS.inc()
+                subscriber._push(latest, replace=True)
+            else:
+                subscriber._push((event,))
+        return event
+
+    def latest(self, topic: str) -> Optional[Event]:
+        return self._latest.get(topic)
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, last_event_id: Optional[int] = None) -> Subscription:
+        """Subscribe, starting with missed events after last_event_id if still in
+        history, otherwise with the latest event of every topic"""
+        subscription = Subscription(self, topics, self.queue_size)
+        with self._lock:
+            history = list(self._history)
+            if last_event_id is not None and history and history[0].id <= last_event_id + 1:
+                backlog = [e for e in history if e.id > last_event_id]
+            else:
+                backlog = sorted(self._latest.values(), key=lambda e: e.id)
+            subscription._push(backlog)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def format_sse(event: Event) -> bytes:
+    return f"id: {event.id}\nevent: {event.topic}\ndata: {json.dumps(event.data)}\n\n".encode('utf-8')
+
+
+def sse_stream(subscription: Subscription, keepalive: float = 15.0) -> Iterator[bytes]:
+    """Yield an SSE byte stream for subscription until the consumer stops reading"""
+    try:
+        yield b'retry: 3000\n\n'
+        while not subscription.closed:
+            event = subscription.get(keepalive)
+            # A comment line keeps proxies and idle timeouts from closing the stream
+            yield format_sse(event) if event else b': keepalive\n\n'
+    finally:
+        subscription.close()
+
+
+class EventRelay:
+    """Follows another process's /api/events stream and republishes it locally"""
+
+    def __init__(self, bus: EventBus, host: str, port: int, topics: Iterable[str] = ()):
+        self.bus = bus
+        self.host = host
+        self.port = port
+        self.topics = frozenset(topics)
+        self.logger = logging.getLogger(__name__)
+        self.thread = None
+        self._running = False
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self._running = True
+        self.thread = threading.Thread(target=self._run, name='event-relay', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        backoff = 1.0
+        while self._running:
+            try:
+                self._follow()
+                backoff = 1.0
+            except (OSError, http.client.HTTPException) as e:
+                self.logger.debug(f"Event relay from {self.host}:{self.port} lost: {e}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _follow(self):
+        # Keepalives arrive every 15s, so a longer silence means the stream is dead
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=45)
+        try:
+            conn.request('GET', '/api/events', headers={'Accept': 'text/event-stream'})
+            response = conn.getresponse()
+            if response.status != 200:
+                raise http.client.HTTPException(f"status {response.status}")
+            topic, data = None, []
+            while self._running:
+                line = response.readline()
+                if not line:
+                    return
+                line = line.decode('utf-8').rstrip('\r\n')
+                if line.startswith('event:'):
+                    topic = line[6:].strip()
+                elif line.startswith('data:'):
+                    data.append(line[5:].strip())
+                elif not line:
+                    if topic and data and (not self.topics or topic in self.topics):
+                        self.bus.publish(topic, json.loads('\n'.join(data)), changed_only=True)
+                    topic, data = None, []
+        finally:
+            conn.close()
+
+
+# Process-wide bus
+bus = EventBus()
@@ -5,158 +5,377 @@ Coordinates sensor events with motor, audio, and LED responses.
 """
 
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from src.hardware import SensorManager, SensorType, MotorController, AudioController, LEDController
+from src.core.performance_state import PerformanceStateMachine, PerformanceState
+from src.core.trigger_queue import TriggerQueue
+from src.core.performance_trace import TraceRecorder, TRIGGER_TO_AUDIO, TRIGGER_TO_MOUTH
+from src.core.metrics import metrics
+from src.core.event_bus import bus
+
+TRIGGERS = metrics.counter('ghosthost_triggers_total', 'Triggers received by source and outcome',
+                           ['source', 'outcome'])
+COOLDOWN_REJECTIONS = metrics.counter('ghosthost_cooldown_rejections_total',
+                                      'Triggers refused because of cooldown', ['source'])
+PERFORMANCES_STARTED = metrics.counter('ghosthost_performances_started_total', 'Performances started')
+PERFORMANCES_COMPLETED = metrics.counter('ghosthost_performances_completed_total', 'Performances completed')
+AUDIO_START_LATENCY = metrics.histogram('ghosthost_audio_start_latency_seconds',
+                                        'Trigger to aplay spawn latency')
+MOUTH_START_LATENCY = metrics.histogram('ghosthost_first_mouth_open_latency_seconds',
+                                        'Trigger to first mouth open latency')
 
 class EventHandler:
-    def __init__(self, config):
+    def __init__(self, config, boot=None):
         self.config = config
         self.logger = logging.getLogger(__name__)
         
-        # State tracking
-        self.performance_active = False
+        # Performance lifecycle shared by sensor, network and test triggers
+        self.state = PerformanceStateMachine()
+        
+        # Latency traces for recent performances
+        self.traces = TraceRecorder(int(config.get('tracing.capacity', 200)))
+        metrics.gauge('ghosthost_performance_state', 'Current performance state (1 = active state)',
+                      ['state'], callback=self._state_metric)
+        
+        # Viewers follow performance start, end and cooldown on the event bus
+        self.state.add_listener(self._publish_state)
+        self._publish_state(None, self.state.snapshot)
         
-        # Initialize hardware controllers
-        self.motor_controller = MotorController(config)
-        self.audio_controller = AudioController(config)
-        self.led_controller = LEDController(config)
+        # Optional admission queue for triggers that arrive while busy
+        queue_settings = config.get('performance_queue', {}) or {}
+        self.trigger_queue = None
+        self.queue_sensor_triggers = False
+        if queue_settings.get('enabled', False):
+            self.trigger_queue = TriggerQueue(
+                int(queue_settings.get('depth', 5)),
+                float(queue_settings.get('ttl_seconds', 60))
+            )
+            self.queue_sensor_triggers = queue_settings.get('include_sensor_triggers', True)
+            self.state.add_listener(self._on_state_change)
         
-        # Initialize sensor manager with this event handler as callback
-        self.sensor_manager = SensorManager(config, self.handle_event)
+        # Initialize hardware controllers; they touch independent pins, so
+        # they can be set up concurrently to shorten boot
+        controllers = {
+            'motor_controller': lambda: MotorController(config),
+            'audio_controller': lambda: AudioController(config),
+            'led_controller': lambda: LEDController(config),
+            # Sensor manager reports back to this event handler
+            'sensor_manager': lambda: SensorManager(config, self.handle_event)
+        }
+        if config.get('startup.parallel_init', True):
+            with ThreadPoolExecutor(max_workers=len(controllers), thread_name_prefix='hw-init') as pool:
+                futures = {name: pool.submit(self._init_controller, name, factory, boot)
+                           for name, factory in controllers.items()}
+                for name, future in futures.items():
+                    setattr(self, name, future.result())
+        else:
+            for name, factory in controllers.items():
+                setattr(self, name, self._init_controller(name, factory, boot))
+        
+        # Only poll once every controller a trigger needs exists
         self.sensor_manager.start_polling()
         
         self.logger.info("Event Handler initialized")
     
-    def handle_event(self, event_type: str, data):
+    @staticmethod
+    def _init_controller(name: str, factory, boot=None):
+        """Construct one controller, timing it on the boot timeline"""
+        if boot is None:
+            return factory()
+        with boot.stage(name):
+            return factory()
+    
+    def start_cache_warmup(self) -> Optional[threading.Thread]:
+        """Warm audio and timestamp caches in the background once ready"""
+        if not self.config.get('startup.warm_caches', True):
+            return None
+        thread = threading.Thread(target=self._warm_caches, name='cache-warmup', daemon=True)
+        thread.start()
+        return thread
+    
+    def _warm_caches(self):
+        """Read clip durations and mouth timestamps ahead of the first trigger"""
+        started = time.monotonic()
+        try:
+            files = self.audio_controller.list_audio_files()
+            self.audio_controller.warm_cache()
+            timestamps = self.motor_controller.warm_cache(files)
+            self.logger.info(f"Warmed caches for {len(files)} clip(s), {timestamps} timestamp file(s) "
+                             f"in {(time.monotonic() - started) * 1000:.0f}ms")
+        except Exception as e:
+            self.logger.error(f"Error warming caches: {e}")
+    
+    @property
+    def performance_active(self) -> bool:
+        """True while a performance is starting, running or stopping"""
+        return self.state.snapshot.active
+    
+    def handle_event(self, event_type: str, data, timestamp: Optional[float] = None):
         """Main event handler called by sensor manager"""
         if event_type == 'sensor_triggered':
-            self._handle_sensor_trigger(data)
+            self._handle_sensor_trigger(data, timestamp)
         elif event_type == 'ap_mode_requested':
             self._handle_ap_mode_request()
         else:
             self.logger.warning(f"Unknown event type: {event_type}")
     
-    def _handle_sensor_trigger(self, sensor_type: SensorType):
+    def _handle_sensor_trigger(self, sensor_type: SensorType, edge_time: Optional[float] = None):
         """Handle sensor trigger event"""
-        if self.performance_active:
-            self.logger.info(f"Performance already active, ignoring {sensor_type}")
-            return
-        
-        if self.sensor_manager.is_in_cooldown():
-            self.logger.info(f"In cooldown period, ignoring {sensor_type}")
+        received_at = time.monotonic()
+        audio_file = self.config.snapshot.audio.default_file
+        admitted, snapshot = self.state.try_begin(sensor_type.value, audio_file)
+        if not admitted:
+            if self.trigger_queue is not None and self.queue_sensor_triggers:
+                result = self._enqueue_trigger(audio_file, sensor_type.value, snapshot)
+                self.logger.info(f"{snapshot.busy_reason()}, {sensor_type}: {result['message']}")
+            else:
+                self._count_rejection(sensor_type.value, snapshot)
+                self.logger.info(f"{snapshot.busy_reason()}, ignoring {sensor_type}")
             return
         
         self.logger.info(f"Starting performance for sensor: {sensor_type}")
-        self._start_performance(sensor_type)
+        trace = self.traces.start(snapshot.performance_id, sensor_type.value, audio_file, edge_time or received_at)
+        trace.mark('sensor_triggered', received_at)
+        result = self._start_performance(snapshot.performance_id, audio_file, sensor_type.value, trace)
+        TRIGGERS.inc(source=sensor_type.value, outcome='started' if result['success'] else 'failed')
     
-    def trigger_network_performance(self, audio_file: Optional[str] = None) -> dict:
+    def trigger_network_performance(self, audio_file: Optional[str] = None,
+                                    trigger_time: Optional[float] = None) -> dict:
         """Start a performance initiated by a network trigger.
 
-        Returns a dict with keys: success (bool), message (str).
+        Returns a dict with keys: success (bool), message (str). When the
+        admission queue is enabled and the figure is busy, the trigger is queued
+        and the dict also carries queued, position and estimated_start.
+        trigger_time is the time.monotonic() the request arrived, for tracing.
         """
-        # Prevent overlap with existing performance or cooldown
-        if self.performance_active:
-            return { 'success': False, 'message': 'Performance already active' }
-        if self.sensor_manager.is_in_cooldown():
-            return { 'success': False, 'message': 'In cooldown period' }
-
         # Determine audio file
-        selected_audio = audio_file or self.config.get('audio.default_file', 'HMGreeting.wav')
+        selected_audio = audio_file or self.config.snapshot.audio.default_file
 
-        self.performance_active = True
-        try:
-            # Get audio duration
-            audio_duration = self.audio_controller.get_audio_duration(selected_audio)
-            if not audio_duration:
-                self.logger.error(f"Could not get duration for audio file: {selected_audio}")
-                self.performance_active = False
-                return { 'success': False, 'message': 'Invalid audio file' }
-
-            # Turn on eyes immediately for duration
-            self.led_controller.eyes_on_during_audio(audio_duration)
-
-            # Start audio playback with completion callback
-            audio_started = self.audio_controller.play_audio_file(
-                selected_audio,
-                self._performance_complete
-            )
-
-            if not audio_started:
-                self.logger.error("Failed to start audio playback")
-                self.led_controller.turn_off_eyes()
-                self.performance_active = False
-                return { 'success': False, 'message': 'Failed to start audio playback' }
+        # Prevent overlap with existing performance or cooldown
+        admitted, snapshot = self.state.try_begin('network', selected_audio)
+        if not admitted:
+            if self.trigger_queue is not None:
+                return self._enqueue_trigger(selected_audio, 'network', snapshot)
+            self._count_rejection('network', snapshot)
+            return { 'success': False, 'message': snapshot.busy_reason() }
 
-            # Start synchronized motor movements (sensor type labeled as 'network')
-            self.motor_controller.start_synchronized_movement(
-                audio_duration,
-                selected_audio,
-                'network'
-            )
+        trace = self.traces.start(snapshot.performance_id, 'network', selected_audio, trigger_time)
+        result = self._start_performance(snapshot.performance_id, selected_audio, 'network', trace)
+        TRIGGERS.inc(source='network', outcome='started' if result['success'] else 'failed')
+        return result
 
-            self.logger.info(f"Network-triggered performance started - Duration: {audio_duration:.1f}s")
-            return { 'success': True, 'message': 'Performance started' }
+    def prepare_performance(self, audio_file: str) -> Optional[dict]:
+        """Load the clip and its choreography ahead of a timed start.
 
-        except Exception as e:
-            self.logger.error(f"Error starting network-triggered performance: {e}")
-            self.performance_active = False
-            self._cleanup_performance()
-            return { 'success': False, 'message': 'Unexpected error starting performance' }
+        Returns {'audio_file', 'duration'} or None if the clip is unusable.
+        """
+        duration = self.audio_controller.get_audio_duration(audio_file)
+        if not duration:
+            return None
+        self.audio_controller.preload(audio_file)
+        self.motor_controller.warm_cache([audio_file])
+        return {'audio_file': audio_file, 'duration': duration}
+    
+    def start_prepared(self, audio_file: str, source: str, deadline: float) -> dict:
+        """Start a prepared performance now; deadline is the monotonic time it was due.
 
-    def _start_performance(self, sensor_type: SensorType):
-        """Start the main animatronic performance"""
-        self.performance_active = True
+        Returns a dict with keys: success (bool), message (str) and, when
+        admitted, performance_id so the caller can look up its trace.
+        """
+        admitted, snapshot = self.state.try_begin(source, audio_file)
+        if not admitted:
+            self._count_rejection(source, snapshot)
+            return { 'success': False, 'message': snapshot.busy_reason() }
         
+        # The trace starts at the deadline, so its stages read as start error
+        trace = self.traces.start(snapshot.performance_id, source, audio_file, deadline)
+        result = self._start_performance(snapshot.performance_id, audio_file, source, trace)
+        TRIGGERS.inc(source=source, outcome='started' if result['success'] else 'failed')
+        result['performance_id'] = snapshot.performance_id
+        return result
+    
+    def _start_performance(self, performance_id: int, audio_file: str, trigger_source: str, trace) -> dict:
+        """Start the main animatronic performance once the state machine admitted it.
+
+        Returns a dict with keys: success (bool), message (str).
+        """
+        trace.mark('admitted')
         try:
-            # Get audio file to play
-            audio_file = self.config.get('audio.default_file', 'HMGreeting.wav')
-            
             # Get audio duration
             audio_duration = self.audio_controller.get_audio_duration(audio_file)
+            trace.mark('audio_duration')
             if not audio_duration:
                 self.logger.error(f"Could not get duration for audio file: {audio_file}")
-                return
+                self.state.abort_start(performance_id)
+                return { 'success': False, 'message': 'Invalid audio file' }
             
-            # Turn on eyes immediately
+            # Turn on eyes immediately for duration
             self.led_controller.eyes_on_during_audio(audio_duration)
+            trace.mark('eyes_on')
             
-            # Start audio playback with completion callback
+            # Start audio playback with completion callback bound to this performance
             audio_started = self.audio_controller.play_audio_file(
-                audio_file, 
-                self._performance_complete
+                audio_file,
+                lambda: self._performance_complete(performance_id, trace),
+                trace
             )
             
             if not audio_started:
                 self.logger.error("Failed to start audio playback")
                 self.led_controller.turn_off_eyes()
-                self.performance_active = False
-                return
+                self.state.abort_start(performance_id)
+                return { 'success': False, 'message': 'Failed to start audio playback' }
+            
+            self.state.mark_performing(performance_id, audio_duration)
             
             # Start synchronized motor movements
             self.motor_controller.start_synchronized_movement(
-                audio_duration, 
-                audio_file, 
-                sensor_type.value
+                audio_duration,
+                audio_file,
+                trigger_source,
+                trace
             )
+            trace.mark('motion_started')
             
-            self.logger.info(f"Performance started - Duration: {audio_duration:.1f}s")
+            PERFORMANCES_STARTED.inc()
+            self.logger.info(f"Performance started ({trigger_source}) - Duration: {audio_duration:.1f}s")
+            return { 'success': True, 'message': 'Performance started' }
             
         except Exception as e:
             self.logger.error(f"Error starting performance: {e}")
-            self.performance_active = False
-            self._cleanup_performance()
+            if self.state.begin_stop(performance_id):
+                self._cleanup_performance()
+                self.state.finish_stop(performance_id)
+            return { 'success': False, 'message': 'Unexpected error starting performance' }
     
-    def _performance_complete(self):
+    def _performance_complete(self, performance_id: int, trace=None):
         """Called when audio playback completes"""
+        if not self.state.begin_stop(performance_id):
+            # Performance was already stopped (or superseded); nothing to do
+            return
+        PERFORMANCES_COMPLETED.inc()
+        if trace:
+            trace.mark('complete')
+            self._observe_latency(trace)
         self.logger.info("Performance completed")
-        self.performance_active = False
-        
-        # Start cooldown period
-        self.sensor_manager.start_cooldown()
         
         # Ensure everything is stopped
         self._cleanup_performance()
+        
+        # Start cooldown period
+        cooldown = self.config.snapshot.sensors.cooldown_period
+        self.state.finish_stop(performance_id, cooldown)
+        self.logger.info(f"Cooldown started for {cooldown} seconds")
+    
+    def _count_rejection(self, source: str, snapshot):
+        """Record a trigger refused by the state machine"""
+        if snapshot.state is PerformanceState.COOLDOWN:
+            COOLDOWN_REJECTIONS.inc(source=source)
+            TRIGGERS.inc(source=source, outcome='rejected_cooldown')
+        else:
+            TRIGGERS.inc(source=source, outcome='rejected_busy')
+    
+    def _observe_latency(self, trace):
+        """Feed a finished trace into the latency histograms"""
+        to_audio = trace.elapsed(*TRIGGER_TO_AUDIO)
+        if to_audio is not None:
+            AUDIO_START_LATENCY.observe(to_audio)
+        to_mouth = trace.elapsed(*TRIGGER_TO_MOUTH)
+        if to_mouth is not None:
+            MOUTH_START_LATENCY.observe(to_mouth)
+    
+    def _state_metric(self) -> list:
+        """Samples for the performance state gauge"""
+        current = self.state.snapshot.state
+        return [({'state': s.value}, 1 if s is current else 0) for s in PerformanceState]
+    
+    def _enqueue_trigger(self, audio_file: str, source: str, snapshot) -> dict:
+        """Queue a trigger refused by the state machine"""
+        duration = self.audio_controller.get_audio_duration(audio_file)
+        if not duration:
+            TRIGGERS.inc(source=source, outcome='failed')
+            return { 'success': False, 'message': 'Invalid audio file' }
+        
+        entry, position, coalesced = self.trigger_queue.offer(audio_file, source, duration)
+        if not entry:
+            self._count_rejection(source, snapshot)
+            return { 'success': False, 'message': snapshot.busy_reason(), 'queue_full': True }
+        TRIGGERS.inc(source=source, outcome='coalesced' if coalesced else 'queued')
+        
+        start_in = self._estimate_start_delay(position)
+        
+        # The figure may have gone idle while the trigger was being queued
+        if self.state.snapshot.state is PerformanceState.IDLE:
+            self._dispatch_queued()
+        
+        return {
+            'success': True,
+            'queued': True,
+            'coalesced': coalesced,
+            'message': 'Queued' if not coalesced else 'Coalesced with queued trigger',
+            'position': position,
+            'estimated_start': time.time() + start_in,
+            'estimated_start_in': round(start_in, 3)
+        }
+    
+    def _estimate_start_delay(self, position: int) -> float:
+        """Seconds until the queue entry at position is expected to start"""
+        snapshot = self.state.snapshot
+        now = time.monotonic()
+        cooldown = self.config.snapshot.sensors.cooldown_period
+        
+        if snapshot.state is PerformanceState.COOLDOWN and snapshot.cooldown_until:
+            delay = max(0.0, snapshot.cooldown_until - now)
+        elif snapshot.state is PerformanceState.PERFORMING and snapshot.expected_end:
+            delay = max(0.0, snapshot.expected_end - now) + cooldown
+        elif snapshot.active:
+            # Starting: the whole clip is still ahead
+            clip = snapshot.audio_file or self.config.snapshot.audio.default_file
+            delay = (self.audio_controller.get_audio_duration(clip) or 0.0) + cooldown
+        else:
+            delay = 0.0
+        
+        for entry in self.trigger_queue.ahead_of(position):
+            delay += entry.duration + cooldown
+        return delay
+    
+    def _publish_state(self, old, new):
+        """Publish a performance state change for /api/events viewers"""
+        now = time.monotonic()
+        bus.publish('performance', {
+            'state': new.state.value,
+            'performance_id': new.performance_id,
+            'source': new.source,
+            'audio_file': new.audio_file,
+            'remaining_seconds': round(max(0.0, new.expected_end - now), 1) if new.expected_end else None,
+            'cooldown_seconds': round(max(0.0, new.cooldown_until - now), 1) if new.cooldown_until else None
+        })
+    
+    def _on_state_change(self, old, new):
+        """Dispatch the next queued trigger as soon as the figure is idle"""
+        if new.state is PerformanceState.IDLE and len(self.trigger_queue):
+            self._dispatch_queued()
+    
+    def _dispatch_queued(self):
+        """Start the next queued performance if the figure can be claimed"""
+        entry = self.trigger_queue.pop_next()
+        if not entry:
+            return
+        
+        admitted, snapshot = self.state.try_begin(entry.source, entry.audio_file)
+        if not admitted:
+            self.trigger_queue.push_front(entry)
+            return
+        
+        waited = time.monotonic() - entry.enqueued_at
+        self.logger.info(f"Dispatching queued performance {entry.audio_file} after {waited:.1f}s "
+                         f"({len(entry.sources)} trigger(s) coalesced)")
+        trace = self.traces.start(snapshot.performance_id, entry.source, entry.audio_file, entry.enqueued_at)
+        trace.mark('dequeued')
+        self._start_performance(snapshot.performance_id, entry.audio_file, entry.source, trace)
     
     def _cleanup_performance(self):
         """Clean up after performance"""
@@ -174,9 +393,10 @@ class EventHandler:
         """Handle request to enter AP mode"""
         self.logger.info("AP mode requested via button hold")
         
-        # Stop any active performance
-        if self.performance_active:
-            self.stop_performance()
+        # Drop queued triggers and stop any active performance
+        if self.trigger_queue is not None:
+            self.trigger_queue.clear()
+        self.stop_performance()
         
         # Signal eyes that we're entering AP mode
         self.led_controller.blink_eyes(5.0, 0.3)
@@ -187,50 +407,58 @@ class EventHandler:
     
     def stop_performance(self):
         """Force stop current performance"""
-        if self.performance_active:
+        snapshot = self.state.begin_stop()
+        if snapshot:
             self.logger.info("Force stopping performance")
             
-            self.performance_active = False
             self.audio_controller.stop_audio()
             self._cleanup_performance()
+            self.state.finish_stop(snapshot.performance_id)
     
     def force_end_cooldown(self):
         """Force end the current cooldown period"""
-        self.sensor_manager.force_end_cooldown()
+        self.state.end_cooldown()
         self.logger.info("Cooldown period force ended")
     
     def trigger_test_performance(self):
         """Trigger a test performance manually"""
-        if self.performance_active:
-            self.logger.warning("Performance already active, cannot start test")
-            return False
-        
-        if self.sensor_manager.is_in_cooldown():
-            self.logger.warning("In cooldown period, cannot start test")
+        audio_file = self.config.snapshot.audio.default_file
+        admitted, snapshot = self.state.try_begin('test', audio_file)
+        if not admitted:
+            self._count_rejection('test', snapshot)
+            self.logger.warning(f"{snapshot.busy_reason()}, cannot start test")
             return False
         
         self.logger.info("Starting test performance")
-        self._start_performance(SensorType.BUTTON)  # Use button type for test
-        return True
+        trace = self.traces.start(snapshot.performance_id, 'test', audio_file)
+        result = self._start_performance(snapshot.performance_id, audio_file, 'test', trace)
+        TRIGGERS.inc(source='test', outcome='started' if result['success'] else 'failed')
+        return result['success']
     
     def get_system_status(self) -> dict:
         """Get comprehensive system status"""
+        snapshot = self.state.snapshot
         return {
-            'performance_active': self.performance_active,
+            'performance_active': snapshot.active,
+            'performance_state': snapshot.state.value,
+            'performance_id': snapshot.performance_id,
             'sensor_status': self.sensor_manager.get_sensor_status(),
             'motor_status': self.motor_controller.get_motor_status(),
             'audio_status': self.audio_controller.get_status(),
             'led_status': self.led_controller.get_status(),
-            'cooldown_active': self.sensor_manager.is_in_cooldown()
+            'cooldown_active': snapshot.in_cooldown,
+            'trigger_queue': self.trigger_queue.get_status() if self.trigger_queue is not None else None
         }
     
     def cleanup(self):
         """Clean up event handler and all controllers"""
         self.logger.info("Cleaning up Event Handler")
         
-        # Stop any active performance
-        if self.performance_active:
-            self.stop_performance()
+        # Drop queued triggers and stop any active performance
+        if self.trigger_queue is not None:
+            self.trigger_queue.clear()
+        self.stop_performance()
+        self.state.close()
         
         # Clean up all controllers
         try:
@@ -0,0 +1,293 @@
+"""
+Fleet Sync for Ghost Host
+========================
+Starts the same performance on several figures at one shared instant.
+
+One unit is the leader (fleet.leader is empty) and its monotonic clock is the
+fleet's shared time base. Followers estimate their offset to it NTP-style over
+UDP: each ping records t1 (sent) and t4 (reply received) on the follower
+clock, the leader stamps t2 (received) and t3 (replied), and
+
+    offset = ((t2 - t1) + (t3 - t4)) / 2      delay = (t4 - t1) - (t3 - t2)
+
+The sample with the smallest delay of the recent window is used, since it had
+the least queueing to skew it.
+
+To play, the leader sends "start clip X at shared time T" to every peer. Each
+unit preloads the clip, waits for T on its own monotonic clock and reports
+when aplay actually started, converted back to shared time. The leader turns
+those reports into the achieved inter-unit skew.
+
+Followers take starts only from the leader's address, and only for instants
+between START_TOLERANCE seconds ago and fleet.max_lead_seconds ahead. Set
+fleet.secret on every unit so messages are authenticated as well.
+"""
+
+import hmac
+import json
+import logging
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from src.core.metrics import metrics
+from src.core.scheduler import sleep_until
+
+SKEW = metrics.gauge('ghosthost_fleet_skew_seconds', 'Spread of audio start times across the fleet, last start')
+# Slack on either side of the accepted start window, for clock offset and delivery
+START_TOLERANCE = 2.0
+
+OFFSET = metrics.gauge('ghosthost_fleet_clock_offset_seconds', 'Estimated offset of the leader clock')
+SYNC_DELAY = metrics.gauge('ghosthost_fleet_sync_delay_seconds', 'Round-trip delay of the offset sample in use')
+
+
+def _parse_address(value: str, default_port: int) -> Tuple[str, int]:
+    host, _, port = str(value).rpartition(':')
+    if not host:
+        return str(value), default_port
+    return host, int(port)
+
+
+class FleetSync:
+    def __init__(self, event_handler, config, clock: Callable[[], float] = time.monotonic):
+        self.event_handler = event_handler
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        # The demo tool passes a skewed clock to stand in for separate hardware
+        self.clock = clock
+        self.port = int(config.get('fleet.port', 9100))
+        self.unit = str(config.get('fleet.unit_id') or socket.gethostname())
+        self.secret = str(config.get('fleet.secret') or '')
+        leader = config.get('fleet.leader') or ''
+        self.leader = _parse_address(leader, self.port) if leader else None
+        self.peers = [_parse_address(p, self.port) for p in config.get('fleet.peers', []) or []]
+        self.lead_seconds = float(config.get('fleet.lead_seconds', 1.0))
+        self.max_lead_seconds = float(config.get('fleet.max_lead_seconds', 10.0))
+        self._leader_ips = set()
+        self.sync_interval = float(config.get('fleet.sync_interval', 5.0))
+        self.samples = deque(maxlen=16)
+        self.runs = OrderedDict()
+        self._pending_pings = set()
+        self._lock = threading.Lock()
+        self._running = False
+        self.sock = None
+        # One start at a time; it sleeps until the shared instant
+        self._starter = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fleet-start')
+
+    @property
+    def is_leader(self) -> bool:
+        return self.leader is None
+
+    def start(self) -> bool:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.sock.bind(('0.0.0.0', self.port))
+        self._running = True
+        if not self.is_leader:
+            try:
+                self._leader_ips = {info[4][0] for info in socket.getaddrinfo(self.leader[0], None, socket.AF_INET)}
+            except OSError as e:
+                self.logger.error(f"Cannot resolve fleet leader {self.leader[0]}: {e}")
+                self._leader_ips = {self.leader[0]}
+        threading.Thread(target=self._receive_loop, name='fleet-sync', daemon=True).start()
+        if not self.is_leader:
+            threading.Thread(target=self._sync_loop, name='fleet-clock', daemon=True).start()
+        if not self.secret:
+            self.logger.warning("fleet.secret is not set: fleet messages are unauthenticated, so any host that "
+                                "can spoof the leader's address can start performances")
+        self.logger.info(f"Fleet sync on udp port {self.port} as {'leader' if self.is_leader else 'follower'} "
+                         f"({self.unit})")
+        return True
+
+    def stop(self):
+        self._running = False
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        self._starter.shutdown(wait=False)
+
+    def _send(self, message: dict, address):
+        if self.secret:
+            message['secret'] = self.secret
+        try:
+            self.sock.sendto(json.dumps(message).encode('utf-8'), address)
+        except OSError as e:
+            self.logger.debug(f"Could not send {message['type']} to {address[0]}: {e}")
+
+    def shared_time(self) -> Optional[float]:
+        """Current shared (leader) time, or None before the first offset sample"""
+        offset = self.offset()
+        return None if offset is None else self.clock() + offset
+
+    def offset(self) -> Optional[float]:
+        """Leader clock minus ours, from the minimum-delay sample"""
+        if self.is_leader:
+            return 0.0
+        with self._lock:
+            if not self.samples:
+                return None
+            return min(self.samples)[1]
+
+    def sync_delay(self) -> float:
+        """Round-trip delay of the offset sample in use; the offset is good to about half of it"""
+        with self._lock:
+            return min(self.samples)[0] if self.samples and not self.is_leader else 0.0
+
+    def _sync_loop(self):
+        while self._running:
+            # A short burst gives the min-delay filter a few samples to choose from
+            with self._lock:
+                now = self.clock()
+                self._pending_pings = {t for t in self._pending_pings if now - t < self.sync_interval}
+            for _ in range(4):
+                t1 = self.clock()
+                with self._lock:
+                    self._pending_pings.add(t1)
+                self._send({'type': 'ping', 't1': t1}, self.leader)
+                time.sleep(0.05)
+            time.sleep(self.sync_interval)
+
+    def _receive_loop(self):
+        while self._running:
+            try:
+                data, sender = self.sock.recvfrom(4096)
+            except OSError:
+                break
+            received_at = self.clock()
+            try:
+                message = json.loads(data.decode('utf-8'))
+                if self.secret and not hmac.compare_digest(str(message.get('secret', '')).encode('utf-8'),
+                                                           self.secret.encode('utf-8')):
+                    continue
+                self._handle(message, sender, received_at)
+            except Exception as e:
+                self.logger.error(f"Error handling fleet message from {sender[0]}: {e}")
+
+    def _handle(self, message: dict, sender, received_at: float):
+        kind = message.get('type')
+        if kind == 'ping' and self.is_leader:
+            self._send({'type': 'pong', 't1': message['t1'], 't2': received_at, 't3': self.clock()}, sender)
+        elif kind == 'pong':
+            t1, t2, t3, t4 = message['t1'], message['t2'], message['t3'], received_at
+            with self._lock:
+                if t1 not in self._pending_pings:
+                    return
+                self._pending_pings.discard(t1)
+                delay = (t4 - t1) - (t3 - t2)
+                self.samples.append((delay, ((t2 - t1) + (t3 - t4)) / 2))
+                best_delay, best_offset = min(self.samples)
+            OFFSET.set(best_offset)
+            SYNC_DELAY.set(best_delay)
+        elif kind == 'start':
+            error = self._check_start(message, sender)
+            if error:
+                self.logger.warning(f"Ignoring fleet start from {sender[0]}: {error}")
+                return
+            self._starter.submit(self._execute, message, sender)
+        elif kind == 'report' and self.is_leader:
+            self._record(message)
+
+    def _check_start(self, message: dict, sender) -> Optional[str]:
+        """Why a start message must be ignored, or None to run it"""
+        if self.is_leader or sender[0] not in self._leader_ips:
+            return 'not from the fleet leader'
+        at, audio_file = message.get('at'), message.get('audio_file')
+        if not isinstance(at, (int, float)) or isinstance(at, bool) or not isinstance(audio_file, str):
+            return 'malformed start'
+        now = self.shared_time()
+        # Unsynced units report 'unsynced' at once, without waiting for the instant
+        if now is not None and not now - START_TOLERANCE <= at <= now + self.max_lead_seconds + START_TOLERANCE:
+            return f"start instant {at - now:+.1f}s away is outside the accepted window"
+        return None
+
+    def play(self, audio_file: str, lead_seconds: Optional[float] = None) -> dict:
+        """Leader only: start audio_file on every unit at one shared instant"""
+        if not self.is_leader:
+            return {'success': False, 'message': 'Not the fleet leader'}
+        lead = self.lead_seconds if lead_seconds is None else float(lead_seconds)
+        if not 0 <= lead <= self.max_lead_seconds:
+            raise ValueError(f"lead_seconds must be between 0 and {self.max_lead_seconds:g}")
+        message = {'type': 'start', 'id': str(uuid.uuid4()), 'audio_file': audio_file,
+                   'at': self.clock() + lead}
+        with self._lock:
+            self.runs[message['id']] = {'audio_file': audio_file, 'at': message['at'], 'reports': {}}
+            while len(self.runs) > 20:
+                self.runs.popitem(last=False)
+        for peer in self.peers:
+            self._send(dict(message), peer)
+        self._starter.submit(self._execute, message, None)
+        return {'success': True, 'start_id': message['id'], 'lead_seconds': lead, 'units': len(self.peers) + 1}
+
+    def _execute(self, message: dict, sender):
+        """Preload, start at the shared instant and report the achieved start"""
+        report = {'type': 'report', 'id': message['id'], 'unit': self.unit}
+        offset = self.offset()
+        if offset is None:
+            report['outcome'] = 'unsynced'
+        elif not self.event_handler.prepare_performance(message['audio_file']):
+            report['outcome'] = 'failed'
+        else:
+            # Shared instant -> our clock -> time.monotonic(), which the event handler uses
+            local_deadline = message['at'] - offset
+            deadline = time.monotonic() + (local_deadline - self.clock())
+            sleep_until(deadline)
+            result = self.event_handler.start_prepared(message['audio_file'], 'fleet', deadline)
+            trace = self.event_handler.traces.get(result['performance_id']) if result.get('success') else None
+            # aplay is spawned on the audio worker thread, after start_prepared returns
+            late = trace.wait_for_audio() if trace else None
+            if late is None:
+                report['outcome'] = 'busy' if not result.get('success') else 'failed'
+            else:
+                report['outcome'] = 'started'
+                report['started_at'] = message['at'] + late
+                report['sync_delay'] = self.sync_delay()
+        if sender is None:
+            self._record(report)
+        else:
+            self._send(report, sender)
+
+    def _record(self, report: dict):
+        with self._lock:
+            run = self.runs.get(report['id'])
+            if run is None:
+                return
+            run['reports'][report['unit']] = report
+            started = [r['started_at'] for r in run['reports'].values() if 'started_at' in r]
+            if len(started) > 1:
+                run['skew'] = max(started) - min(started)
+                # Each unit's offset can be off by up to half its sync round trip
+                run['uncertainty'] = max(r.get('sync_delay', 0) for r in run['reports'].values()) / 2
+                SKEW.set(run['skew'])
+        if report.get('outcome') != 'started':
+            self.logger.warning(f"Fleet unit {report['unit']} did not start: {report.get('outcome')}")
+        elif 'skew' in run:
+            self.logger.info(f"Fleet start {report['id'][:8]}: {len(started)} units, "
+                             f"skew {run['skew'] * 1000:.1f}ms (+/- {run['uncertainty'] * 1000:.1f}ms)")
+
+    def get_status(self) -> dict:
+        offset = self.offset()
+        with self._lock:
+            best = min(self.samples) if self.samples else None
+            runs = [{
+                'start_id': start_id,
+                'audio_file': run['audio_file'],
+                'units': {unit: {'outcome': r.get('outcome'),
+                                 'start_error_ms': round((r['started_at'] - run['at']) * 1000, 3)
+                                 if 'started_at' in r else None}
+                          for unit, r in run['reports'].items()},
+                'skew_ms': round(run['skew'] * 1000, 3) if 'skew' in run else None,
+                'uncertainty_ms': round(run['uncertainty'] * 1000, 3) if 'uncertainty' in run else None
+            } for start_id, run in self.runs.items()]
+        return {
+            'role': 'leader' if self.is_leader else 'follower',
+            'unit': self.unit,
+            'peers': len(self.peers),
+            'offset_ms': round(offset * 1000, 3) if offset is not None else None,
+            'sync_delay_ms': round(best[0] * 1000, 3) if best else None,
+            'runs': runs
+        }
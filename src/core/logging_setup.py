@@ -0,0 +1,142 @@
+"""
+Logging Setup for Ghost Host
+===========================
+Non-blocking logging: log calls only enqueue the record, and a background
+writer thread drains the queue, writes each batch to size-rotated files and
+flushes once per batch. If the writer falls behind (e.g. a stalled SD card),
+new records are dropped and counted rather than blocking the caller.
+"""
+
+import atexit
+import logging
+import queue
+import re
+import sys
+import threading
+from logging.handlers import QueueHandler, RotatingFileHandler
+from pathlib import Path
+from typing import List, Union
+
+from src.core.metrics import metrics
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+DROPPED_RECORDS = metrics.counter('ghosthost_log_records_dropped_total',
+                                  'Log records dropped because the writer queue was full')
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2, 'G': 1024 ** 3, 'GB': 1024 ** 3}
+_STOP = object()
+
+
+def parse_size(value: Union[int, str]) -> int:
+    """Parse a size such as 10MB, 512KB or 1048576 into bytes"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*', str(value).upper())
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that leaves flushing to the writer thread"""
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class BatchingStreamHandler(logging.StreamHandler):
+    """Stream handler that leaves flushing to the writer thread"""
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of waiting when the queue is full"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_RECORDS.inc()
+
+
+class AsyncLogWriter:
+    def __init__(self, handlers: List[logging.Handler], max_queue: int = 10000, max_batch: int = 256):
+        self.handlers = handlers
+        self.max_batch = max_batch
+        self.queue = queue.Queue(max_queue)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write out everything queued so far and stop the writer thread"""
+        if self._thread and self._thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=1)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=5)
+        for handler in self.handlers:
+            handler.close()
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            for record in batch:
+                if record is _STOP:
+                    running = False
+                    continue
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except Exception:
+                    pass
+
+
+def setup_async_logging(log_file: str, level: str = 'INFO', max_size: Union[int, str] = '10MB',
+                        backup_count: int = 5, fmt: str = DEFAULT_FORMAT) -> AsyncLogWriter:
+    """Route the root logger through a queue to a rotating file and stdout"""
+    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+    formatter = logging.Formatter(fmt)
+
+    file_handler = BatchingRotatingFileHandler(log_file, maxBytes=parse_size(max_size),
+                                               backupCount=int(backup_count))
+    console_handler = BatchingStreamHandler(sys.stdout)
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    writer = AsyncLogWriter([file_handler, console_handler])
+    writer.start()
+    atexit.register(writer.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(writer.queue))
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    return writer
@@ -0,0 +1,294 @@
+"""
+OSC Trigger Listener for Ghost Host
+==================================
+UDP listener for show-control systems and microcontroller sensors. Accepts
+OSC messages or a compact text datagram addressed to /ghosthost/trigger/<id>:
+
+OSC:   /ghosthost/trigger/<id>  [i seq] [s clip] [s token]
+Text:  /ghosthost/trigger/<id> seq=12 clip=Greeting.wav token=secret
+
+Triggers are looked up and authorized through the shared TriggerRegistry.
+Senders that include a sequence number get duplicate suppression, loss
+counting and an acknowledgement (/ghosthost/ack seq status) in the same
+format they sent, so they can retransmit until acknowledged.
+"""
+
+import logging
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from src.core.metrics import metrics
+from src.core.trigger_registry import TriggerRegistry
+from src.core.rate_limiter import AdmissionControl
+
+TRIGGER_PREFIX = '/ghosthost/trigger/'
+ACK_ADDRESS = '/ghosthost/ack'
+# Sequence numbers this far below the last one seen mean the sender restarted
+SEQUENCE_RESET_WINDOW = 1000
+# (sender, trigger) pairs whose sequence is remembered; the least recently seen are forgotten
+MAX_TRACKED_SEQUENCES = 1024
+
+DATAGRAMS = metrics.counter('ghosthost_osc_datagrams_total', 'Trigger datagrams by outcome', ['outcome'])
+LOST = metrics.counter('ghosthost_osc_lost_total', 'Trigger datagrams missing from sender sequences')
+PROCESSING = metrics.histogram('ghosthost_osc_processing_seconds', 'Receive to dispatch processing time',
+                               buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01))
+
+
+class OSCError(ValueError):
+    pass
+
+
+def _read_string(data: bytes, offset: int) -> Tuple[str, int]:
+    end = data.find(b'\0', offset)
+    if end < 0:
+        raise OSCError("unterminated string")
+    # Strings are null-terminated and padded to a multiple of 4 bytes
+    return data[offset:end].decode('utf-8'), (end + 4) & ~3
+
+
+def parse_osc(data: bytes) -> List[Tuple[str, list]]:
+    """Decode an OSC message or bundle into [(address, args)]"""
+    if data.startswith(b'#bundle\0'):
+        messages = []
+        offset = 16  # '#bundle\0' + 8 byte timetag
+        while offset + 4 <= len(data):
+            (size,) = struct.unpack_from('>i', data, offset)
+            messages.extend(parse_osc(data[offset + 4:offset + 4 + size]))
+            offset += 4 + size
+        return messages
+
+    address, offset = _read_string(data, 0)
+    if offset >= len(data):
+        return [(address, [])]
+    tags, offset = _read_string(data, offset)
+    if not tags.startswith(','):
+        raise OSCError("missing type tags")
+    args = []
+    for tag in tags[1:]:
+        if tag == 'i':
+            args.append(struct.unpack_from('>i', data, offset)[0])
+            offset += 4
+        elif tag == 'f':
+            args.append(struct.unpack_from('>f', data, offset)[0])
+            offset += 4
+        elif tag == 's':
+            value, offset = _read_string(data, offset)
+            args.append(value)
+        elif tag in 'TF':
+            args.append(tag == 'T')
+        else:
+            raise OSCError(f"unsupported type tag {tag}")
+    return [(address, args)]
+
+
+def _pad(data: bytes) -> bytes:
+    return data + b'\0' * (4 - len(data) % 4)
+
+
+def build_osc(address: str, *args) -> bytes:
+    """Encode an OSC message with int and string arguments"""
+    tags = ',' + ''.join('i' if isinstance(a, int) else 's' for a in args)
+    payload = _pad(address.encode('utf-8')) + _pad(tags.encode('utf-8'))
+    for arg in args:
+        payload += struct.pack('>i', arg) if isinstance(arg, int) else _pad(str(arg).encode('utf-8'))
+    return payload
+
+
+def parse_text(data: bytes) -> Tuple[str, dict]:
+    """Decode '/ghosthost/trigger/<id> key=value ...'"""
+    parts = data.decode('utf-8').split()
+    if not parts:
+        raise OSCError("empty datagram")
+    fields = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition('=')
+        if not sep:
+            raise OSCError(f"expected key=value, got {part}")
+        fields[key] = value
+    return parts[0], fields
+
+
+class SequenceTracker:
+    """Per-sender duplicate and loss detection for sequence-numbered datagrams"""
+
+    def __init__(self, capacity: int = MAX_TRACKED_SEQUENCES):
+        self.capacity = capacity
+        self._last = OrderedDict()
+
+    def is_duplicate(self, sender, seq: int) -> bool:
+        """True if seq from sender was already handled; records nothing"""
+        last = self._last.get(sender)
+        return last is not None and seq <= last and last - seq <= SEQUENCE_RESET_WINDOW
+
+    def check(self, sender, seq: int) -> Tuple[bool, int]:
+        """Returns (is_new, lost) for seq from sender, recording it if new"""
+        last = self._last.get(sender)
+        if last is None or seq > last:
+            lost = seq - last - 1 if last is not None else 0
+            self._record(sender, seq)
+            return True, lost
+        if last - seq > SEQUENCE_RESET_WINDOW:
+            self._record(sender, seq)
+            return True, 0
+        return False, 0
+
+    def _record(self, sender, seq: int):
+        self._last[sender] = seq
+        self._last.move_to_end(sender)
+        while len(self._last) > self.capacity:
+            self._last.popitem(last=False)
+
+    def __len__(self):
+        return len(self._last)
+
+
+class OSCListener:
+    def __init__(self, event_handler, config, registry: Optional[TriggerRegistry] = None,
+                 admission: Optional[AdmissionControl] = None):
+        self.event_handler = event_handler
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.triggers = registry or TriggerRegistry(config)
+        self.admission = admission or AdmissionControl(config)
+        self.sequences = SequenceTracker()
+        self.send_acks = bool(config.get('osc_trigger.ack', True))
+        self.sock = None
+        self.thread = None
+        self._running = False
+        # Performances start off the receive thread so the socket keeps draining
+        self._dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='osc-dispatch')
+
+    def start(self) -> bool:
+        host = self.config.get('osc_trigger.host', '0.0.0.0')
+        port = int(self.config.get('osc_trigger.port', 9000))
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self._running = True
+        self.thread = threading.Thread(target=self._receive_loop, name='osc-listener', daemon=True)
+        self.thread.start()
+        self.logger.info(f"OSC trigger listener on udp://{host}:{port}")
+        return True
+
+    def stop(self):
+        self._running = False
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        self._dispatcher.shutdown(wait=False)
+
+    def _receive_loop(self):
+        while self._running:
+            try:
+                data, sender = self.sock.recvfrom(2048)
+            except OSError:
+                break
+            received_at = time.monotonic()
+            try:
+                self.handle_datagram(data, sender, received_at)
+            except Exception as e:
+                self.logger.error(f"Error handling datagram from {sender[0]}: {e}")
+
+    def _decode(self, data: bytes) -> List[Tuple[str, Optional[int], Optional[str], Optional[str], bool]]:
+        """Returns [(address, seq, clip, token, is_osc)]"""
+        if data[:1] == b'#' or b'\0' in data:
+            decoded = []
+            for address, args in parse_osc(data):
+                ints = [a for a in args if isinstance(a, int) and not isinstance(a, bool)]
+                strings = [a for a in args if isinstance(a, str)]
+                decoded.append((address, ints[0] if ints else None,
+                                strings[0] if strings else None,
+                                strings[1] if len(strings) > 1 else None, True))
+            return decoded
+        address, fields = parse_text(data)
+        seq = int(fields['seq']) if 'seq' in fields else None
+        return [(address, seq, fields.get('clip'), fields.get('token'), False)]
+
+    def handle_datagram(self, data: bytes, sender: Tuple[str, int], received_at: float):
+        """Parse, authorize, deduplicate and dispatch one datagram"""
+        try:
+            messages = self._decode(data)
+        except (OSCError, ValueError, struct.error, UnicodeDecodeError) as e:
+            DATAGRAMS.inc(outcome='malformed')
+            self.logger.debug(f"Malformed datagram from {sender[0]}: {e}")
+            return
+
+        for address, seq, clip, token, is_osc in messages:
+            if not address.startswith(TRIGGER_PREFIX):
+                DATAGRAMS.inc(outcome='malformed')
+                continue
+            trigger_id = address[len(TRIGGER_PREFIX):]
+
+            # Retransmissions of a handled datagram are re-acked without spending
+            # rate-limit tokens, so a sender retrying until acked can't limit itself
+            if seq is not None and self.sequences.is_duplicate((sender[0], trigger_id), seq):
+                _, error = self.triggers.authorize(trigger_id, token)
+                DATAGRAMS.inc(outcome=error or 'duplicate')
+                self._ack(sender, seq, error or 'duplicate', is_osc)
+                continue
+
+            allowed, _, _ = self.admission.check(trigger_id, sender[0], 'osc')
+            if not allowed:
+                DATAGRAMS.inc(outcome='rate_limited')
+                self._ack(sender, seq, 'rate_limited', is_osc)
+                continue
+
+            # Authorize first so unauthenticated datagrams can't advance a sequence
+            trigger, error = self.triggers.authorize(trigger_id, token)
+            if error:
+                DATAGRAMS.inc(outcome=error)
+                self._ack(sender, seq, error, is_osc)
+                continue
+
+            if seq is not None:
+                is_new, lost = self.sequences.check((sender[0], trigger_id), seq)
+                if lost:
+                    LOST.inc(lost)
+                    self.logger.warning(f"{lost} trigger datagram(s) lost from {sender[0]} before seq {seq}")
+                if not is_new:
+                    # A retransmission of something we already handled; re-ack so it stops
+                    DATAGRAMS.inc(outcome='duplicate')
+                    self._ack(sender, seq, 'duplicate', is_osc)
+                    continue
+
+            audio_file = clip or self.triggers.default_audio(trigger)
+            PROCESSING.observe(time.monotonic() - received_at)
+            DATAGRAMS.inc(outcome='dispatched')
+            self._dispatcher.submit(self._dispatch, audio_file, received_at, sender, seq, is_osc)
+
+    def _dispatch(self, audio_file: str, received_at: float, sender, seq: Optional[int], is_osc: bool):
+        result = self.event_handler.trigger_network_performance(audio_file, received_at)
+        if result.get('queued'):
+            status = 'queued'
+        elif result.get('success'):
+            status = 'started'
+        else:
+            status = 'busy' if result.get('message') in ('Performance already active', 'In cooldown period') \
+                else 'failed'
+        self._ack(sender, seq, status, is_osc)
+
+    def _ack(self, sender, seq: Optional[int], status: str, is_osc: bool):
+        if not self.send_acks or seq is None or not self.sock:
+            return
+        if is_osc:
+            payload = build_osc(ACK_ADDRESS, seq, status)
+        else:
+            payload = f"{ACK_ADDRESS} seq={seq} status={status}".encode('utf-8')
+        try:
+            self.sock.sendto(payload, sender)
+        except OSError as e:
+            self.logger.debug(f"Could not ack {sender[0]}: {e}")
+
+    def get_status(self) -> dict:
+        return {
+            'senders': len(self.sequences),
+            'dispatched': DATAGRAMS.value(outcome='dispatched'),
+            'duplicates': DATAGRAMS.value(outcome='duplicate'),
+            'rate_limited': DATAGRAMS.value(outcome='rate_limited'),
+            'lost': LOST.value()
+        }
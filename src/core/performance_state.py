@@ -0,0 +1,208 @@
+"""
+Performance State Machine for Ghost Host
+=======================================
+Lock-protected lifecycle shared by sensor, network and test triggers.
+
+idle -> starting -> performing -> stopping -> cooldown -> idle
+
+Every transition happens under a single lock, so exactly one caller can move
+the figure out of idle. Readers use ``snapshot``, an immutable tuple that is
+swapped in one assignment and can be read from any thread without locking.
+Listeners are called with (old, new) snapshots after the lock is released.
+"""
+
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+
+class PerformanceState(Enum):
+    IDLE = "idle"
+    STARTING = "starting"
+    PERFORMING = "performing"
+    STOPPING = "stopping"
+    COOLDOWN = "cooldown"
+
+
+ACTIVE_STATES = (PerformanceState.STARTING, PerformanceState.PERFORMING, PerformanceState.STOPPING)
+
+# Allowed transitions; anything else is refused
+TRANSITIONS = {
+    PerformanceState.IDLE: {PerformanceState.STARTING},
+    PerformanceState.STARTING: {PerformanceState.PERFORMING, PerformanceState.STOPPING, PerformanceState.IDLE},
+    PerformanceState.PERFORMING: {PerformanceState.STOPPING},
+    PerformanceState.STOPPING: {PerformanceState.COOLDOWN, PerformanceState.IDLE},
+    PerformanceState.COOLDOWN: {PerformanceState.IDLE},
+}
+
+
+class StateSnapshot(NamedTuple):
+    state: PerformanceState
+    performance_id: int
+    source: Optional[str]
+    audio_file: Optional[str]
+    changed_at: float  # time.monotonic() of the last transition
+    expected_end: Optional[float]  # monotonic end of the current performance
+    cooldown_until: Optional[float]  # monotonic end of the current cooldown
+
+    @property
+    def active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    @property
+    def in_cooldown(self) -> bool:
+        return (self.state is PerformanceState.COOLDOWN
+                and self.cooldown_until is not None
+                and time.monotonic() < self.cooldown_until)
+
+    def busy_reason(self) -> str:
+        """Human readable reason a trigger was refused in this state"""
+        if self.state is PerformanceState.COOLDOWN:
+            return 'In cooldown period'
+        return 'Performance already active'
+
+
+class PerformanceStateMachine:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._cooldown_timer = None
+        self._listeners: List[Callable] = []
+        self._pending: List[Tuple[StateSnapshot, StateSnapshot]] = []
+        self._snapshot = StateSnapshot(PerformanceState.IDLE, 0, None, None, time.monotonic(), None, None)
+
+    @property
+    def snapshot(self) -> StateSnapshot:
+        """Current state, safe to read without the lock"""
+        return self._snapshot
+
+    def add_listener(self, callback: Callable[[StateSnapshot, StateSnapshot], None]):
+        """Register a callback for every transition"""
+        self._listeners.append(callback)
+
+    def _notify(self):
+        """Deliver queued transitions to listeners; call without the lock held"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for old, new in pending:
+            for callback in self._listeners:
+                try:
+                    callback(old, new)
+                except Exception as e:
+                    self.logger.error(f"Error in state listener: {e}")
+
+    def _set(self, state: PerformanceState, **changes):
+        """Swap in a new snapshot; caller must hold the lock"""
+        current = self._snapshot
+        if state not in TRANSITIONS[current.state]:
+            raise ValueError(f"Invalid transition {current.state.value} -> {state.value}")
+        self._snapshot = current._replace(state=state, changed_at=time.monotonic(), **changes)
+        if self._listeners:
+            self._pending.append((current, self._snapshot))
+        self.logger.debug(f"Performance {self._snapshot.performance_id}: {current.state.value} -> {state.value}")
+        return self._snapshot
+
+    def try_begin(self, source: str, audio_file: Optional[str] = None) -> Tuple[bool, StateSnapshot]:
+        """Atomically claim the figure for a new performance.
+
+        Returns (admitted, snapshot). When admitted the snapshot carries the new
+        performance_id; otherwise it is the state that caused the refusal.
+        """
+        with self._lock:
+            current = self._snapshot
+            if current.state is PerformanceState.COOLDOWN and not current.in_cooldown:
+                # Cooldown deadline passed before its timer fired
+                self._cancel_cooldown_timer()
+                current = self._set(PerformanceState.IDLE, cooldown_until=None)
+            if current.state is PerformanceState.IDLE:
+                result = True, self._set(
+                    PerformanceState.STARTING,
+                    performance_id=current.performance_id + 1,
+                    source=source,
+                    audio_file=audio_file,
+                    expected_end=None,
+                    cooldown_until=None
+                )
+            else:
+                result = False, current
+        self._notify()
+        return result
+
+    def mark_performing(self, performance_id: int, duration: float) -> bool:
+        """Move a starting performance to performing"""
+        with self._lock:
+            current = self._snapshot
+            ok = current.performance_id == performance_id and current.state is PerformanceState.STARTING
+            if ok:
+                self._set(PerformanceState.PERFORMING, expected_end=time.monotonic() + duration)
+        self._notify()
+        return ok
+
+    def abort_start(self, performance_id: int) -> bool:
+        """Release the figure after a performance failed to start"""
+        with self._lock:
+            current = self._snapshot
+            ok = current.performance_id == performance_id and current.state is PerformanceState.STARTING
+            if ok:
+                self._set(PerformanceState.IDLE, expected_end=None)
+        self._notify()
+        return ok
+
+    def begin_stop(self, performance_id: Optional[int] = None) -> Optional[StateSnapshot]:
+        """Move an active performance to stopping.
+
+        With performance_id the call only succeeds for that performance, which
+        keeps a late completion callback from stopping a newer one.
+        """
+        with self._lock:
+            current = self._snapshot
+            stopping = None
+            if (current.state in (PerformanceState.STARTING, PerformanceState.PERFORMING)
+                    and performance_id in (None, current.performance_id)):
+                stopping = self._set(PerformanceState.STOPPING)
+        self._notify()
+        return stopping
+
+    def finish_stop(self, performance_id: int, cooldown: float = 0) -> bool:
+        """Leave stopping, entering cooldown when cooldown > 0"""
+        with self._lock:
+            current = self._snapshot
+            ok = current.performance_id == performance_id and current.state is PerformanceState.STOPPING
+            if ok and cooldown <= 0:
+                self._set(PerformanceState.IDLE, expected_end=None)
+            elif ok:
+                self._set(PerformanceState.COOLDOWN, expected_end=None,
+                          cooldown_until=time.monotonic() + cooldown)
+                self._cooldown_timer = threading.Timer(cooldown, self.end_cooldown, args=(performance_id,))
+                self._cooldown_timer.daemon = True
+                self._cooldown_timer.start()
+        self._notify()
+        return ok
+
+    def end_cooldown(self, performance_id: Optional[int] = None) -> bool:
+        """Return to idle from cooldown (any cooldown when performance_id is None)"""
+        with self._lock:
+            current = self._snapshot
+            ok = (current.state is PerformanceState.COOLDOWN
+                  and performance_id in (None, current.performance_id))
+            if ok:
+                self._cancel_cooldown_timer()
+                self._set(PerformanceState.IDLE, cooldown_until=None)
+        if ok:
+            self.logger.info("Cooldown period ended")
+        self._notify()
+        return ok
+
+    def _cancel_cooldown_timer(self):
+        """Cancel a pending cooldown timer; caller must hold the lock"""
+        timer = self._cooldown_timer
+        self._cooldown_timer = None
+        if timer and timer is not threading.current_thread():
+            timer.cancel()
+
+    def close(self):
+        """Cancel any pending timers"""
+        with self._lock:
+            self._cancel_cooldown_timer()
@@ -0,0 +1,151 @@
+"""
+Performance Tracing for Ghost Host
+=================================
+Per-performance latency traces with monotonic timestamps for each stage,
+kept in a bounded in-memory ring and exportable as JSON or Chrome trace-event
+format (load the latter in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+# Stages used for the latency summaries
+TRIGGER_TO_AUDIO = ('trigger', 'aplay_spawn')
+TRIGGER_TO_MOUTH = ('trigger', 'first_mouth_open')
+# Marked by the audio worker if playback couldn't be started
+AUDIO_ERROR = 'audio_error'
+# How long a caller waits for the audio worker to spawn aplay
+AUDIO_SPAWN_TIMEOUT = 2.0
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class PerformanceTrace:
+    def __init__(self, performance_id: int, source: str, audio_file: str, trigger_time: Optional[float] = None):
+        self.performance_id = performance_id
+        self.source = source
+        self.audio_file = audio_file
+        # Wall clock is only kept to label the trace; all stage math is monotonic
+        now = time.monotonic()
+        self.wall_time = time.time() - (now - (trigger_time or now))
+        self.marks = []
+        self._marked = threading.Condition()
+        self.mark('trigger', trigger_time or now)
+
+    def mark(self, stage: str, at: Optional[float] = None):
+        """Record a stage; safe to call from any thread"""
+        with self._marked:
+            self.marks.append((stage, at or time.monotonic(), threading.get_ident()))
+            self._marked.notify_all()
+
+    def wait_for(self, stages, timeout: Optional[float] = None) -> Optional[str]:
+        """Block until one of stages is marked (by any thread); returns it, or None on timeout"""
+        def reached():
+            return next((stage for stage, _, _ in self.marks if stage in stages), None)
+        with self._marked:
+            return self._marked.wait_for(reached, timeout)
+
+    def wait_for_audio(self, timeout: float = AUDIO_SPAWN_TIMEOUT) -> Optional[float]:
+        """Seconds from trigger to aplay spawn, once the audio worker gets there;
+        None if playback failed or hadn't started within timeout"""
+        if self.wait_for((TRIGGER_TO_AUDIO[1], AUDIO_ERROR), timeout) != TRIGGER_TO_AUDIO[1]:
+            return None
+        return self.elapsed(*TRIGGER_TO_AUDIO)
+
+    def elapsed(self, start: str, end: str) -> Optional[float]:
+        """Seconds between the first occurrences of two stages"""
+        times = {}
+        for stage, at, _ in list(self.marks):
+            times.setdefault(stage, at)
+        if start in times and end in times:
+            return times[end] - times[start]
+        return None
+
+    def to_dict(self) -> dict:
+        marks = list(self.marks)
+        origin = marks[0][1]
+        to_audio = self.elapsed(*TRIGGER_TO_AUDIO)
+        to_mouth = self.elapsed(*TRIGGER_TO_MOUTH)
+        return {
+            'performance_id': self.performance_id,
+            'source': self.source,
+            'audio_file': self.audio_file,
+            'wall_time': self.wall_time,
+            'stages': [{'stage': stage, 'ms': round((at - origin) * 1000, 3)} for stage, at, _ in marks],
+            'trigger_to_audio_ms': round(to_audio * 1000, 3) if to_audio is not None else None,
+            'trigger_to_first_mouth_open_ms': round(to_mouth * 1000, 3) if to_mouth is not None else None
+        }
+
+    def chrome_events(self) -> List[dict]:
+        """Trace events: one span for the performance, one per stage interval, instants per stage"""
+        marks = list(self.marks)
+        pid = self.performance_id
+        origin = marks[0][1]
+        events = [{
+            'name': f"performance {pid} ({self.source}: {self.audio_file})",
+            'ph': 'X', 'pid': pid, 'tid': 0,
+            'ts': origin * 1e6, 'dur': (marks[-1][1] - origin) * 1e6
+        }]
+        for (stage, at, tid), (next_stage, next_at, _) in zip(marks, marks[1:]):
+            events.append({
+                'name': f"{stage} -> {next_stage}", 'ph': 'X', 'pid': pid, 'tid': 1,
+                'ts': at * 1e6, 'dur': (next_at - at) * 1e6
+            })
+        for stage, at, tid in marks:
+            events.append({'name': stage, 'ph': 'i', 's': 't', 'pid': pid, 'tid': tid, 'ts': at * 1e6})
+        return events
+
+
+class TraceRecorder:
+    def __init__(self, capacity: int = 200):
+        self._traces = deque(maxlen=capacity)
+
+    def start(self, performance_id: int, source: str, audio_file: str,
+              trigger_time: Optional[float] = None) -> PerformanceTrace:
+        """Begin a trace; it is visible in exports while still in progress"""
+        trace = PerformanceTrace(performance_id, source, audio_file, trigger_time)
+        self._traces.append(trace)
+        return trace
+
+    def get(self, performance_id: int) -> Optional[PerformanceTrace]:
+        for trace in reversed(list(self._traces)):
+            if trace.performance_id == performance_id:
+                return trace
+        return None
+
+    def recent(self, limit: Optional[int] = None) -> List[dict]:
+        traces = list(self._traces)
+        if limit:
+            traces = traces[-limit:]
+        return [t.to_dict() for t in traces]
+
+    def chrome_trace(self) -> dict:
+        events = []
+        for trace in list(self._traces):
+            events.extend(trace.chrome_events())
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def summary(self) -> Dict[str, dict]:
+        """p50/p95/p99 of trigger-to-audio and trigger-to-first-mouth-open in ms"""
+        traces = list(self._traces)
+        result = {'count': len(traces)}
+        for name, stages in (('trigger_to_audio_ms', TRIGGER_TO_AUDIO),
+                             ('trigger_to_first_mouth_open_ms', TRIGGER_TO_MOUTH)):
+            values = [v * 1000 for v in (t.elapsed(*stages) for t in traces) if v is not None]
+            result[name] = {
+                'samples': len(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99)
+            }
+        return result
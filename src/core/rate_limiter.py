@@ -0,0 +1,122 @@
+"""
+Rate Limiter for Ghost Host
+==========================
+Token-bucket admission control for network triggers, applied per trigger ID
+and per source IP before any trigger lookup or event handler work.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from src.core.metrics import metrics
+
+RATE_LIMITED = metrics.counter('ghosthost_rate_limited_total', 'Triggers refused by rate limiting',
+                               ['scope', 'listener'])
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take one token; returns 0 on success or seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        # A zero rate blocks the key; suggest retrying in an hour
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 3600.0
+
+
+class RateLimiter:
+    """Token buckets keyed by an arbitrary string, bounded to max_keys (LRU)"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 1024):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self.allowed = 0
+        self.limited = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: str) -> float:
+        """Returns 0 if allowed, otherwise the suggested retry delay in seconds"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            wait = bucket.take(now)
+            if wait:
+                self.limited += 1
+            else:
+                self.allowed += 1
+            return wait
+
+    def get_status(self) -> dict:
+        return {
+            'rate_per_second': self.rate,
+            'burst': self.burst,
+            'tracked_keys': len(self._buckets),
+            'allowed': self.allowed,
+            'limited': self.limited
+        }
+
+
+class AdmissionControl:
+    """Per-IP then per-trigger limits from network_trigger.rate_limit, rebuilt on config change"""
+
+    def __init__(self, config):
+        self.enabled = False
+        self.exempt_ips = frozenset()
+        self.per_ip = None
+        self.per_trigger = None
+        self._settings = None
+        self.rebuild(config)
+        config.subscribe(self.rebuild)
+
+    def rebuild(self, config):
+        settings = config.get('network_trigger.rate_limit', {}) or {}
+        if settings == self._settings:
+            return  # unrelated change; keep the buckets and counters
+        self._settings = copy.deepcopy(settings)
+        per_ip = settings.get('per_ip', {}) or {}
+        per_trigger = settings.get('per_trigger', {}) or {}
+        self.per_ip = RateLimiter(float(per_ip.get('rate', 2.0)), float(per_ip.get('burst', 10)))
+        self.per_trigger = RateLimiter(float(per_trigger.get('rate', 1.0)), float(per_trigger.get('burst', 5)))
+        self.exempt_ips = frozenset(settings.get('exempt_ips', ['127.0.0.1']) or [])
+        self.enabled = bool(settings.get('enabled', True))
+
+    def check(self, trigger_id: str, source_ip: str, listener: str = 'http') -> Tuple[bool, float, Optional[str]]:
+        """Returns (allowed, retry_after_seconds, limiting scope)"""
+        if not self.enabled:
+            return True, 0.0, None
+        for scope, limiter, key in (('ip', self.per_ip, source_ip), ('trigger', self.per_trigger, trigger_id)):
+            # Local callers (the web interface's fire proxy) share one IP
+            if scope == 'ip' and source_ip in self.exempt_ips:
+                continue
+            wait = limiter.check(key)
+            if wait:
+                RATE_LIMITED.inc(scope=scope, listener=listener)
+                return False, wait, scope
+        return True, 0.0, None
+
+    def get_status(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'exempt_ips': sorted(self.exempt_ips),
+            'per_ip': self.per_ip.get_status(),
+            'per_trigger': self.per_trigger.get_status()
+        }
@@ -0,0 +1,309 @@
+"""
+Performance Scheduler for Ghost Host
+===================================
+Starts performances at planned instants. Schedules live in config under
+`schedules` and are either one-shot or recurring:
+
+    {'id': ..., 'name': 'Doors open', 'audio_file': 'Greeting.wav',
+     'start': '2026-10-31T19:00:00'}                  # once
+    {'start': '18:00', 'interval_seconds': 900, 'end': '23:00'}   # daily, every 15 min
+    {'start': '2026-10-31T19:00', 'interval_seconds': 3600}       # hourly from then on
+
+A daily start ("HH:MM[:SS]") without interval_seconds runs once a day.
+
+The clip and its choreography are loaded `scheduler.preload_seconds` ahead of
+each run; the start itself waits on a monotonic deadline. Every run records
+its start error (how late the performance was admitted and how late aplay
+was spawned, relative to the deadline).
+
+Runs are handled one at a time, so a run due while the previous one is still
+preloading or starting is picked up after its deadline. A run that would
+start more than `scheduler.max_late_seconds` late is recorded as `late`
+and not started.
+"""
+
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.core.metrics import metrics
+
+# How far back a scan looks for runs that came due since the previous one; bounds the
+# backlog after a forward clock step (e.g. NTP setting the clock at boot)
+MAX_SCAN_GAP = 60.0
+
+RUNS = metrics.counter('ghosthost_schedule_runs_total', 'Scheduled performance runs by outcome', ['outcome'])
+START_ERROR = metrics.histogram('ghosthost_schedule_start_error_seconds',
+                                'Lateness of scheduled audio starts relative to their deadline',
+                                buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+
+def sleep_until(deadline: float, spin: float = 0.002):
+    """Sleep until time.monotonic() reaches deadline, busy-waiting the last few ms"""
+    remaining = deadline - time.monotonic()
+    if remaining > spin:
+        time.sleep(remaining - spin)
+    while time.monotonic() < deadline:
+        pass
+
+
+def _parse_time_of_day(value: str):
+    """'HH:MM' or 'HH:MM:SS' -> datetime.time, None if value is not a time of day"""
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def _next_in_series(first: datetime, interval: float, last: Optional[datetime],
+                    after: datetime) -> Optional[datetime]:
+    """First run of first + k*interval strictly after `after` and not past `last`"""
+    if first > after:
+        candidate = first
+    elif interval <= 0:
+        return None
+    else:
+        steps = math.floor((after - first).total_seconds() / interval) + 1
+        candidate = first + timedelta(seconds=steps * interval)
+    if last is not None and candidate > last:
+        return None
+    return candidate
+
+
+def next_run(schedule: dict, after: datetime) -> Optional[datetime]:
+    """Next local wall-clock run of a schedule after `after`, or None if it is finished"""
+    start = str(schedule.get('start', ''))
+    interval = float(schedule.get('interval_seconds') or 0)
+    time_of_day = _parse_time_of_day(start)
+    if time_of_day is None:
+        first = datetime.fromisoformat(start)
+        if first.tzinfo:
+            first = first.astimezone().replace(tzinfo=None)  # compare in local time
+        return _next_in_series(first, interval, None, after)
+
+    end = _parse_time_of_day(str(schedule.get('end') or ''))
+    for offset in (0, 1):
+        day = after.date() + timedelta(days=offset)
+        first = datetime.combine(day, time_of_day)
+        # Recurring runs stop at `end`, or just before midnight
+        last = datetime.combine(day, end) if end else \
+            datetime.combine(day + timedelta(days=1), datetime.min.time()) - timedelta(microseconds=1)
+        candidate = _next_in_series(first, interval, last, after)
+        if candidate:
+            return candidate
+    return None
+
+
+def normalize_schedule(data: dict, soundfiles_dir: Optional[str] = None) -> dict:
+    """Validate an API or config schedule; raises ValueError with a user-facing message"""
+    audio_file = str(data.get('audio_file') or '').strip()
+    if not audio_file:
+        raise ValueError('audio_file is required')
+    if soundfiles_dir and not (Path(soundfiles_dir) / audio_file).exists():
+        raise ValueError(f'Unknown audio file: {audio_file}')
+
+    start = str(data.get('start') or '').strip()
+    if _parse_time_of_day(start) is None:
+        try:
+            datetime.fromisoformat(start)
+        except ValueError:
+            raise ValueError('start must be HH:MM[:SS] or an ISO date and time')
+
+    try:
+        interval = float(data.get('interval_seconds') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('interval_seconds must be a number')
+    if interval < 0 or 0 < interval < 10:
+        raise ValueError('interval_seconds must be 0 or at least 10')
+
+    end = str(data.get('end') or '').strip()
+    if end and _parse_time_of_day(end) is None:
+        raise ValueError('end must be HH:MM[:SS]')
+
+    schedule = {
+        'id': str(data.get('id') or uuid.uuid4()),
+        'name': str(data.get('name') or audio_file),
+        'audio_file': audio_file,
+        'start': start,
+        'interval_seconds': interval,
+        'enabled': bool(data.get('enabled', True))
+    }
+    if end:
+        schedule['end'] = end
+    return schedule
+
+
+class Scheduler:
+    def __init__(self, event_handler, config):
+        self.event_handler = event_handler
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.runs = deque(maxlen=50)
+        self.schedules = []
+        self.preload_seconds = 2.0
+        self.max_late_seconds = 0.5
+        # Wall-clock time of each schedule's last run, so a run is never repeated
+        self._last_run = {}
+        # Wall-clock time of the previous scan for due runs
+        self._scanned_at = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.thread = None
+        self.reload(config)
+        config.subscribe(self.reload)
+
+    def reload(self, config):
+        """Pick up schedule edits and wake the scheduler to recompute the next run"""
+        schedules = []
+        for entry in config.get('schedules', []) or []:
+            try:
+                schedules.append(normalize_schedule(entry))
+            except (AttributeError, ValueError) as e:
+                self.logger.error(f"Ignoring invalid schedule {entry!r}: {e}")
+        self.schedules = schedules
+        self.preload_seconds = float(config.get('scheduler.preload_seconds', 2.0))
+        self.max_late_seconds = float(config.get('scheduler.max_late_seconds', 0.5))
+        self._wake.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self.thread.start()
+        self.logger.info(f"Scheduler started with {len(self.schedules)} schedule(s)")
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _next_due(self) -> Optional[Tuple[dict, datetime]]:
+        now = datetime.now()
+        # Also find runs that came due since the previous scan, e.g. while a run was starting
+        since = max(self._scanned_at or now, now - timedelta(seconds=MAX_SCAN_GAP))
+        self._scanned_at = now
+        upcoming = []
+        for schedule in self.schedules:
+            if not schedule['enabled']:
+                continue
+            after = max(since, self._last_run.get(schedule['id'], since))
+            due = next_run(schedule, after)
+            if due:
+                upcoming.append((due, schedule))
+        if not upcoming:
+            return None
+        due, schedule = min(upcoming, key=lambda item: item[0])
+        return schedule, due
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            upcoming = self._next_due()
+            if upcoming is None:
+                self._wake.wait(60)
+                continue
+            schedule, due = upcoming
+            lead = due.timestamp() - time.time() - self.preload_seconds
+            if lead > 0:
+                # Re-check at least once a minute so wall-clock steps are noticed
+                self._wake.wait(min(lead, 60))
+                continue
+            self._last_run[schedule['id']] = due
+            try:
+                self._execute(schedule, due)
+            except Exception as e:
+                self.logger.error(f"Error running schedule {schedule['name']}: {e}")
+
+    def _execute(self, schedule: dict, due: datetime):
+        """Preload, wait for the deadline, start, and record the start error"""
+        run = {
+            'schedule_id': schedule['id'],
+            'name': schedule['name'],
+            'audio_file': schedule['audio_file'],
+            'due': due.isoformat(timespec='milliseconds')
+        }
+        prepared = self.event_handler.prepare_performance(schedule['audio_file'])
+        if not prepared:
+            self._record(run, 'failed', 'Invalid audio file')
+            return
+
+        # Convert the wall-clock instant to a monotonic deadline as late as possible
+        deadline = time.monotonic() + (due.timestamp() - time.time())
+        # E.g. due while the previous run was being started; a late start would go unnoticed
+        late = time.monotonic() - deadline
+        if late > self.max_late_seconds:
+            run['late_ms'] = round(late * 1000, 3)
+            self._record(run, 'late', f"Missed its start by {late * 1000:.0f}ms")
+            return
+        sleep_until(deadline)
+        run['wake_error_ms'] = round((time.monotonic() - deadline) * 1000, 3)
+        result = self.event_handler.start_prepared(schedule['audio_file'], 'schedule', deadline)
+
+        if not result.get('success'):
+            outcome = 'busy' if result.get('message') in ('Performance already active', 'In cooldown period') \
+                else 'failed'
+            self._record(run, outcome, result.get('message'))
+            return
+
+        run['performance_id'] = result['performance_id']
+        trace = self.event_handler.traces.get(result['performance_id'])
+        admitted_error = trace.elapsed('trigger', 'admitted') if trace else None
+        if admitted_error is not None:
+            run['dispatch_error_ms'] = round(admitted_error * 1000, 3)
+        # aplay is spawned on the audio worker thread, after start_prepared returns
+        audio_error = trace.wait_for_audio() if trace else None
+        if audio_error is None:
+            self._record(run, 'failed', 'Audio playback did not start')
+            return
+        START_ERROR.observe(audio_error)
+        run['audio_start_error_ms'] = round(audio_error * 1000, 3)
+        self._record(run, 'started', result.get('message'))
+
+    def _record(self, run: dict, outcome: str, message: Optional[str]):
+        run['outcome'] = outcome
+        run['message'] = message
+        self.runs.append(run)
+        RUNS.inc(outcome=outcome)
+        self.logger.info(f"Schedule {run['name']} ({run['due']}): {outcome}"
+                         + (f", audio start error {run['audio_start_error_ms']:.1f}ms"
+                            if 'audio_start_error_ms' in run else ''))
+
+    def list_schedules(self) -> List[dict]:
+        """Configured schedules with their next run time"""
+        now = datetime.now()
+        listed = []
+        for schedule in self.schedules:
+            due = next_run(schedule, max(now, self._last_run.get(schedule['id'], now))) \
+                if schedule['enabled'] else None
+            listed.append(dict(schedule, next_run=due.isoformat(timespec='seconds') if due else None))
+        return listed
+
+    def add(self, data: dict) -> dict:
+        """Validate and persist a new schedule; raises ValueError if invalid"""
+        schedule = normalize_schedule(dict(data, id=None), self.config.snapshot.audio.soundfiles_dir)
+        with self.config.transaction():
+            schedules = list(self.config.get('schedules', []) or [])
+            schedules.append(schedule)
+            self.config.set('schedules', schedules)
+        return schedule
+
+    def remove(self, schedule_id: str) -> bool:
+        with self.config.transaction():
+            schedules = list(self.config.get('schedules', []) or [])
+            remaining = [s for s in schedules if str(s.get('id')) != schedule_id]
+            if len(remaining) == len(schedules):
+                return False
+            self.config.set('schedules', remaining)
+        return True
+
+    def get_status(self) -> dict:
+        return {
+            'schedules': self.list_schedules(),
+            'runs': list(self.runs)
+        }
@@ -0,0 +1,111 @@
+"""
+Trigger Queue for Ghost Host
+===========================
+Bounded admission queue for triggers that arrive while a performance or
+cooldown is in progress. Entries expire after a TTL and duplicate triggers for
+the same clip are coalesced into a single entry.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+
+class QueuedTrigger:
+    def __init__(self, audio_file: str, source: str, duration: float, ttl: float):
+        now = time.monotonic()
+        self.audio_file = audio_file
+        self.sources = [source]
+        self.duration = duration
+        self.enqueued_at = now
+        self.expires_at = now + ttl
+
+    @property
+    def source(self) -> str:
+        """Source of the first trigger that queued this clip"""
+        return self.sources[0]
+
+    def to_dict(self, position: int) -> dict:
+        return {
+            'audio_file': self.audio_file,
+            'sources': list(self.sources),
+            'position': position,
+            'duration': self.duration,
+            'expires_in': max(0.0, self.expires_at - time.monotonic())
+        }
+
+
+class TriggerQueue:
+    def __init__(self, depth: int = 5, ttl: float = 60):
+        self.depth = depth
+        self.ttl = ttl
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # audio_file -> QueuedTrigger, in dispatch order
+        self._entries = OrderedDict()
+
+    def _purge_expired(self):
+        """Drop expired entries; caller must hold the lock"""
+        now = time.monotonic()
+        for audio_file in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            self.logger.info(f"Queued trigger for {audio_file} expired")
+            del self._entries[audio_file]
+
+    def offer(self, audio_file: str, source: str, duration: float) -> Tuple[Optional[QueuedTrigger], int, bool]:
+        """Queue a trigger, coalescing with an existing entry for the same clip.
+
+        Returns (entry, position, coalesced); entry is None when the queue is full.
+        Positions are 1-based.
+        """
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get(audio_file)
+            if entry:
+                entry.sources.append(source)
+                entry.expires_at = time.monotonic() + self.ttl
+                return entry, list(self._entries).index(audio_file) + 1, True
+            if len(self._entries) >= self.depth:
+                return None, 0, False
+            entry = QueuedTrigger(audio_file, source, duration, self.ttl)
+            self._entries[audio_file] = entry
+            return entry, len(self._entries), False
+
+    def pop_next(self) -> Optional[QueuedTrigger]:
+        """Remove and return the next live entry"""
+        with self._lock:
+            self._purge_expired()
+            if not self._entries:
+                return None
+            return self._entries.popitem(last=False)[1]
+
+    def push_front(self, entry: QueuedTrigger):
+        """Put an entry back at the head after a failed dispatch"""
+        with self._lock:
+            if entry.audio_file not in self._entries:
+                self._entries[entry.audio_file] = entry
+                self._entries.move_to_end(entry.audio_file, last=False)
+
+    def ahead_of(self, position: int) -> List[QueuedTrigger]:
+        """Entries that will be dispatched before the given position"""
+        with self._lock:
+            return list(self._entries.values())[:max(0, position - 1)]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_status(self) -> dict:
+        """Get current queue contents"""
+        with self._lock:
+            self._purge_expired()
+            entries = [e.to_dict(i + 1) for i, e in enumerate(self._entries.values())]
+        return {
+            'depth': self.depth,
+            'ttl_seconds': self.ttl,
+            'entries': entries
+        }
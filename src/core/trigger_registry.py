@@ -0,0 +1,72 @@
+"""
+Trigger Registry for Ghost Host
+==============================
+In-memory index of the configured network triggers, keyed by ID and rebuilt
+only when the config changes. Shared by the HTTP and UDP trigger listeners so
+both apply the same lookup and secret checks. Also checks tokens for the
+trigger server's management endpoints (schedules, fleet play).
+"""
+
+import hmac
+from typing import Optional, Tuple
+
+
+class TriggerRegistry:
+    def __init__(self, config):
+        self.config = config
+        self._index = {}
+        self._api_secrets = ()
+        self.rebuild(config)
+        config.subscribe(self.rebuild)
+
+    def rebuild(self, config):
+        """Swap in a fresh id -> trigger index"""
+        triggers = config.get('network_triggers', []) or []
+        self._index = {str(t.get('id')): t for t in triggers if isinstance(t, dict)}
+        secrets = [config.get('network_trigger.api_token', '') or '']
+        secrets += [t.get('secret') or '' for t in self._index.values() if t.get('enabled', True)]
+        self._api_secrets = tuple(s.strip() for s in secrets if s.strip())
+
+    def get(self, trigger_id: str) -> Optional[dict]:
+        return self._index.get(str(trigger_id))
+
+    @staticmethod
+    def secret_matches(trigger: dict, token: Optional[str]) -> bool:
+        """True if the trigger has no secret or token matches it (constant time)"""
+        secret = (trigger.get('secret') or '').strip()
+        if not secret:
+            return True
+        if not token:
+            return False
+        return hmac.compare_digest(secret.encode('utf-8'), token.strip().encode('utf-8'))
+
+    def authorize(self, trigger_id: str, *tokens: Optional[str]) -> Tuple[Optional[dict], Optional[str]]:
+        """Look up an enabled trigger and check any of the offered tokens.
+
+        Returns (trigger, None) on success, or (None, 'not_found' | 'unauthorized').
+        """
+        trigger = self.get(trigger_id)
+        if not trigger or not trigger.get('enabled', True):
+            return None, 'not_found'
+        if (trigger.get('secret') or '').strip() and not any(self.secret_matches(trigger, t) for t in tokens):
+            return None, 'unauthorized'
+        return trigger, None
+
+    def authorize_api(self, *tokens: Optional[str]) -> Optional[str]:
+        """Check a token for the management endpoints: network_trigger.api_token
+        or the secret of any enabled trigger.
+
+        Returns None on success, or 'unconfigured' (no token or secret is set,
+        so the endpoints stay closed) | 'unauthorized'.
+        """
+        if not self._api_secrets:
+            return 'unconfigured'
+        for token in tokens:
+            if token and any(hmac.compare_digest(s.encode('utf-8'), token.strip().encode('utf-8'))
+                             for s in self._api_secrets):
+                return None
+        return 'unauthorized'
+
+    def default_audio(self, trigger: dict) -> str:
+        """Clip to play for a trigger without an explicit override"""
+        return trigger.get('audio_file') or self.config.snapshot.audio.default_file
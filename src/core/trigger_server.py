@@ -2,13 +2,51 @@
 Trigger Server
 ==============
 Lightweight HTTP server to accept network trigger requests and start playback.
+Each connection is served on its own thread with HTTP/1.1 keep-alive.
+Also serves read-only diagnostics for the main process:
+
+GET /api/traces[?limit=N]   recent performance latency traces (JSON)
+GET /api/traces/chrome      the same traces in Chrome trace-event format
+GET /api/traces/summary     p50/p95/p99 trigger-to-audio and trigger-to-mouth latency
+GET /api/status             performance state, rate limiting and listener counters
+GET /api/events             Server-Sent Events stream of performance state changes
+GET /metrics                Prometheus text metrics
+
+and, when the scheduler is running, manages timed performances:
+
+GET    /api/schedules       schedules with their next run, and recent runs with start error
+POST   /api/schedules       add a schedule (JSON: audio_file, start, interval_seconds, end, name)
+DELETE /api/schedules/<id>  remove a schedule
+
+and, on the fleet leader, POST /api/fleet/play (JSON: audio_file,
+lead_seconds) starts a clip on every figure at one shared instant.
+
+Requests that change schedules or start the fleet are rate limited like
+triggers and need network_trigger.api_token or a trigger secret, as a
+bearer token or ?token=.
 """
 
 import json
+import math
 import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urlparse, parse_qs
 
+from src.core.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from src.core.event_bus import bus, sse_stream
+from src.core.trigger_registry import TriggerRegistry
+from src.core.rate_limiter import AdmissionControl
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class _Server(ThreadingHTTPServer):
+    # One daemon thread per connection; keep-alive connections stay open
+    # until the client closes them or the handler timeout expires
+    daemon_threads = True
+    request_queue_size = 128
+
 
 class TriggerServer:
     def __init__(self, event_handler, config):
@@ -16,81 +54,217 @@ class TriggerServer:
         self.config = config
         self.server = None
         self.thread = None
+        # Trigger lookups are served from memory, rebuilt on config change
+        self.triggers = TriggerRegistry(config)
+        # Token buckets per source IP and trigger, checked before any other work
+        self.admission = AdmissionControl(config)
+        # Other listeners (e.g. OSC) add a get_status() here for /api/status
+        self.status_providers = {}
+        # Set by main.py when the scheduler runs; serves /api/schedules
+        self.scheduler = None
+        # Set by main.py when fleet sync is enabled; serves /api/fleet/play
+        self.fleet = None
 
-    def _get_triggers(self):
-        # Reload config so new/updated triggers are visible without restarting main app
-        try:
-            self.config.load_config()
-        except Exception:
-            pass
-        return self.config.get('network_triggers', []) or []
-
-    def _find_trigger(self, trigger_id: str):
-        for t in self._get_triggers():
-            if str(t.get('id')) == str(trigger_id):
-                return t
-        return None
+    def get_status(self) -> dict:
+        """Cheap status: no amixer or file listing, safe to poll"""
+        snapshot = self.event_handler.state.snapshot
+        status = {
+            'performance_state': snapshot.state.value,
+            'performance_id': snapshot.performance_id,
+            'cooldown_active': snapshot.in_cooldown,
+            'rate_limit': self.admission.get_status()
+        }
+        for name, provider in self.status_providers.items():
+            status[name] = provider()
+        return status
 
     def _make_handler(self):
         outer = self
+        request_timeout = float(self.config.get('network_trigger.request_timeout', 10))
 
         class Handler(BaseHTTPRequestHandler):
-            def _json_response(self, code: int, payload: dict):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle on, the body would
+            # wait for the client's delayed ACK (~40 ms) on every keep-alive request
+            disable_nagle_algorithm = True
+            # Socket timeout: an idle or stalled client only ties up its own thread
+            timeout = request_timeout
+
+            def _json_response(self, code: int, payload: dict, headers: dict = None):
+                data = json.dumps(payload).encode('utf-8')
                 self.send_response(code)
                 self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _text_response(self, code: int, body: str, content_type: str):
+                data = body.encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
                 self.end_headers()
-                self.wfile.write(json.dumps(payload).encode('utf-8'))
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == '/metrics':
+                    return self._text_response(200, metrics.render(), METRICS_CONTENT_TYPE)
+                if parsed.path == '/api/status':
+                    return self._json_response(200, outer.get_status())
+                if parsed.path == '/api/events':
+                    return self._event_stream()
+                if parsed.path == '/api/schedules' and outer.scheduler:
+                    return self._json_response(200, outer.scheduler.get_status())
+                traces = outer.event_handler.traces
+                if parsed.path == '/api/traces':
+                    q = parse_qs(parsed.query)
+                    try:
+                        limit = int(q['limit'][0]) if 'limit' in q else None
+                    except ValueError:
+                        return self._json_response(400, {'success': False, 'message': 'Invalid limit'})
+                    return self._json_response(200, {'traces': traces.recent(limit)})
+                if parsed.path == '/api/traces/chrome':
+                    return self._json_response(200, traces.chrome_trace())
+                if parsed.path == '/api/traces/summary':
+                    return self._json_response(200, traces.summary())
+                return self._json_response(404, {'success': False, 'message': 'Not found'})
+
+            def _event_stream(self):
+                """Stream bus events until the client goes away; holds this connection's thread"""
+                last_id = self.headers.get('Last-Event-ID')
+                subscription = bus.subscribe(last_event_id=int(last_id) if last_id and last_id.isdigit() else None)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                stream = sse_stream(subscription)
+                try:
+                    for chunk in stream:
+                        self.wfile.write(chunk)
+                        self.wfile.flush()
+                except OSError:
+                    pass
+                finally:
+                    stream.close()
+
+            def _tokens(self, parsed) -> tuple:
+                """Bearer header and ?token= query value, either possibly None"""
+                auth_header = self.headers.get('Authorization', '')
+                bearer = auth_header[len('Bearer '):] if auth_header.startswith('Bearer ') else None
+                return bearer, parse_qs(parsed.query).get('token', [None])[0]
+
+            def _rate_limited(self, key: str) -> bool:
+                """Apply admission control for key; sends the 429 and returns True if refused"""
+                allowed, retry_after, scope = outer.admission.check(key, self.client_address[0])
+                if allowed:
+                    return False
+                self._json_response(
+                    429, {'success': False, 'message': 'Too many requests', 'limit': scope,
+                          'retry_after': round(retry_after, 3)},
+                    {'Retry-After': str(max(1, math.ceil(retry_after)))}
+                )
+                return True
+
+            def _refuse_api(self, parsed, key: str) -> bool:
+                """Rate-limit and authenticate a management request; sends the error and
+                returns True if it is refused"""
+                if self._rate_limited(key):
+                    return True
+                error = outer.triggers.authorize_api(*self._tokens(parsed))
+                if error == 'unconfigured':
+                    self._json_response(403, {'success': False, 'message':
+                                              'Set network_trigger.api_token or a trigger secret to use this endpoint'})
+                    return True
+                if error:
+                    self._json_response(401, {'success': False, 'message': 'Unauthorized'})
+                    return True
+                return False
+
+            def _read_body(self):
+                """Read the request body so the connection can be reused; None if too large"""
+                length = int(self.headers.get('Content-Length', 0) or 0)
+                if length > MAX_BODY_BYTES:
+                    self.close_connection = True
+                    return None
+                return self.rfile.read(length) if length > 0 else b''
 
             def do_POST(self):
+                received_at = time.monotonic()
+                body = self._read_body()
+                if body is None:
+                    return self._json_response(413, {'success': False, 'message': 'Request body too large'})
                 parsed = urlparse(self.path)
                 parts = parsed.path.strip('/').split('/')
 
-                # Accept only /api/trigger/<id>/play
+                if parsed.path == '/api/schedules' and outer.scheduler:
+                    if self._refuse_api(parsed, 'api:schedules'):
+                        return
+                    try:
+                        schedule = outer.scheduler.add(json.loads(body.decode('utf-8') or '{}'))
+                    except (ValueError, AttributeError) as e:
+                        return self._json_response(400, {'success': False, 'message': str(e)})
+                    return self._json_response(201, {'success': True, 'schedule': schedule})
+
+                if parsed.path == '/api/fleet/play' and outer.fleet:
+                    if self._refuse_api(parsed, 'api:fleet'):
+                        return
+                    try:
+                        data = json.loads(body.decode('utf-8') or '{}')
+                        result = outer.fleet.play(data.get('audio_file') or outer.config.snapshot.audio.default_file,
+                                                  data.get('lead_seconds'))
+                    except (ValueError, AttributeError, TypeError) as e:
+                        return self._json_response(400, {'success': False, 'message': str(e)})
+                    return self._json_response(202 if result['success'] else 409, result)
+
+                # Otherwise accept only /api/trigger/<id>/play
                 if not (len(parts) == 4 and parts[0] == 'api' and parts[1] == 'trigger' and parts[3] == 'play'):
                     return self._json_response(404, {'success': False, 'message': 'Not found'})
 
-                trigger_id = parts[2]
-                trigger = outer._find_trigger(trigger_id)
-                if not trigger or not trigger.get('enabled', True):
-                    return self._json_response(404, {'success': False, 'message': 'Trigger not found'})
+                if self._rate_limited(parts[2]):
+                    return
 
                 # Auth via bearer header or token query
-                secret = (trigger.get('secret') or '').strip()
-                if secret:
-                    auth_ok = False
-                    auth_header = self.headers.get('Authorization', '')
-                    if auth_header.startswith('Bearer '):
-                        token = auth_header[len('Bearer '):].strip()
-                        if token == secret:
-                            auth_ok = True
-                    if not auth_ok:
-                        # check query param
-                        q = parse_qs(parsed.query)
-                        if 'token' in q and q['token'][0] == secret:
-                            auth_ok = True
-                    if not auth_ok:
-                        return self._json_response(401, {'success': False, 'message': 'Unauthorized'})
-
-                # Read optional body to override audio_file
-                length = int(self.headers.get('Content-Length', 0) or 0)
+                trigger, error = outer.triggers.authorize(parts[2], *self._tokens(parsed))
+                if error == 'not_found':
+                    return self._json_response(404, {'success': False, 'message': 'Trigger not found'})
+                if error == 'unauthorized':
+                    return self._json_response(401, {'success': False, 'message': 'Unauthorized'})
+
+                # Optional body to override audio_file
                 audio_override = None
-                if length > 0:
+                if body:
                     try:
-                        body = self.rfile.read(length)
-                        data = json.loads(body.decode('utf-8'))
-                        audio_override = data.get('audio_file')
+                        audio_override = json.loads(body.decode('utf-8')).get('audio_file')
                     except Exception:
                         pass
 
-                audio_file = audio_override or trigger.get('audio_file') or outer.config.get('audio.default_file')
+                audio_file = audio_override or outer.triggers.default_audio(trigger)
 
-                result = outer.event_handler.trigger_network_performance(audio_file)
+                result = outer.event_handler.trigger_network_performance(audio_file, received_at)
                 if result.get('success'):
-                    return self._json_response(200, result)
+                    return self._json_response(202 if result.get('queued') else 200, result)
                 msg = result.get('message', 'Busy')
                 code = 409 if msg in ('Performance already active', 'In cooldown period') else 400
                 return self._json_response(code, result)
 
+            def do_DELETE(self):
+                if self._read_body() is None:
+                    return self._json_response(413, {'success': False, 'message': 'Request body too large'})
+                parsed = urlparse(self.path)
+                parts = parsed.path.strip('/').split('/')
+                if len(parts) == 3 and parts[:2] == ['api', 'schedules'] and outer.scheduler:
+                    if self._refuse_api(parsed, 'api:schedules'):
+                        return
+                    if outer.scheduler.remove(parts[2]):
+                        return self._json_response(200, {'success': True})
+                    return self._json_response(404, {'success': False, 'message': 'Schedule not found'})
+                return self._json_response(404, {'success': False, 'message': 'Not found'})
+
             def log_message(self, format, *args):
                 # Silence default logging; integrate with main logs if desired
                 return
@@ -100,7 +274,7 @@ class TriggerServer:
     def start(self):
         settings = self.config.get('network_trigger', {})
         port = int(settings.get('port', 5055))
-        self.server = HTTPServer(('0.0.0.0', port), self._make_handler())
+        self.server = _Server(('0.0.0.0', port), self._make_handler())
         self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
         self.thread.start()
         return True
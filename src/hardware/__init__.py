@@ -3,7 +3,20 @@ Hardware modules for Ghost Host
 ==============================
 """
 
-from .sensor_manager import SensorManager, SensorType
-from .motor_controller import MotorController  
-from .audio_controller import AudioController
-from .led_controller import LEDController 
\ No newline at end of file
+import importlib
+
+# Imported on first use so each process only pays for the controllers it needs
+_EXPORTS = {
+    'SensorManager': 'sensor_manager',
+    'SensorType': 'sensor_manager',
+    'MotorController': 'motor_controller',
+    'AudioController': 'audio_controller',
+    'LEDController': 'led_controller',
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f'.{module}', __name__), name)
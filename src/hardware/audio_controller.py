@@ -16,13 +16,15 @@ from typing import Optional, Callable
 class AudioController:
     def __init__(self, config):
         self.config = config
-        self.audio_settings = config.get_audio_settings()
         self.logger = logging.getLogger(__name__)
         
-        # Audio state tracking
+        # Audio state tracking; is_playing is only claimed under the lock
+        self._play_lock = threading.Lock()
         self.is_playing = False
         self.current_audio_thread = None
-        self.playback_complete_callback = None
+        
+        # audio path -> (mtime_ns, size, duration), so triggers skip re-reading WAV headers
+        self._duration_cache = {}
         
         self.logger.info("Audio Controller initialized")
     
@@ -64,33 +66,32 @@ class AudioController:
                     if start > 0 and end > start:
                         return int(line[start:end])
             
-            return self.audio_settings.get('volume', 80)
+            return self.config.snapshot.audio.volume
             
         except (subprocess.CalledProcessError, ValueError) as e:
             self.logger.error(f"Error getting volume: {e}")
-            return self.audio_settings.get('volume', 80)
+            return self.config.snapshot.audio.volume
     
-    def play_audio_file(self, filename: str, completion_callback: Optional[Callable] = None) -> bool:
+    def play_audio_file(self, filename: str, completion_callback: Optional[Callable] = None, trace=None) -> bool:
         """Play audio file with optional completion callback using aplay subprocess"""
-        if self.is_playing:
-            self.logger.warning("Audio already playing, ignoring new request")
-            return False
-        
         # Build full path to audio file
-        soundfiles_dir = self.audio_settings.get('soundfiles_dir', 'SoundFiles')
+        soundfiles_dir = self.config.snapshot.audio.soundfiles_dir
         audio_path = Path(soundfiles_dir) / filename
         
         if not audio_path.exists():
             self.logger.error(f"Audio file not found: {audio_path}")
             return False
         
-        self.is_playing = True
-        self.playback_complete_callback = completion_callback
+        with self._play_lock:
+            if self.is_playing:
+                self.logger.warning("Audio already playing, ignoring new request")
+                return False
+            self.is_playing = True
         
         # Start playback in a separate thread
         self.current_audio_thread = threading.Thread(
             target=self._play_audio_worker,
-            args=(str(audio_path),),
+            args=(str(audio_path), completion_callback, trace),
             daemon=True
         )
         self.current_audio_thread.start()
@@ -98,29 +99,39 @@ class AudioController:
         self.logger.info(f"Started playing audio: {filename}")
         return True
     
-    def _play_audio_worker(self, audio_path: str):
+    def _play_audio_worker(self, audio_path: str, completion_callback: Optional[Callable] = None, trace=None):
         """Worker thread for audio playback using aplay subprocess"""
         try:
-            result = subprocess.run(['aplay', audio_path], capture_output=True, text=True)
-            if result.returncode == 0:
+            process = subprocess.Popen(['aplay', audio_path], stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.PIPE, text=True)
+            if trace:
+                trace.mark('aplay_spawn')
+            _, stderr = process.communicate()
+            if trace:
+                trace.mark('audio_end')
+            if process.returncode == 0:
                 self.logger.info(f"Audio playback completed: {audio_path}")
             else:
-                self.logger.error(f"aplay failed: {result.stderr}")
+                self.logger.error(f"aplay failed: {stderr}")
         except Exception as e:
             self.logger.error(f"Error playing audio {audio_path}: {e}")
+            if trace:
+                trace.mark('audio_error')
         finally:
-            self.is_playing = False
-            if self.playback_complete_callback:
+            with self._play_lock:
+                self.is_playing = False
+            if completion_callback:
                 try:
-                    self.playback_complete_callback()
+                    completion_callback()
                 except Exception as e:
                     self.logger.error(f"Error in playback completion callback: {e}")
-            self.playback_complete_callback = None
     
     def stop_audio(self):
         """Stop current audio playback"""
-        if self.is_playing:
+        with self._play_lock:
+            was_playing = self.is_playing
             self.is_playing = False
+        if was_playing:
             # Note: pydub doesn't provide easy way to stop playback
             # In a production system, you might want to use a different audio library
             self.logger.info("Audio stop requested")
@@ -128,26 +139,52 @@ class AudioController:
     def get_audio_duration(self, filename: str) -> Optional[float]:
         """Get duration of audio file in seconds using wave module"""
         try:
-            soundfiles_dir = self.audio_settings.get('soundfiles_dir', 'SoundFiles')
+            soundfiles_dir = self.config.snapshot.audio.soundfiles_dir
             audio_path = Path(soundfiles_dir) / filename
             
-            if not audio_path.exists():
+            try:
+                stat = audio_path.stat()
+            except FileNotFoundError:
                 self.logger.error(f"Audio file not found: {audio_path}")
                 return None
             
+            cached = self._duration_cache.get(str(audio_path))
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                return cached[2]
+            
             with wave.open(str(audio_path), 'rb') as wf:
                 frames = wf.getnframes()
                 rate = wf.getframerate()
                 duration = frames / float(rate)
+            self._duration_cache[str(audio_path)] = (stat.st_mtime_ns, stat.st_size, duration)
             return duration
         except Exception as e:
             self.logger.error(f"Error getting audio duration for {filename}: {e}")
             return None
     
+    def preload(self, filename: str) -> bool:
+        """Read the clip once so aplay finds it in the page cache at a timed start"""
+        audio_path = Path(self.config.snapshot.audio.soundfiles_dir) / filename
+        try:
+            with open(audio_path, 'rb') as f:
+                while f.read(1 << 20):
+                    pass
+            return True
+        except OSError as e:
+            self.logger.error(f"Error preloading {filename}: {e}")
+            return False
+    
+    def warm_cache(self) -> int:
+        """Read the duration of every audio file ahead of the first trigger"""
+        files = self.list_audio_files()
+        for filename in files:
+            self.get_audio_duration(filename)
+        return len(files)
+    
     def list_audio_files(self) -> list:
         """List all available audio files"""
         try:
-            soundfiles_dir = self.audio_settings.get('soundfiles_dir', 'SoundFiles')
+            soundfiles_dir = self.config.snapshot.audio.soundfiles_dir
             audio_dir = Path(soundfiles_dir)
             
             if not audio_dir.exists():
@@ -168,7 +205,7 @@ class AudioController:
     def upload_audio_file(self, file_data: bytes, filename: str) -> bool:
         """Upload new audio file"""
         try:
-            soundfiles_dir = self.audio_settings.get('soundfiles_dir', 'SoundFiles')
+            soundfiles_dir = self.config.snapshot.audio.soundfiles_dir
             audio_dir = Path(soundfiles_dir)
             audio_dir.mkdir(exist_ok=True)
             
@@ -192,7 +229,7 @@ class AudioController:
     def delete_audio_file(self, filename: str) -> bool:
         """Delete audio file"""
         try:
-            soundfiles_dir = self.audio_settings.get('soundfiles_dir', 'SoundFiles')
+            soundfiles_dir = self.config.snapshot.audio.soundfiles_dir
             audio_path = Path(soundfiles_dir) / filename
             
             if not audio_path.exists():
@@ -221,7 +258,7 @@ class AudioController:
     def get_audio_info(self, filename: str) -> Optional[dict]:
         """Get information about audio file"""
         try:
-            soundfiles_dir = self.audio_settings.get('soundfiles_dir', 'SoundFiles')
+            soundfiles_dir = self.config.snapshot.audio.soundfiles_dir
             audio_path = Path(soundfiles_dir) / filename
             
             if not audio_path.exists():
@@ -256,6 +293,6 @@ class AudioController:
             'is_playing': self.is_playing,
             'volume': self.get_volume(),
             'available_files': self.list_audio_files(),
-            'default_file': self.audio_settings.get('default_file', ''),
-            'soundfiles_dir': self.audio_settings.get('soundfiles_dir', 'SoundFiles')
+            'default_file': self.config.snapshot.audio.default_file,
+            'soundfiles_dir': self.config.snapshot.audio.soundfiles_dir
         } 
\ No newline at end of file
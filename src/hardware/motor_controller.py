@@ -11,19 +11,29 @@ import logging
 import json
 from pathlib import Path
 from typing import Optional, Dict, Any
+from src.core.metrics import metrics, JITTER_BUCKETS
+
+SCHEDULE_JITTER = metrics.histogram('ghosthost_schedule_jitter_seconds',
+                                    'How late timed loops wake up relative to schedule',
+                                    ['loop'], buckets=JITTER_BUCKETS)
 
 class MotorController:
     def __init__(self, config):
         self.config = config
         self.gpio_pins = config.get_gpio_pins()
-        self.motor_settings = config.get_motor_settings()
         self.logger = logging.getLogger(__name__)
         
-        # Motor state tracking
+        # Motor state tracking; each movement gets a run id so timers from an
+        # earlier run cannot stop a newer one
+        self._run_lock = threading.Lock()
+        self._run_id = 0
         self.motors_running = False
         self.mouth_thread = None
         self.head_torso_thread = None
         
+        # timestamp file path -> (mtime_ns, word entries)
+        self._timestamp_cache = {}
+        
         self.setup_gpio()
         self.logger.info("Motor Controller initialized")
     
@@ -47,13 +57,16 @@ class MotorController:
         
         self.logger.info("GPIO configured for motors")
     
-    def start_synchronized_movement(self, audio_duration: float, audio_file: str, sensor_type: str = None):
+    def start_synchronized_movement(self, audio_duration: float, audio_file: str, sensor_type: str = None, trace=None):
         """Start synchronized motor movements with audio playback"""
-        if self.motors_running:
-            self.logger.warning("Motors already running, ignoring new request")
-            return
+        with self._run_lock:
+            if self.motors_running:
+                self.logger.warning("Motors already running, ignoring new request")
+                return
+            self.motors_running = True
+            self._run_id += 1
+            run_id = self._run_id
         
-        self.motors_running = True
         self.logger.info(f"Starting synchronized movement for {audio_duration} seconds")
         
         # Get timestamps for mouth movement
@@ -63,13 +76,13 @@ class MotorController:
         if timestamps:
             self.mouth_thread = threading.Thread(
                 target=self._animate_mouth,
-                args=(timestamps,),
+                args=(timestamps, run_id, trace),
                 daemon=True
             )
             self.mouth_thread.start()
         
         # Start head/torso movement thread
-        head_torso_duration = self.motor_settings.get('head_torso_duration', 0)
+        head_torso_duration = self.config.snapshot.motors.head_torso_duration
         if head_torso_duration == 0:
             head_torso_duration = audio_duration  # Run for full audio duration
         
@@ -83,39 +96,60 @@ class MotorController:
         # Start a thread to stop motors after audio ends
         threading.Thread(
             target=self._stop_motors_after_delay,
-            args=(audio_duration,),
+            args=(audio_duration, run_id),
             daemon=True
         ).start()
     
     def _load_audio_timestamps(self, audio_file: str) -> Optional[list]:
         """Load word timestamps for mouth animation"""
         try:
-            soundfiles_dir = self.config.get('audio.soundfiles_dir', 'SoundFiles')
+            soundfiles_dir = self.config.snapshot.audio.soundfiles_dir
             timestamp_file = audio_file.replace('.wav', '_timestamps.json')
             timestamp_path = Path(soundfiles_dir) / timestamp_file
             
-            if timestamp_path.exists():
-                with open(timestamp_path, 'r') as f:
-                    data = json.load(f)
-                # Elevenlabs format: top-level 'words' list, filter for type == 'word'
-                words = data.get('words', [])
-                word_entries = [w for w in words if w.get('type') == 'word']
-                return word_entries
-            else:
+            try:
+                mtime = timestamp_path.stat().st_mtime_ns
+            except FileNotFoundError:
                 self.logger.warning(f"Timestamp file not found: {timestamp_path}")
                 return None
+            
+            cached = self._timestamp_cache.get(str(timestamp_path))
+            if cached and cached[0] == mtime:
+                return cached[1]
+            
+            with open(timestamp_path, 'r') as f:
+                data = json.load(f)
+            # Elevenlabs format: top-level 'words' list, filter for type == 'word'
+            words = data.get('words', [])
+            word_entries = [w for w in words if w.get('type') == 'word']
+            self._timestamp_cache[str(timestamp_path)] = (mtime, word_entries)
+            return word_entries
         except Exception as e:
             self.logger.error(f"Error loading timestamps: {e}")
             return None
     
-    def _animate_mouth(self, timestamps: list):
+    def warm_cache(self, audio_files: list) -> int:
+        """Parse the mouth timestamps for the given clips ahead of the first trigger"""
+        soundfiles_dir = Path(self.config.snapshot.audio.soundfiles_dir)
+        loaded = 0
+        for audio_file in audio_files:
+            if (soundfiles_dir / audio_file.replace('.wav', '_timestamps.json')).exists():
+                loaded += 1 if self._load_audio_timestamps(audio_file) else 0
+        return loaded
+    
+    def _is_current_run(self, run_id: int) -> bool:
+        """True while the given movement run is still the active one"""
+        return self.motors_running and self._run_id == run_id
+    
+    def _animate_mouth(self, timestamps: list, run_id: int, trace=None):
         """Animate mouth based on word timestamps"""
         start_time = time.time()
-        mouth_open_duration = self.motor_settings.get('mouth_open_duration', 0.1)
-        mouth_close_delay = self.motor_settings.get('mouth_close_delay', 0.05)
+        settings = self.config.snapshot.motors
+        mouth_open_duration = settings.mouth_open_duration
+        mouth_close_delay = settings.mouth_close_delay
         
         for word in timestamps:
-            if not self.motors_running:
+            if not self._is_current_run(run_id):
                 break
                 
             word_start = word['start']
@@ -126,12 +160,16 @@ class MotorController:
             sleep_time = word_start - current_time
             if sleep_time > 0:
                 time.sleep(sleep_time)
+                SCHEDULE_JITTER.observe(max(0.0, time.time() - start_time - word_start), loop='mouth')
             
-            if not self.motors_running:
+            if not self._is_current_run(run_id):
                 break
             
             # Open mouth
             self._mouth_open()
+            if trace:
+                trace.mark('first_mouth_open')
+                trace = None
             
             # Keep mouth open for word duration or minimum duration
             word_duration = word_end - word_start
@@ -144,8 +182,9 @@ class MotorController:
             # Brief pause between words
             time.sleep(mouth_close_delay)
         
-        # Ensure mouth is closed at the end
-        self._mouth_close()
+        # Ensure mouth is closed at the end (unless a newer run owns it)
+        if self._run_id == run_id:
+            self._mouth_close()
     
     def _animate_head_torso(self, duration: float, sensor_type: str = None):
         """Animate head and torso movements"""
@@ -185,14 +224,16 @@ class MotorController:
         GPIO.output(self.gpio_pins['motor_torso_in1'], GPIO.LOW)
         GPIO.output(self.gpio_pins['motor_torso_in2'], GPIO.LOW)
     
-    def _stop_motors_after_delay(self, delay: float):
+    def _stop_motors_after_delay(self, delay: float, run_id: int):
         """Stop all motors after specified delay"""
         time.sleep(delay)
-        self.stop_all_motors()
+        if self._is_current_run(run_id):
+            self.stop_all_motors()
     
     def stop_all_motors(self):
         """Stop all motors immediately"""
-        self.motors_running = False
+        with self._run_lock:
+            self.motors_running = False
         
         # Stop all motor outputs
         self._mouth_close()
@@ -257,7 +298,7 @@ class MotorController:
             'motors_running': self.motors_running,
             'mouth_active': self.mouth_thread and self.mouth_thread.is_alive(),
             'head_torso_active': self.head_torso_thread and self.head_torso_thread.is_alive(),
-            'settings': self.motor_settings
+            'settings': self.config.get_motor_settings()
         }
     
     def cleanup(self):
@@ -10,6 +10,11 @@ import threading
 import logging
 from typing import Callable, Optional
 from enum import Enum
+from src.core.metrics import metrics, JITTER_BUCKETS
+
+SCHEDULE_JITTER = metrics.histogram('ghosthost_schedule_jitter_seconds',
+                                    'How late timed loops wake up relative to schedule',
+                                    ['loop'], buckets=JITTER_BUCKETS)
 
 class SensorType(Enum):
     SENSOR_PORT_LEFT = "sensor_port_left"
@@ -19,14 +24,11 @@ class SensorManager:
     def __init__(self, config, event_callback: Optional[Callable] = None):
         self.config = config
         self.gpio_pins = config.get_gpio_pins()
-        self.sensor_settings = config.get_sensor_settings()
         self.event_callback = event_callback
         self.logger = logging.getLogger(__name__)
         
-        # State tracking
+        # State tracking (cooldown is owned by the event handler's state machine)
         self.last_trigger_time = {}
-        self.in_cooldown = False
-        self.cooldown_end_time = 0
         
         # Button hold detection for AP mode
         self.button_press_start = None
@@ -59,9 +61,10 @@ class SensorManager:
 
     def _poll_sensors(self):
         """Background thread to poll sensor pins and detect rising edges"""
-        poll_interval = self.sensor_settings.get('poll_interval', 0.02)  # 20ms default
         sensor_pins = ['sensor_port_left', 'sensor_port_right']
+        next_poll = time.monotonic()
         while self._polling:
+            SCHEDULE_JITTER.observe(max(0.0, time.monotonic() - next_poll), loop='sensor_poll')
             for pin_name in sensor_pins:
                 pin = self.gpio_pins.get(pin_name)
                 if not pin:
@@ -70,22 +73,20 @@ class SensorManager:
                 last_state = self._last_pin_state.get(pin_name, 0)
                 # Detect rising edge (LOW to HIGH)
                 if last_state == 0 and state == 1:
-                    self._sensor_triggered(pin_name)
+                    self._sensor_triggered(pin_name, time.monotonic())
                 self._last_pin_state[pin_name] = state
+            # Read from the snapshot each pass so a config change applies without a restart
+            poll_interval = self.config.snapshot.sensors.poll_interval
+            next_poll = time.monotonic() + poll_interval
             time.sleep(poll_interval)
     
-    def _sensor_triggered(self, sensor_name: str):
-        """Handle sensor trigger with debouncing and cooldown logic"""
+    def _sensor_triggered(self, sensor_name: str, edge_time: Optional[float] = None):
+        """Handle sensor trigger with debouncing logic"""
         current_time = time.time()
         
-        # Check if we're in cooldown period
-        if self.in_cooldown and current_time < self.cooldown_end_time:
-            self.logger.debug(f"Sensor {sensor_name} triggered during cooldown, ignoring")
-            return
-        
         # Additional debouncing check
         last_trigger = self.last_trigger_time.get(sensor_name, 0)
-        debounce_time = self.sensor_settings.get('debounce_time', 0.2)
+        debounce_time = self.config.snapshot.sensors.debounce_time
         
         if current_time - last_trigger < debounce_time:
             self.logger.debug(f"Sensor {sensor_name} debounce, ignoring")
@@ -95,10 +96,10 @@ class SensorManager:
         self.last_trigger_time[sensor_name] = current_time
         
         # All sensors are treated the same now
-        self._trigger_event(sensor_name)
+        self._trigger_event(sensor_name, edge_time)
     
-    def _trigger_event(self, sensor_name: str):
-        """Trigger the main event and start cooldown"""
+    def _trigger_event(self, sensor_name: str, edge_time: Optional[float] = None):
+        """Trigger the main event"""
         self.logger.info(f"Sensor triggered: {sensor_name}")
         
         # Map sensor name to sensor type
@@ -110,40 +111,7 @@ class SensorManager:
         sensor_type = sensor_type_map.get(sensor_name)
         
         if self.event_callback and sensor_type:
-            self.event_callback('sensor_triggered', sensor_type)
-    
-    def start_cooldown(self):
-        """Start the cooldown period after audio playback"""
-        cooldown_duration = self.sensor_settings.get('cooldown_period', 30)
-        self.cooldown_end_time = time.time() + cooldown_duration
-        self.in_cooldown = True
-        
-        self.logger.info(f"Cooldown started for {cooldown_duration} seconds")
-        
-        # Start a thread to end cooldown
-        threading.Thread(
-            target=self._end_cooldown_timer,
-            args=(cooldown_duration,),
-            daemon=True
-        ).start()
-    
-    def _end_cooldown_timer(self, duration: float):
-        """End cooldown after specified duration"""
-        time.sleep(duration)
-        self.in_cooldown = False
-        self.logger.info("Cooldown period ended")
-    
-    def is_in_cooldown(self) -> bool:
-        """Check if currently in cooldown period"""
-        if self.in_cooldown and time.time() >= self.cooldown_end_time:
-            self.in_cooldown = False
-        return self.in_cooldown
-    
-    def force_end_cooldown(self):
-        """Force end the cooldown period"""
-        self.in_cooldown = False
-        self.cooldown_end_time = 0
-        self.logger.info("Cooldown period force ended")
+            self.event_callback('sensor_triggered', sensor_type, edge_time)
     
     def get_sensor_status(self) -> dict:
         """Get current status of all sensors"""
@@ -166,11 +134,6 @@ class SensorManager:
                         'error': str(e)
                     }
         
-        status['cooldown'] = {
-            'active': self.in_cooldown,
-            'end_time': self.cooldown_end_time
-        }
-        
         return status
     
     def cleanup(self):
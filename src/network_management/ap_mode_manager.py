@@ -2,22 +2,65 @@ import RPi.GPIO as GPIO
 import time
 import subprocess
 import logging
+import threading
 import shlex # For quoting arguments if needed, though direct list is often safer
 
+import sys
+from pathlib import Path
+
+try:
+    from . import nm_dbus
+    from .link_monitor import LinkMonitor
+except ImportError:
+    import nm_dbus  # Run directly as a script
+    from link_monitor import LinkMonitor
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # GPIO settings
 AP_MODE_SWITCH_PIN = 21
 PRESS_DURATION_FOR_AP_MODE = 10  # seconds
+CONNECT_TIMEOUT = 45  # seconds nmcli waits for a client connection to activate
+BUTTON_BOUNCE_MS = 50  # edge events closer together than this are switch bounce
+BUTTON_SETTLE_SECONDS = BUTTON_BOUNCE_MS / 1000 + 0.01  # the level is read once bouncing is over
+AP_CHECK_INTERVAL = 15  # seconds between checks that AP mode is still active
 
 # NetworkManager settings
 AP_CONNECTION_NAME = "GhostHostAP"  # Name for the AP connection profile in NetworkManager
 AP_SSID = "GhostHost_Setup"
 AP_IP_ADDRESS = "192.168.4.1/24"  # Static IP for the Pi in AP mode
 AP_INTERFACE_NAME = "wlan0" # Typically wlan0 for Raspberry Pi Wi-Fi
+AP_PASSWORD = "ghosthost"
+AP_ACTIVATION_TIMEOUT = 30  # seconds nmcli waits for the AP to come up
 NMCLI_CMD = ["sudo", "nmcli"] # Centralize sudo and nmcli command
 
+# Queries use NetworkManager's D-Bus API when available (see nm_dbus.py); retry this often after a failure
+DBUS_RETRY_SECONDS = 60
+# NM_DEVICE_STATE_PREPARE; states from here up to activated mean a connection is on its way
+NM_DEVICE_STATE_PREPARE = 40
+# NM_DEVICE_STATE_DEACTIVATING; seen when a switch takes the old connection down
+NM_DEVICE_STATE_DEACTIVATING = 110
+
+# The AP profile is created once at boot and left dormant, so activation is a single
+# `connection up`. A fixed channel spares the hotspot a channel survey on every start.
+AP_PROFILE_SETTINGS = [
+    ("connection.interface-name", AP_INTERFACE_NAME),
+    ("connection.autoconnect", "no"),  # Only the button (or link monitor) brings it up
+    ("802-11-wireless.ssid", AP_SSID),
+    ("802-11-wireless.mode", "ap"),
+    ("802-11-wireless.band", "bg"),
+    ("802-11-wireless.channel", "6"),
+    ("ipv4.method", "shared"),  # Provides DHCP to clients
+    ("ipv4.addresses", AP_IP_ADDRESS),
+    ("802-11-wireless-security.key-mgmt", "wpa-psk"),
+    ("802-11-wireless-security.psk", AP_PASSWORD),
+]
+_ap_profile_ready = False
+
+# Timing of the last AP activation, in ms
+LAST_AP_ACTIVATION = None
+
 # Store the last known client Wi-Fi connection
 LAST_CLIENT_CONNECTION_UUID = None
 LAST_CLIENT_CONNECTION_NAME = None
@@ -38,8 +81,44 @@ def _run_nmcli_command(args_list, check=True):
         logging.error(f"CalledProcessError for nmcli command {' '.join(args_list)}: {e.stderr.strip() or e.stdout.strip()}")
         raise # Re-raise
 
+_dbus_client = None
+_dbus_failed_at = None
+
+def _dbus():
+    """The shared NetworkManager D-Bus client, or None to use nmcli."""
+    global _dbus_client, _dbus_failed_at
+    if _dbus_client is None and (_dbus_failed_at is None or time.monotonic() - _dbus_failed_at > DBUS_RETRY_SECONDS):
+        _dbus_client = nm_dbus.open_client()
+        _dbus_failed_at = None if _dbus_client else time.monotonic()
+    return _dbus_client
+
+def is_ap_active():
+    """Checks whether the AP connection is active on the AP interface."""
+    client = _dbus()
+    if client:
+        try:
+            return any(c['name'] == AP_CONNECTION_NAME and AP_INTERFACE_NAME in c['devices']
+                       for c in client.active_connections())
+        except nm_dbus.NMDBusError as e:
+            logging.warning(f"D-Bus query failed, using nmcli: {e}")
+    result = _run_nmcli_command(["-t", "-f", "NAME,DEVICE", "connection", "show", "--active"], check=False)
+    if result.returncode == 0:
+        for line in result.stdout.strip().split('\n'):
+            if AP_CONNECTION_NAME in line and AP_INTERFACE_NAME in line:
+                return True
+    return False
+
 def get_active_wifi_connection():
     """Gets the name and UUID of the current active Wi-Fi connection."""
+    client = _dbus()
+    if client:
+        try:
+            for conn in client.active_connections():
+                if conn['type'] == nm_dbus.WIFI_CONNECTION_TYPE and conn['name'] != AP_CONNECTION_NAME:
+                    return conn['name'], conn['uuid']
+            return None, None
+        except nm_dbus.NMDBusError as e:
+            logging.warning(f"D-Bus query failed, using nmcli: {e}")
     try:
         # No check=True here, as we parse output and handle no active connection gracefully
         result = _run_nmcli_command(["-t", "-f", "NAME,UUID,TYPE", "connection", "show", "--active"], check=False)
@@ -58,65 +137,139 @@ def get_active_wifi_connection():
         logging.error(f"Exception in get_active_wifi_connection: {e}")
     return None, None
 
+def get_link_state():
+    """State of the AP interface for the link monitor: 'connected', 'connecting',
+    'disconnected' or 'ap', with the active connection's name."""
+    client = _dbus()
+    if client:
+        try:
+            device = client.device_status(AP_INTERFACE_NAME)
+            state, connection = device['state'], device['connection']
+        except nm_dbus.NMDBusError as e:
+            logging.warning(f"D-Bus query failed, using nmcli: {e}")
+            client = None
+    if not client:
+        result = _run_nmcli_command(["-t", "-f", "GENERAL.STATE,GENERAL.CONNECTION", "device", "show",
+                                     AP_INTERFACE_NAME], check=False)
+        fields = dict(line.split(':', 1) for line in result.stdout.strip().split('\n') if ':' in line)
+        try:
+            state = int(fields.get('GENERAL.STATE', '0').split()[0])
+        except (ValueError, IndexError):
+            state = 0
+        connection = fields.get('GENERAL.CONNECTION') or None
+    if connection == AP_CONNECTION_NAME:
+        return {'state': 'ap', 'connection': connection}
+    if state == nm_dbus.DEVICE_STATE_ACTIVATED:
+        return {'state': 'connected', 'connection': connection}
+    if NM_DEVICE_STATE_PREPARE <= state < nm_dbus.DEVICE_STATE_ACTIVATED or state == NM_DEVICE_STATE_DEACTIVATING:
+        return {'state': 'connecting', 'connection': connection}
+    return {'state': 'disconnected', 'connection': connection}
+
+def connect_fallback(ssid, timeout):
+    """Brings up the saved profile named ssid, else joins ssid (open networks), waiting up to timeout."""
+    wait = ["--wait", str(max(1, int(timeout)))]
+    try:
+        for args in (["connection", "up", "id", ssid],
+                     ["device", "wifi", "connect", ssid, "ifname", AP_INTERFACE_NAME]):
+            result = _run_nmcli_command(wait + args, check=False)
+            if result.returncode == 0:
+                return True
+            logging.warning(f"nmcli {' '.join(args)} failed: {result.stderr.strip() or result.stdout.strip()}")
+    except FileNotFoundError:
+        logging.error("nmcli command not found during fallback connection.")
+    return False
+
+def reconnect(connection, timeout):
+    """Brings up the saved connection profile, replacing whatever is active on the interface;
+    True once connected."""
+    try:
+        result = _run_nmcli_command(["--wait", str(max(1, int(timeout))), "connection", "up", "id", connection,
+                                     "ifname", AP_INTERFACE_NAME], check=False)
+    except FileNotFoundError:
+        logging.error("nmcli command not found during failback.")
+        return False
+    if result.returncode != 0:
+        logging.warning(f"nmcli connection up {connection} failed: {result.stderr.strip() or result.stdout.strip()}")
+    return result.returncode == 0
+
+def ap_has_clients(arp_table='/proc/net/arp'):
+    """True if a device on the setup hotspot has an ARP entry, i.e. someone may be using the web UI."""
+    try:
+        with open(arp_table) as f:
+            next(f)
+            # IP address, HW type, Flags, HW address, Mask, Device; flags 0x0 is an unanswered lookup
+            return any(len(fields) > 5 and fields[5] == AP_INTERFACE_NAME and fields[2] != '0x0'
+                       for fields in (line.split() for line in f))
+    except (OSError, StopIteration):
+        return False
+
 def setup_gpio():
     GPIO.setmode(GPIO.BCM)
     GPIO.setup(AP_MODE_SWITCH_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
     logging.info(f"GPIO {AP_MODE_SWITCH_PIN} set up for AP mode switch.")
 
-def switch_to_ap_mode():
-    global LAST_CLIENT_CONNECTION_NAME, LAST_CLIENT_CONNECTION_UUID
+def ensure_ap_profile():
+    """Creates the AP profile, or repairs any setting that drifted, so it is ready to activate."""
+    global _ap_profile_ready
+    started = time.monotonic()
+    properties = [name for name, _ in AP_PROFILE_SETTINGS]
+    try:
+        result = _run_nmcli_command(["--show-secrets", "--get-values", ",".join(properties),
+                                     "connection", "show", AP_CONNECTION_NAME], check=False)
+        if result.returncode != 0:
+            args = ["connection", "add", "type", "wifi", "con-name", AP_CONNECTION_NAME]
+            for name, value in AP_PROFILE_SETTINGS:
+                args += [name, value]
+            _run_nmcli_command(args)
+            logging.info(f"Created AP profile '{AP_CONNECTION_NAME}' in {(time.monotonic() - started) * 1000:.0f} ms.")
+        else:
+            current = result.stdout.rstrip('\n').split('\n')
+            changes = []
+            for (name, value), actual in zip(AP_PROFILE_SETTINGS, current + [''] * len(AP_PROFILE_SETTINGS)):
+                if actual.strip() != value:
+                    changes += [name, value]
+            if changes:
+                _run_nmcli_command(["connection", "modify", AP_CONNECTION_NAME] + changes)
+                logging.info(f"Repaired AP profile '{AP_CONNECTION_NAME}': {', '.join(changes[0::2])}")
+            else:
+                logging.info(f"AP profile '{AP_CONNECTION_NAME}' is ready.")
+        _ap_profile_ready = True
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        logging.error(f"Could not prepare AP profile '{AP_CONNECTION_NAME}': {e}")
+        _ap_profile_ready = False
+    return _ap_profile_ready
+
+def switch_to_ap_mode(hold_reached_at=None):
+    """Activates the AP profile. hold_reached_at is the time.monotonic() at which the
+    button hold completed, to report hold-to-broadcast time."""
+    global LAST_CLIENT_CONNECTION_NAME, LAST_CLIENT_CONNECTION_UUID, LAST_AP_ACTIVATION
     logging.info("Switching to AP mode...")
 
-    # Get current connection *before* attempting to bring anything down
+    # Remember the client connection so it can be restored; bringing the AP up on the
+    # same interface replaces it, so it needs no separate `connection down`
     current_name, current_uuid = get_active_wifi_connection()
     if current_name and current_uuid:
         LAST_CLIENT_CONNECTION_NAME, LAST_CLIENT_CONNECTION_UUID = current_name, current_uuid
         logging.info(f"Current active Wi-Fi client: {LAST_CLIENT_CONNECTION_NAME} (UUID: {LAST_CLIENT_CONNECTION_UUID})")
-        try:
-            _run_nmcli_command(["connection", "down", LAST_CLIENT_CONNECTION_UUID])
-            logging.info(f"Disconnected from {LAST_CLIENT_CONNECTION_NAME}.")
-        except subprocess.CalledProcessError as e:
-            # If it's already down or doesn't exist, that's fine for AP mode setup.
-            logging.warning(f"Could not disconnect from {LAST_CLIENT_CONNECTION_NAME} (may already be down): {e}")
-        except FileNotFoundError: # from _run_nmcli_command
-            return False # nmcli not available
     else:
         logging.info("No active client Wi-Fi connection found, or unable to determine it. Proceeding to AP setup.")
         # Reset them if no connection was found, so we don't try to restore a stale one
         LAST_CLIENT_CONNECTION_NAME, LAST_CLIENT_CONNECTION_UUID = None, None
 
+    if not _ap_profile_ready and not ensure_ap_profile():
+        return False
 
+    started = time.monotonic()
     try:
-        # Check if AP connection profile already exists
-        show_result = _run_nmcli_command(["-t", "-f", "NAME", "connection", "show"], check=False)
-        ap_profile_exists = False
-        if show_result.returncode == 0 and AP_CONNECTION_NAME in show_result.stdout:
-            ap_profile_exists = True
-        
-        if ap_profile_exists:
-            logging.info(f"AP connection profile '{AP_CONNECTION_NAME}' already exists. Bringing it up.")
-            _run_nmcli_command(["connection", "up", AP_CONNECTION_NAME])
-        else:
-            logging.info(f"Creating and starting AP connection profile: {AP_CONNECTION_NAME}")
-            _run_nmcli_command([
-                "connection", "add", "type", "wifi", "ifname", AP_INTERFACE_NAME,
-                "con-name", AP_CONNECTION_NAME, "autoconnect", "no", # Don't autoconnect AP mode
-                "ssid", AP_SSID, "mode", "ap",
-                "ipv4.method", "shared", # Provides DHCP to clients
-                "ip4", AP_IP_ADDRESS, # Set static IP for the AP itself
-                # No gateway needed for 'shared' ipv4.method as it implies NAT
-            ])
-            _run_nmcli_command(["connection", "modify", AP_CONNECTION_NAME, "wifi-sec.key-mgmt", "wpa-psk"])
-            _run_nmcli_command(["connection", "modify", AP_CONNECTION_NAME, "wifi-sec.psk", "ghosthost"]) # Default password "ghosthost"
-            # No need to modify ipv4.method to shared again if set during add
-            
-            logging.info(f"Bringing up AP connection '{AP_CONNECTION_NAME}'...")
-            _run_nmcli_command(["connection", "up", AP_CONNECTION_NAME])
-
-        logging.info(f"AP mode activated. SSID: {AP_SSID}, IP: {AP_IP_ADDRESS.split('/')[0]}")
-        logging.info(f"Connect to SSID '{AP_SSID}' (password: ghosthost) and navigate to http://{AP_IP_ADDRESS.split('/')[0]}:8000 for Wi-Fi setup.") # Assuming port 8000 from web_interface/app.py
-        return True
-
+        # --wait returns once NetworkManager reports the AP activated, i.e. broadcasting
+        up_command = ["--wait", str(AP_ACTIVATION_TIMEOUT), "connection", "up", AP_CONNECTION_NAME]
+        try:
+            _run_nmcli_command(up_command)
+        except subprocess.CalledProcessError:
+            # The profile may have been deleted or edited since boot
+            if not ensure_ap_profile():
+                return False
+            _run_nmcli_command(up_command)
     except subprocess.CalledProcessError as e:
         logging.error(f"Error during AP mode activation: {e}")
         return False
@@ -124,53 +277,50 @@ def switch_to_ap_mode():
         logging.error("nmcli command not found during AP mode activation.")
         return False
 
+    broadcasting = time.monotonic()
+    LAST_AP_ACTIVATION = {'activation_ms': round((broadcasting - started) * 1000)}
+    if hold_reached_at is not None:
+        LAST_AP_ACTIVATION['hold_to_broadcast_ms'] = round((broadcasting - hold_reached_at) * 1000)
+        logging.info(f"AP '{AP_SSID}' broadcasting {LAST_AP_ACTIVATION['hold_to_broadcast_ms']} ms after the button hold "
+                     f"(activation {LAST_AP_ACTIVATION['activation_ms']} ms).")
+    else:
+        logging.info(f"AP '{AP_SSID}' broadcasting after {LAST_AP_ACTIVATION['activation_ms']} ms activation.")
+    logging.info(f"AP mode activated. SSID: {AP_SSID}, IP: {AP_IP_ADDRESS.split('/')[0]}")
+    logging.info(f"Connect to SSID '{AP_SSID}' (password: {AP_PASSWORD}) and navigate to http://{AP_IP_ADDRESS.split('/')[0]}:8000 for Wi-Fi setup.") # Assuming port 8000 from web_interface/app.py
+    return True
+
 def switch_to_client_mode(target_ssid=None, target_password=None):
+    global LAST_CLIENT_CONNECTION_NAME, LAST_CLIENT_CONNECTION_UUID
     logging.info("Attempting to switch to client mode...")
     try:
         # Bring down the AP mode connection if it's active
         # Check if AP_CONNECTION_NAME is active on AP_INTERFACE_NAME
-        active_con_result = _run_nmcli_command(["-t", "-f", "NAME,DEVICE", "connection", "show", "--active"], check=False)
-        ap_is_active_on_interface = False
-        if active_con_result.returncode == 0:
-            for line in active_con_result.stdout.strip().split('\n'):
-                if AP_CONNECTION_NAME in line and AP_INTERFACE_NAME in line:
-                    ap_is_active_on_interface = True
-                    break
-        
-        if ap_is_active_on_interface:
+        if is_ap_active():
             logging.info(f"AP mode '{AP_CONNECTION_NAME}' is active. Bringing it down.")
             _run_nmcli_command(["connection", "down", AP_CONNECTION_NAME], check=False) # Don't fail if already down
         else:
             logging.info(f"AP mode '{AP_CONNECTION_NAME}' not found active on {AP_INTERFACE_NAME}.")
 
-        # Delete the AP connection profile to ensure clean switch-over
-        show_con_result = _run_nmcli_command(["-t", "-f", "NAME", "connection", "show"], check=False)
-        if show_con_result.returncode == 0 and AP_CONNECTION_NAME in show_con_result.stdout:
-            logging.info(f"Deleting AP connection profile: {AP_CONNECTION_NAME}")
-            _run_nmcli_command(["connection", "delete", AP_CONNECTION_NAME])
-        else:
-            logging.info(f"AP connection profile '{AP_CONNECTION_NAME}' not found, no need to delete.")
-
+        # The AP profile is kept (dormant, autoconnect off) for the next activation
 
         if target_ssid and target_password:
             logging.info(f"Connecting to specified Wi-Fi network: {target_ssid}")
             # Use nmcli device wifi connect. This command automatically creates/updates a connection.
             # It's generally robust. No need to manually delete old profiles with the same SSID unless specific issues arise.
             # nmcli dev wifi connect <ssid> password <password> ifname <ifname> name <profile_name_if_desired>
-            connect_cmd = ["device", "wifi", "connect", target_ssid, "password", target_password, "ifname", AP_INTERFACE_NAME]
+            # --wait makes nmcli return as soon as NetworkManager reports the connection activated (or failed)
+            connect_cmd = ["--wait", str(CONNECT_TIMEOUT), "device", "wifi", "connect", target_ssid,
+                           "password", target_password, "ifname", AP_INTERFACE_NAME]
             # Optionally, give the new connection a specific name:
             # connect_cmd.extend(["name", f"Client_{target_ssid}"])
             
-            # Before connecting, rescan can be helpful
-            _run_nmcli_command(["device", "wifi", "rescan", "ifname", AP_INTERFACE_NAME], check=False)
-            time.sleep(3) # Give rescan a moment
+            # Before connecting, rescan; --rescan yes returns once the scan has completed
+            _run_nmcli_command(["device", "wifi", "list", "--rescan", "yes", "ifname", AP_INTERFACE_NAME], check=False)
 
             connection_result = _run_nmcli_command(connect_cmd, check=False) # check=False to handle output manually
             
             if connection_result.returncode == 0:
-                logging.info(f"Successfully initiated connection to {target_ssid}.")
-                # Verify connection status after attempting
-                time.sleep(10) # Wait for connection to establish
+                logging.info(f"Connection to {target_ssid} activated.")
                 new_name, new_uuid = get_active_wifi_connection()
                 if new_name == target_ssid or (new_name and target_ssid in new_name): # Sometimes name gets a suffix
                     logging.info(f"Connection to {target_ssid} confirmed active.")
@@ -210,81 +360,238 @@ def switch_to_client_mode(target_ssid=None, target_password=None):
         logging.error("nmcli command not found during client mode switch.")
         return False
 
+class APButtonWatcher:
+    """Watches the AP button with kernel edge events instead of polling.
+
+    A press schedules a hold timer and a release cancels it, so AP mode starts
+    exactly PRESS_DURATION_FOR_AP_MODE seconds into a hold. While in AP mode, a
+    timer checks every AP_CHECK_INTERVAL seconds whether the web UI has switched
+    back to client mode. Nothing runs in between.
+    """
+
+    def __init__(self, pin=AP_MODE_SWITCH_PIN, hold_seconds=PRESS_DURATION_FOR_AP_MODE,
+                 check_interval=AP_CHECK_INTERVAL):
+        self.pin = pin
+        self.hold_seconds = hold_seconds
+        self.check_interval = check_interval
+        self.in_ap_mode = False  # AP mode triggered by this script (or found active at startup)
+        self._activating = False
+        self._hold_timer = None
+        self._sample_timer = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        GPIO.add_event_detect(self.pin, GPIO.BOTH, callback=self._on_edge, bouncetime=BUTTON_BOUNCE_MS)
+        if GPIO.input(self.pin) == GPIO.LOW:  # Already held down at startup
+            self._pressed()
+
+    def wait(self):
+        """Block until stop(); the thread sleeps while the watcher is idle."""
+        self._stopped.wait()
+
+    def stop(self):
+        self._stopped.set()
+        with self._lock:
+            sample, self._sample_timer = self._sample_timer, None
+        if sample is not None:
+            sample.cancel()
+        self._cancel_hold()
+        try:
+            GPIO.remove_event_detect(self.pin)
+        except Exception as e:
+            logging.debug(f"Could not remove edge detection on GPIO {self.pin}: {e}")
+
+    def _on_edge(self, channel):
+        # The callback doesn't say which edge fired, and read now the level may still
+        # be bouncing. bouncetime drops the edges that follow, so the level is read
+        # once it has settled; a later edge restarts the wait.
+        edge_at = time.monotonic()
+        with self._lock:
+            if self._sample_timer is not None:
+                self._sample_timer.cancel()
+            self._sample_timer = threading.Timer(BUTTON_SETTLE_SECONDS, self._sample, args=(edge_at,))
+            self._sample_timer.daemon = True
+            self._sample_timer.start()
+
+    def _sample(self, edge_at):
+        with self._lock:
+            self._sample_timer = None
+        if self._stopped.is_set():
+            return
+        if GPIO.input(self.pin) == GPIO.LOW:
+            self._pressed(edge_at)
+        else:
+            self._released()
+
+    def _pressed(self, pressed_at=None):
+        with self._lock:
+            if self._hold_timer is not None:
+                return
+            if self.in_ap_mode or self._activating:
+                logging.debug("AP mode button pressed while in AP mode; ignoring.")
+                return
+            # The hold counts from the edge, not from when the level settled
+            held = time.monotonic() - pressed_at if pressed_at is not None else 0.0
+            self._hold_timer = threading.Timer(max(0.0, self.hold_seconds - held), self._hold_reached)
+            self._hold_timer.daemon = True
+            self._hold_timer.start()
+        logging.debug("AP mode button pressed.")
+
+    def _released(self):
+        if self._cancel_hold():
+            logging.debug("AP mode button released before duration or action taken.")
+
+    def _cancel_hold(self):
+        with self._lock:
+            timer, self._hold_timer = self._hold_timer, None
+        if timer is not None:
+            timer.cancel()
+        return timer is not None
+
+    def _hold_reached(self):
+        hold_reached_at = time.monotonic()
+        with self._lock:
+            if self._hold_timer is None or self.in_ap_mode:
+                return  # Released (or stopped) just as the timer fired
+            self._hold_timer = None
+        # A missed release edge would otherwise look like a full hold
+        if GPIO.input(self.pin) != GPIO.LOW:
+            logging.debug("AP mode button no longer pressed when hold timer fired.")
+            return
+        logging.info(f"Button held for {self.hold_seconds} seconds. Activating AP mode.")
+        if not self.activate_ap_mode(hold_reached_at):
+            logging.error("Failed to switch to AP mode. Button press monitoring will continue.")
+
+    @property
+    def busy(self):
+        """True in AP mode or while it is being activated."""
+        return self.in_ap_mode or self._activating
+
+    def activate_ap_mode(self, hold_reached_at=None):
+        """Switches to AP mode unless it is already active or starting; True on success."""
+        with self._lock:
+            if self.in_ap_mode or self._activating:
+                return False
+            self._activating = True
+        try:
+            if not switch_to_ap_mode(hold_reached_at):
+                return False
+            logging.info("AP mode activated. This script will now wait for network configuration via web UI to switch back.")
+            self.enter_ap_mode()
+            return True
+        finally:
+            with self._lock:
+                self._activating = False
+
+    def enter_ap_mode(self):
+        """Mark AP mode active and start checking that it still is."""
+        with self._lock:
+            if self.in_ap_mode:
+                return
+            self.in_ap_mode = True
+        threading.Thread(target=self._check_ap_mode, name='ap-check', daemon=True).start()
+
+    def _check_ap_mode(self):
+        # If the AP goes away, the web UI (or another process) has switched network.
+        # Checks are scheduled from a fixed start, so they neither drift nor bunch up.
+        next_check = time.monotonic() + self.check_interval
+        while not self._stopped.wait(max(0.0, next_check - time.monotonic())):
+            next_check += self.check_interval
+            try:
+                if is_ap_active():
+                    continue
+            except Exception as e:
+                logging.warning(f"Error checking AP status while in AP mode: {e}")
+                continue
+            self._leave_ap_mode()
+            return
+
+    def _leave_ap_mode(self):
+        global LAST_CLIENT_CONNECTION_NAME, LAST_CLIENT_CONNECTION_UUID
+        with self._lock:
+            self.in_ap_mode = False
+        logging.info("Detected switch from AP mode (likely by web UI). Resuming normal button monitoring for AP activation.")
+        # Update last known connection as it might have changed
+        LAST_CLIENT_CONNECTION_NAME, LAST_CLIENT_CONNECTION_UUID = get_active_wifi_connection()
+        if LAST_CLIENT_CONNECTION_NAME:
+            logging.info(f"Now connected to: {LAST_CLIENT_CONNECTION_NAME}")
+        else:
+            logging.info("Now in client mode, but not connected to any Wi-Fi.")
+        if GPIO.input(self.pin) == GPIO.LOW:  # A hold that began in AP mode counts from now
+            self._pressed()
+
+def start_link_monitor(watcher):
+    """Starts failover to network.fallback_ssid, then AP mode, when the link drops, and
+    failback afterwards (see link_monitor.py). Returns the monitor, or None if it is disabled."""
+    from src.core.config_manager import config
+    settings = config.get('network.failover', {}) or {}
+    if not settings.get('enabled', True):
+        logging.info("Link monitor disabled (network.failover.enabled).")
+        return None
+
+    def restore_ap():
+        # The watcher may still count itself in AP mode, so activate_ap_mode() would refuse
+        if not switch_to_ap_mode():
+            return False
+        watcher.enter_ap_mode()
+        return True
+
+    monitor = LinkMonitor(get_link_state, connect_fallback,
+                          lambda: watcher.activate_ap_mode(),
+                          fallback_ssid=config.get('network.fallback_ssid', '') or '',
+                          interface=AP_INTERFACE_NAME,
+                          interval=float(settings.get('check_interval', 5)),
+                          fallback_after=float(settings.get('fallback_after', 10)),
+                          ap_after=float(settings.get('ap_after', 60)),
+                          probe_port=int(settings.get('probe_port', 53)),
+                          probe_timeout=float(settings.get('probe_timeout', 1.0)),
+                          probe_failures=int(settings.get('probe_failures', 3)),
+                          paused=lambda: watcher.busy,
+                          reconnect=reconnect,
+                          restore_ap=restore_ap,
+                          ap_in_use=ap_has_clients,
+                          failback_interval=float(settings.get('failback_interval', 300)),
+                          failback_timeout=float(settings.get('failback_timeout', 20)))
+    monitor.start()
+    client = _dbus()
+    if client:
+        # Check as soon as NetworkManager reports a change; access point updates are just scan noise
+        def on_signal(path, member):
+            if not path.startswith(nm_dbus.NM_PATH + '/AccessPoint'):
+                monitor.wake()
+        threading.Thread(target=client.watch, args=(on_signal,), name='link-signals', daemon=True).start()
+    return monitor
+
 def main_loop():
     setup_gpio()
-    button_pressed_time = None
-    in_ap_mode = False # Track if we are currently in AP mode triggered by this script
+    ensure_ap_profile()
+    watcher = APButtonWatcher()
 
     # Initial check for AP mode (e.g., if script restarts while AP is already active)
     try:
-        active_connections_result = _run_nmcli_command(["-t", "-f", "NAME,DEVICE", "connection", "show", "--active"], check=False)
-        if active_connections_result.returncode == 0:
-            for line in active_connections_result.stdout.strip().split('\n'):
-                if AP_CONNECTION_NAME in line and AP_INTERFACE_NAME in line:
-                    logging.info(f"Script started/restarted. Device already in AP mode ('{AP_CONNECTION_NAME}').")
-                    in_ap_mode = True
-                    break
+        if is_ap_active():
+            logging.info(f"Script started/restarted. Device already in AP mode ('{AP_CONNECTION_NAME}').")
+            watcher.enter_ap_mode()
     except Exception as e:
         logging.warning(f"Could not determine initial network state or nmcli not ready during startup: {e}")
 
-
     logging.info("AP Mode Manager started. Press and hold the button for 10 seconds to activate AP mode.")
-    if in_ap_mode:
+    if watcher.in_ap_mode:
         logging.info("Currently in AP mode. Web server should provide config page. Button press will not trigger AP mode again while in this state.")
 
-
-    while True:
-        current_time = time.time()
-        button_state = GPIO.input(AP_MODE_SWITCH_PIN)
-
-        if button_state == GPIO.LOW:  # Button pressed
-            if button_pressed_time is None:
-                button_pressed_time = current_time
-                logging.debug("AP mode button pressed.")
-            # Check for hold duration ONLY if not already in AP mode
-            elif not in_ap_mode and (current_time - button_pressed_time) >= PRESS_DURATION_FOR_AP_MODE:
-                logging.info(f"Button held for {PRESS_DURATION_FOR_AP_MODE} seconds. Activating AP mode.")
-                if switch_to_ap_mode():
-                    in_ap_mode = True 
-                    logging.info("AP mode activated. This script will now wait for network configuration via web UI to switch back.")
-                else:
-                    logging.error("Failed to switch to AP mode. Button press monitoring will continue.")
-                button_pressed_time = None # Reset timer regardless of success to prevent immediate re-trigger
-        else:  # Button not pressed or released
-            if button_pressed_time is not None:
-                if not in_ap_mode : # Only log release if we weren't trying to activate AP mode
-                     logging.debug("AP mode button released before duration or action taken.")
-                button_pressed_time = None # Reset timer
-
-        if in_ap_mode:
-            # Periodically check if we are still in AP mode.
-            # If not, it means the web UI (or another process) has switched network.
-            # This check should be fairly lightweight.
-            if current_time % 15 < 0.1 : # Check roughly every 15 seconds
-                try:
-                    is_still_ap = False
-                    active_check_result = _run_nmcli_command(["-t", "-f", "NAME,DEVICE", "connection", "show", "--active"], check=False)
-                    if active_check_result.returncode == 0:
-                        for line in active_check_result.stdout.strip().split('\n'):
-                            if AP_CONNECTION_NAME in line and AP_INTERFACE_NAME in line:
-                                is_still_ap = True
-                                break
-                    if not is_still_ap:
-                        logging.info("Detected switch from AP mode (likely by web UI). Resuming normal button monitoring for AP activation.")
-                        in_ap_mode = False
-                        # Update last known connection as it might have changed
-                        LAST_CLIENT_CONNECTION_NAME, LAST_CLIENT_CONNECTION_UUID = get_active_wifi_connection()
-                        if LAST_CLIENT_CONNECTION_NAME:
-                            logging.info(f"Now connected to: {LAST_CLIENT_CONNECTION_NAME}")
-                        else:
-                            logging.info("Now in client mode, but not connected to any Wi-Fi.")
-                except Exception as e:
-                    logging.warning(f"Error checking AP status while in AP mode: {e}")
-
-
-        time.sleep(0.1) # Polling interval
+    watcher.start()
+    monitor = start_link_monitor(watcher)
+    try:
+        watcher.wait()
+    finally:
+        if monitor:
+            monitor.stop()
+        watcher.stop()
 
 if __name__ == "__main__":
+    # Project root, for the configuration
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
     try:
         main_loop()
     except KeyboardInterrupt:
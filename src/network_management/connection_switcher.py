@@ -0,0 +1,182 @@
+"""
+Connection Switcher
+===================
+Switches Wi-Fi networks in the background, so /api/networks/connect can
+return at once and the page can follow progress.
+
+A switch moves through these stages:
+
+    checking    read the current state and resolve the target profile
+    scanning    only when joining a new SSID that the last scan didn't see
+    leaving_ap  take the setup hotspot down, if it is up
+    activating  `nmcli --wait` brings the connection up, returning as soon as
+                NetworkManager reports it activated (or failed)
+    confirming  wait for the status cache to show the target connected
+    restoring   after a failure, bring back the hotspot or previous network
+
+It ends as `connected` or `failed`. All stages share one deadline
+(`network.connect_timeout`), and no stage sleeps for a fixed time.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from src.core.metrics import metrics
+from .ap_mode_manager import AP_CONNECTION_NAME, AP_INTERFACE_NAME
+
+SWITCH_SECONDS = metrics.histogram('ghosthost_network_switch_seconds', 'Wi-Fi connection switch duration',
+                                   ['result'], buckets=(1, 2, 5, 10, 15, 20, 30, 45, 60, 90))
+
+
+class ConnectionSwitcher:
+    def __init__(self, network_manager, timeout: float = 45.0, keep: int = 10):
+        self.logger = logging.getLogger(__name__)
+        self.nm = network_manager
+        self.timeout = timeout
+        self.keep = keep
+        self._switches = OrderedDict()
+        self._current = None
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Call callback(switch) on every stage change"""
+        self._listeners.append(callback)
+
+    def start(self, target: str, password: Optional[str] = None) -> Tuple[dict, bool]:
+        """Begin switching to target (SSID, profile name or UUID). Returns (switch, started);
+        started is False, with the running switch, if one is already in progress"""
+        with self._lock:
+            if self._current is not None:
+                return dict(self._current), False
+            switch = {'id': str(uuid.uuid4()), 'target': target, 'state': 'running', 'stage': 'checking',
+                      'stages': [{'stage': 'checking', 'at_ms': 0}], 'message': f"Switching to {target}",
+                      'from': None, 'started': time.time(), 'finished': None, 'elapsed_ms': 0}
+            self._current = switch
+            self._switches[switch['id']] = switch
+            while len(self._switches) > self.keep:
+                self._switches.popitem(last=False)
+        self._notify(switch)
+        threading.Thread(target=self._run, args=(switch, password, time.monotonic()),
+                         name='network-switch', daemon=True).start()
+        return dict(switch), True
+
+    def get(self, switch_id: str) -> Optional[dict]:
+        switch = self._switches.get(switch_id)
+        return dict(switch) if switch else None
+
+    def wait(self, switch_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait for a switch to finish; returns it (still running if timeout passed)"""
+        with self._finished:
+            self._finished.wait_for(lambda: self._switches.get(switch_id, {}).get('state') != 'running', timeout)
+        return self.get(switch_id)
+
+    def current(self) -> Optional[dict]:
+        """The running switch, else the last one"""
+        with self._lock:
+            switch = self._current or (next(reversed(self._switches.values())) if self._switches else None)
+            return dict(switch) if switch else None
+
+    def _stage(self, switch: dict, started: float, stage: str, message: Optional[str] = None):
+        elapsed_ms = round((time.monotonic() - started) * 1000)
+        with self._lock:
+            switch['stage'] = stage
+            switch['stages'] = switch['stages'] + [{'stage': stage, 'at_ms': elapsed_ms}]
+            switch['elapsed_ms'] = elapsed_ms
+            if message:
+                switch['message'] = message
+        self.logger.info(f"Switch to {switch['target']}: {stage} at {elapsed_ms} ms" + (f" ({message})" if message else ''))
+        self._notify(switch)
+
+    def _finish(self, switch: dict, started: float, connected: bool, message: str):
+        state = 'connected' if connected else 'failed'
+        SWITCH_SECONDS.observe(time.monotonic() - started, result=state)
+        with self._lock:
+            switch.update(state=state, finished=time.time(), message=message)
+        self._stage(switch, started, state)
+        with self._lock:
+            self._current = None
+            self._finished.notify_all()
+
+    def _notify(self, switch: dict):
+        for listener in list(self._listeners):
+            try:
+                listener(dict(switch))
+            except Exception as e:
+                self.logger.error(f"Switch listener failed: {e}")
+
+    def _nmcli_wait(self, deadline: float, *args) -> Tuple[bool, str]:
+        """Run nmcli, letting it wait on NetworkManager for at most the time left"""
+        seconds = max(1, int(deadline - time.monotonic()))
+        return self.nm._run_nmcli_command(['--wait', str(seconds)] + list(args))
+
+    def _run(self, switch: dict, password: Optional[str], started: float):
+        deadline = started + self.timeout
+        target = switch['target']
+        try:
+            status = self.nm.get_status_snapshot()
+            from_ap = status['ap_active']
+            previous = None if from_ap else status['connection']
+            switch['from'] = AP_CONNECTION_NAME if from_ap else previous
+
+            # A saved profile is brought up as is; anything else is joined by SSID
+            profile = next((n for n in self.nm.get_saved_networks() if target in (n['name'], n['uuid'])), None)
+            names = {target, profile['name']} if profile else {target}
+
+            if not profile and password:
+                visible = {n['ssid'] for n in self.nm.scanner.snapshot(refresh=False)['networks']}
+                if target not in visible:
+                    self._stage(switch, started, 'scanning')
+                    visible = {n['ssid'] for n in self.nm.scanner.scan_now()}
+                    if target not in visible:
+                        self.logger.warning(f"{target} not seen in a fresh scan; trying anyway")
+
+            if from_ap:
+                self._stage(switch, started, 'leaving_ap')
+                self._nmcli_wait(deadline, 'connection', 'down', AP_CONNECTION_NAME)
+
+            self._stage(switch, started, 'activating')
+            if profile or not password:
+                success, msg = self._nmcli_wait(deadline, 'connection', 'up', profile['uuid'] if profile else target)
+                if (not success or 'activation failed' in msg.lower()) and password:
+                    # Stored secrets may be stale; join again with the new password
+                    success, msg = self._nmcli_wait(deadline, 'device', 'wifi', 'connect', target,
+                                                    'password', password, 'ifname', AP_INTERFACE_NAME)
+            else:
+                success, msg = self._nmcli_wait(deadline, 'device', 'wifi', 'connect', target,
+                                                'password', password, 'ifname', AP_INTERFACE_NAME)
+
+            if success:
+                self._stage(switch, started, 'confirming')
+                status, connected = self.nm.wait_for_status(
+                    lambda s: s['connected'] and not s['ap_active'] and
+                    (s['connection'] in names or s['ssid'] in names),
+                    max(0.0, deadline - time.monotonic()))
+                if connected:
+                    self._finish(switch, started, True, f"Connected to {target}")
+                    return
+                msg = f"{target} did not come up within {self.timeout:.0f}s"
+
+            self.logger.error(f"Switch to {target} failed: {msg}")
+            self._restore(switch, started, from_ap, previous)
+            self._finish(switch, started, False, msg or f"Could not connect to {target}")
+        except Exception as e:
+            self.logger.error(f"Switch to {target} failed: {e}")
+            self._finish(switch, started, False, str(e))
+
+    def _restore(self, switch: dict, started: float, from_ap: bool, previous: Optional[str]):
+        """Get back to a reachable state: the hotspot if we left it, else the old network"""
+        fallback = AP_CONNECTION_NAME if from_ap else previous
+        if not fallback:
+            return
+        self._stage(switch, started, 'restoring', f"Restoring {fallback}")
+        # Restoring gets its own short deadline; the switch's may already be spent
+        success, msg = self._nmcli_wait(time.monotonic() + 30, 'connection', 'up', fallback)
+        if not success:
+            self.logger.error(f"Could not restore {fallback}: {msg}")
+        self.nm.invalidate_status()
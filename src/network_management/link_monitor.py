@@ -0,0 +1,351 @@
+"""
+Link Monitor
+============
+Watches the Wi-Fi link and fails over when connectivity is lost, so the
+figure doesn't sit offline until someone holds the AP button.
+
+Each check reads the device state from NetworkManager and, when it reports
+a connection, probes the default gateway: an ICMP echo, then a TCP connect
+if the echo goes unanswered or unprivileged ICMP sockets aren't allowed. A
+refused connection counts as reachable, since the gateway had to answer.
+Gateways that drop one or the other are common, so the link counts as lost
+only after `probe_failures` probes in a row have failed (or as soon as
+NetworkManager reports it down), and as healthy again after one good check. While NetworkManager is switching connections
+(deactivating or activating, e.g. a switch made from the web interface),
+the loss clock is held: it neither starts nor advances, so a slow switch
+isn't taken for an outage.
+
+Once the link has been down for `fallback_after` seconds, the monitor
+brings up `fallback_ssid` (if one is set and isn't the network that was
+lost). If the link has been down for `ap_after` seconds, it starts the
+setup hotspot. Each failover is logged with its timing and kept
+in `last_failover`.
+
+NetworkManager doesn't replace an active connection on its own, so the
+monitor fails back itself: every `failback_interval` seconds while on the
+fallback network or the hotspot, it brings up the connection that was lost,
+waiting up to `failback_timeout` seconds. If that doesn't restore the link,
+the fallback network or hotspot is brought back and the next attempt waits
+another interval. The hotspot isn't taken down while a device is connected
+to it, and failback stops if the network was changed some other way.
+
+The monitor has no NetworkManager code of its own; ap_mode_manager.py passes
+in the functions that read the link and change networks.
+"""
+
+import logging
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Optional
+
+
+def default_gateway(ifname: Optional[str] = None, route_table: str = '/proc/net/route') -> Optional[str]:
+    """IPv4 gateway of the default route (on ifname, if given), or None"""
+    try:
+        with open(route_table) as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                # Destination 00000000 with RTF_UP and RTF_GATEWAY set
+                if (len(fields) > 3 and fields[1] == '00000000' and int(fields[3], 16) & 3 == 3
+                        and (ifname is None or fields[0] == ifname)):
+                    return socket.inet_ntoa(struct.pack('<L', int(fields[2], 16)))
+    except (OSError, StopIteration, ValueError):
+        pass
+    return None
+
+
+def ping(host: str, timeout: float = 1.0) -> Optional[bool]:
+    """True if host answers an ICMP echo, or None if unprivileged ICMP sockets aren't
+    allowed (net.ipv4.ping_group_range)"""
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    except OSError:
+        return None
+    with sock:
+        try:
+            sock.settimeout(timeout)
+            sock.connect((host, 0))
+            # Echo request; the kernel fills in the identifier and checksum
+            sock.send(struct.pack('!BBHHH', 8, 0, 0, 0, 1) + b'ghosthost')
+            deadline = time.monotonic() + timeout
+            while True:
+                sock.settimeout(max(0.0, deadline - time.monotonic()))
+                if sock.recv(64)[:1] == b'\x00':  # Echo reply
+                    return True
+        except OSError:
+            return False
+
+
+def probe(host: str, port: int = 53, timeout: float = 1.0) -> bool:
+    """True if host answers an ICMP echo, or a TCP connect on port with a handshake or a refusal"""
+    if ping(host, timeout):
+        return True
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except ConnectionRefusedError:
+        return True
+    except OSError:
+        return False
+
+
+class LinkMonitor:
+    def __init__(self, read_link: Callable[[], dict], connect_fallback: Callable[[str, float], bool],
+                 activate_ap: Callable[[], bool], fallback_ssid: str = '', interface: str = 'wlan0',
+                 interval: float = 5.0, fallback_after: float = 10.0, ap_after: float = 60.0,
+                 probe_port: int = 53, probe_timeout: float = 1.0, probe_failures: int = 3, paused: Callable[[], bool] = lambda: False,
+                 reconnect: Optional[Callable[[str, float], bool]] = None,
+                 restore_ap: Optional[Callable[[], bool]] = None, ap_in_use: Callable[[], bool] = lambda: False,
+                 failback_interval: float = 300.0, failback_timeout: float = 20.0):
+        self.logger = logging.getLogger(__name__)
+        # {'state': 'connected' | 'connecting' | 'disconnected' | 'ap', 'connection': name or None}
+        self.read_link = read_link
+        # (ssid, timeout) -> True once connected
+        self.connect_fallback = connect_fallback
+        self.activate_ap = activate_ap
+        self.paused = paused
+        # (connection, timeout) -> True once connected; None disables failback
+        self.reconnect = reconnect
+        self.restore_ap = restore_ap or activate_ap
+        self.ap_in_use = ap_in_use
+        self.fallback_ssid = fallback_ssid
+        self.interface = interface
+        self.interval = interval
+        self.fallback_after = fallback_after
+        self.ap_after = max(ap_after, fallback_after)
+        self.probe_port = probe_port
+        self.probe_timeout = probe_timeout
+        self.probe_failures = max(1, probe_failures)
+        self.failback_interval = failback_interval
+        self.failback_timeout = failback_timeout
+        self.last_failover = None
+        # Last connection that passed a check, and {'to', 'from', 'retry_at'} while failed over
+        self._connection = None
+        self._failed_over = None
+        self._lost_at = None
+        self._failed_probes = 0
+        # Seconds the link has been down, not counting time spent switching
+        self._lost_for = 0.0
+        self._checked_at = None
+        self._lost_reason = None
+        self._lost_connection = None
+        self._fallback_tried = False
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='link-monitor', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Link monitor started: fallback {self.fallback_ssid or 'none'} after {self.fallback_after:.0f}s, "
+                         f"AP mode after {self.ap_after:.0f}s, gateway lost after {self.probe_failures} failed probes "
+                         f"(ICMP, then TCP port {self.probe_port})")
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def wake(self):
+        """Check now instead of at the next interval, e.g. on a NetworkManager state change"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                self.logger.error(f"Link check failed: {e}")
+            # Check every second while the link is down or a probe has failed, so recovery, deadlines
+            # and repeated failures are seen promptly
+            suspect = self._lost_at is not None or self._failed_probes
+            self._wake.wait(min(self.interval, 1.0) if suspect else self.interval)
+            self._wake.clear()
+
+    def check(self):
+        """Run one check, failing over if a deadline has passed"""
+        now = time.monotonic()
+        since_last = now - self._checked_at if self._checked_at is not None else 0.0
+        self._checked_at = now
+        # Before the pause check, since the monitor is paused in AP mode
+        if self._failed_over is not None and now >= self._failed_over['retry_at'] and self._fail_back():
+            return
+        if self.paused():
+            self._reset()
+            return
+        link = self.read_link()
+        state = link.get('state')
+        if state == 'ap':
+            self._reset()
+            return
+
+        reason = None
+        if state == 'connected':
+            gateway = default_gateway(self.interface)
+            if gateway is None:
+                reason = 'no default route'
+            elif not probe(gateway, self.probe_port, self.probe_timeout):
+                self._failed_probes += 1
+                if self._failed_probes >= self.probe_failures:
+                    reason = f"gateway {gateway} unreachable for {self._failed_probes} probes"
+                else:
+                    self.logger.info(f"Gateway {gateway} probe failed ({self._failed_probes}/{self.probe_failures})")
+            else:
+                if self._lost_at is not None:
+                    self.logger.info(f"Link to {link.get('connection')} restored after "
+                                     f"{round((now - self._lost_at) * 1000)} ms without failover")
+                self._connection = link.get('connection')
+                self._reset()
+                return
+        elif state != 'connecting':
+            reason = 'disconnected'
+
+        if self._lost_at is None:
+            if reason is None:
+                return
+            self._lost_at = now
+            self._lost_for = 0.0
+            self._lost_reason = reason
+            self._lost_connection = link.get('connection') or self._connection
+            self.logger.warning(f"Link lost on {self.interface} ({reason}, connection {self._lost_connection or 'none'})")
+        elif state != 'connecting':
+            self._lost_for += since_last
+
+        lost_for = self._lost_for
+        if (self.fallback_ssid and not self._fallback_tried and lost_for >= self.fallback_after
+                and self._lost_connection != self.fallback_ssid):
+            self._fallback_tried = True
+            self._fail_over_to_fallback(lost_for)
+        elif lost_for >= self.ap_after:
+            self._fail_over_to_ap(lost_for)
+
+    def _reset(self):
+        self._lost_at = None
+        self._failed_probes = 0
+        self._lost_for = 0.0
+        self._lost_reason = None
+        self._lost_connection = None
+        self._fallback_tried = False
+
+    def _record(self, target: str, lost_for: float, started: float, success: bool, ssid: Optional[str] = None):
+        finished = time.monotonic()
+        self.last_failover = {
+            'to': target,
+            'ssid': ssid,
+            'from': self._lost_connection,
+            'reason': self._lost_reason,
+            'success': success,
+            'at': time.time(),
+            'lost_for_ms': round(lost_for * 1000),
+            'failover_ms': round((finished - started) * 1000),
+            'total_ms': round((finished - self._lost_at) * 1000)
+        }
+        return self.last_failover
+
+    def _fail_over_to_fallback(self, lost_for: float):
+        # The attempt may use the time left before the AP deadline, but no less than 5s
+        timeout = max(5.0, self.ap_after - lost_for)
+        self.logger.warning(f"Link lost for {lost_for:.1f}s; failing over to {self.fallback_ssid} (up to {timeout:.0f}s)")
+        started = time.monotonic()
+        success = False
+        try:
+            if self.connect_fallback(self.fallback_ssid, timeout):
+                gateway = default_gateway(self.interface)
+                success = gateway is not None and probe(gateway, self.probe_port, self.probe_timeout)
+        except Exception as e:
+            self.logger.error(f"Failover to {self.fallback_ssid} failed: {e}")
+        record = self._record('fallback', lost_for, started, success, self.fallback_ssid)
+        if success:
+            self.logger.info(f"Failed over to {self.fallback_ssid} in {record['failover_ms']} ms, "
+                             f"{record['total_ms']} ms after the link was lost")
+            self._await_failback('fallback')
+            self._reset()
+        else:
+            self.logger.error(f"Failover to {self.fallback_ssid} did not restore the link "
+                              f"({record['failover_ms']} ms); AP mode follows at {self.ap_after:.0f}s")
+
+    def _fail_over_to_ap(self, lost_for: float):
+        self.logger.warning(f"Link lost for {lost_for:.1f}s; starting AP mode")
+        started = time.monotonic()
+        try:
+            success = bool(self.activate_ap())
+        except Exception as e:
+            self.logger.error(f"Failover to AP mode failed: {e}")
+            success = False
+        record = self._record('ap', lost_for, started, success)
+        if success:
+            self.logger.info(f"Failed over to AP mode in {record['failover_ms']} ms, "
+                             f"{record['total_ms']} ms after the link was lost")
+            self._await_failback('ap')
+        else:
+            self.logger.error(f"Failover to AP mode failed after {record['failover_ms']} ms; starting over")
+        # Either way, start the sequence over from now
+        self._reset()
+
+    def _await_failback(self, target: str):
+        """Schedule failback from target ('fallback' or 'ap') to the connection that was lost"""
+        # A second failover (fallback, then AP) still fails back to the original network
+        lost = self._failed_over['from'] if self._failed_over else self._lost_connection
+        if self.reconnect is None or self.failback_interval <= 0 or not lost:
+            self._failed_over = None
+            return
+        self._failed_over = {'to': target, 'from': lost, 'retry_at': time.monotonic() + self.failback_interval}
+
+    def _fail_back(self) -> bool:
+        """Try to fail back; True if the network was touched, so this check is over"""
+        failover = self._failed_over
+        failover['retry_at'] = time.monotonic() + self.failback_interval
+        link = self.read_link()
+        state, connection = link.get('state'), link.get('connection')
+        if state == 'connected' and connection == failover['from']:
+            self.logger.info(f"Back on {connection}; failback no longer needed")
+            self._failed_over = None
+            return False
+        if ((failover['to'] == 'ap' and state != 'ap')
+                or (failover['to'] == 'fallback' and (state == 'ap' or (state == 'connected' and connection != self.fallback_ssid)))):
+            self.logger.info(f"Network changed since the failover ({state}, {connection or 'no connection'}); "
+                             f"not failing back to {failover['from']}")
+            self._failed_over = None
+            return False
+        if state not in ('ap', 'connected'):
+            # The fallback link is down too; the loss clock handles that
+            return False
+        if state == 'ap' and self.ap_in_use():
+            self.logger.info(f"Setup hotspot in use; failback to {failover['from']} retried "
+                             f"in {self.failback_interval:.0f}s")
+            return False
+
+        self.logger.info(f"Failing back to {failover['from']} (up to {self.failback_timeout:.0f}s)")
+        started = time.monotonic()
+        success = False
+        try:
+            if self.reconnect(failover['from'], self.failback_timeout):
+                gateway = default_gateway(self.interface)
+                success = gateway is not None and probe(gateway, self.probe_port, self.probe_timeout)
+        except Exception as e:
+            self.logger.error(f"Failback to {failover['from']} failed: {e}")
+        elapsed = round((time.monotonic() - started) * 1000)
+        if success:
+            self.logger.info(f"Failed back to {failover['from']} in {elapsed} ms")
+            self._failed_over = None
+            self._connection = failover['from']
+            self._reset()
+            return True
+
+        target = 'AP mode' if failover['to'] == 'ap' else self.fallback_ssid
+        self.logger.warning(f"{failover['from']} still unavailable ({elapsed} ms); returning to {target}, "
+                            f"next try in {self.failback_interval:.0f}s")
+        try:
+            if failover['to'] == 'ap':
+                restored = bool(self.restore_ap())
+            else:
+                restored = bool(self.connect_fallback(self.fallback_ssid, self.failback_timeout))
+        except Exception as e:
+            self.logger.error(f"Returning to {target} failed: {e}")
+            restored = False
+        if not restored:
+            self.logger.error(f"Could not return to {target}; the loss clock takes over")
+        failover['retry_at'] = time.monotonic() + self.failback_interval
+        return True
@@ -1,15 +1,88 @@
-# Import the function and constants from ap_mode_manager
-from .ap_mode_manager import switch_to_client_mode as ap_manager_switch_to_client_mode
+# Import constants from ap_mode_manager
 from .ap_mode_manager import AP_CONNECTION_NAME as DEFAULT_AP_NAME
 from .ap_mode_manager import AP_IP_ADDRESS as DEFAULT_AP_IP_CIDR
+from .ap_mode_manager import AP_INTERFACE_NAME as AP_INTERFACE
+from .wifi_scanner import WifiScanner, parse_wifi_list
+from .connection_switcher import ConnectionSwitcher
+from . import nm_dbus
 
+import fcntl
+import socket
+import struct
 import subprocess
 import logging
 import shlex
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+SIOCGIFADDR = 0x8915
+# Setup hotspot profiles, kept out of the saved-networks list
+HIDDEN_PROFILES = ['ghosthost', 'zoltar', 'psychic', DEFAULT_AP_NAME.lower()]
+
+
+def default_route_interface(route_table='/proc/net/route'):
+    """Interface carrying the IPv4 default route, or None"""
+    try:
+        with open(route_table) as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                # Destination 00000000 with the RTF_UP flag set
+                if len(fields) > 3 and fields[1] == '00000000' and int(fields[3], 16) & 1:
+                    return fields[0]
+    except (OSError, StopIteration, ValueError):
+        pass
+    return None
+
+
+def interface_ipv4(ifname):
+    """IPv4 address of ifname from the kernel's interface table, or None"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            packed = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack('256s', ifname[:15].encode()))
+        return socket.inet_ntoa(packed[20:24])
+    except OSError:
+        return None
+
+
+def get_lan_ip():
+    """Address on the default-route interface, else on the Wi-Fi interface; no packets are sent"""
+    for ifname in (default_route_interface(), AP_INTERFACE):
+        if ifname:
+            ip = interface_ipv4(ifname)
+            if ip:
+                return ip
+    return None
+
+
 class NetworkManager:
+    def __init__(self, status_ttl=10.0, use_monitor=True, scan_min_interval=10.0, scan_stale_after=30.0,
+                 scan_history=20, backend='auto', dbus_address='', connect_timeout=45.0):
+        # Queries go over D-Bus when backend is 'auto' or 'dbus' and NetworkManager
+        # answers there; otherwise, and for every change, nmcli is used
+        self.dbus = nm_dbus.open_client(dbus_address or 'SYSTEM') if backend in ('auto', 'dbus') else None
+        if backend == 'dbus' and self.dbus is None:
+            logger.warning("network.backend is 'dbus' but D-Bus is unavailable; falling back to nmcli")
+        # Network status is refreshed in the background and read from here
+        self.status_ttl = status_ttl
+        self.use_monitor = use_monitor
+        self._status = None
+        # Notified after every refresh; see wait_for_status()
+        self._status_lock = threading.Condition()
+        self._status_ready = threading.Event()
+        self._status_stale = threading.Event()
+        self._status_listeners = []
+        self._status_thread = None
+        self._monitor_process = None
+        self._ssid_cache = {}
+        # Wi-Fi scans run in the background; see wifi_scanner.py
+        self.scanner = WifiScanner(self._scan_access_points, min_interval=scan_min_interval,
+                                   stale_after=scan_stale_after, history=scan_history)
+        # Network switches run in the background; see connection_switcher.py
+        self.switcher = ConnectionSwitcher(self, timeout=connect_timeout)
+
     def _run_nmcli_command(self, command_list, use_sudo=True):
         try:
             prefix = ['sudo'] if use_sudo else []
@@ -38,28 +111,29 @@ class NetworkManager:
             logger.error(f"Error running subprocess: {e} for command {' '.join(command_list)}")
             return False, str(e)
 
+    def _scan_access_points(self):
+        """One blocking scan for the WifiScanner: (True, networks) or (False, error)"""
+        if self.dbus:
+            try:
+                return True, self.dbus.scan(AP_INTERFACE)
+            except nm_dbus.NMDBusError as e:
+                logger.warning(f"D-Bus scan failed, retrying with nmcli: {e}")
+        success, output = self._run_nmcli_command(['-t', '-f', 'SSID,SECURITY,SIGNAL', 'device', 'wifi', 'list',
+                                                   '--rescan', 'yes'])
+        return (True, parse_wifi_list(output or '')) if success else (False, output)
+
     def scan_wifi_networks(self):
-        # Ensure device wifi rescan happens
-        self._run_nmcli_command(['device', 'wifi', 'rescan'])
-        success, output = self._run_nmcli_command(['-t', '-f', 'SSID,SECURITY,SIGNAL', 'device', 'wifi', 'list', '--rescan', 'yes'])
-        networks = []
-        if success and output:
-            seen_ssids = set()
-            for line in output.split('\n'):
-                if line:
-                    parts = line.strip().split(':')
-                    if len(parts) >= 1: # SSID is mandatory
-                        ssid = parts[0]
-                        if not ssid or ssid in seen_ssids: # Skip empty or duplicate SSIDs
-                            continue
-                        seen_ssids.add(ssid)
-                        security = parts[1] if len(parts) > 1 and parts[1] else 'Open'
-                        signal = parts[2] if len(parts) > 2 and parts[2] else '0'
-                        networks.append({'ssid': ssid, 'security': security, 'signal': int(signal)})
-            networks.sort(key=lambda x: x['signal'], reverse=True)
-        return networks
+        """Scan now and wait for the results; the web interface uses self.scanner.snapshot()"""
+        return [{'ssid': n['ssid'], 'security': n['security'], 'signal': n['signal']}
+                for n in self.scanner.scan_now()]
 
     def get_saved_networks(self):
+        if self.dbus:
+            try:
+                return [{'name': c['name'], 'uuid': c['uuid']} for c in self.dbus.saved_connections()
+                        if c['name'].lower() not in HIDDEN_PROFILES]
+            except nm_dbus.NMDBusError as e:
+                logger.warning(f"D-Bus query failed, using nmcli: {e}")
         success, output = self._run_nmcli_command(['-t', '-f', 'NAME,UUID,TYPE', 'connection', 'show'])
         saved_networks = []
         if success and output:
@@ -67,53 +141,19 @@ class NetworkManager:
                 if line:
                     parts = line.strip().split(':')
                     if len(parts) == 3 and parts[2] == '802-11-wireless':
-                        # Exclude the AP mode network if named 'ghosthost' or 'zoltar' (from reference)
-                        if parts[0].lower() not in ['ghosthost', 'zoltar', 'psychic']:
+                        # Exclude the AP mode network and the setup hotspots
+                        if parts[0].lower() not in HIDDEN_PROFILES:
                              saved_networks.append({'name': parts[0], 'uuid': parts[1]})
         return saved_networks
 
     def connect_network(self, ssid_or_uuid, password=None):
-        is_ap_active, _ = self.get_ap_mode_status()
-        if is_ap_active:
-            logger.info(f"AP mode is active. Calling ap_mode_manager.switch_to_client_mode for SSID: {ssid_or_uuid}")
-            # This function now handles bringing down AP, deleting profile, and connecting.
-            success = ap_manager_switch_to_client_mode(target_ssid=ssid_or_uuid, target_password=password)
-            if success:
-                return True, f"Successfully switched from AP mode and connected to {ssid_or_uuid}"
-            else:
-                return False, f"Failed to switch from AP mode or connect to {ssid_or_uuid}"
-        else:
-            # Standard connection logic when not in AP mode
-            logger.info(f"Not in AP mode. Attempting to connect to {ssid_or_uuid}")
-            # Try connecting to an existing saved connection first by SSID (name) or UUID
-            # Use use_sudo=True for nmcli connection up
-            success, msg = self._run_nmcli_command(['connection', 'up', ssid_or_uuid], use_sudo=True)
-            if success:
-                if "Connection activation failed" not in msg: # A bit of a heuristic for real success
-                    logger.info(f"Successfully connected to existing connection: {ssid_or_uuid}")
-                    return True, msg
-                else:
-                    logger.warning(f"'nmcli connection up {ssid_or_uuid}' reported success but message indicates failure: {msg}")
-                    # Fall through to try with password if provided
-            
-            # If it failed (maybe not a saved connection, or needs password) and password is provided, try connect with password
-            if password and ssid_or_uuid: # ssid_or_uuid here must be an SSID
-                logger.info(f"Trying to connect to {ssid_or_uuid} with password (will create/update profile).")
-                # nmcli dev wifi connect will create a profile or update if one with the same SSID exists.
-                # It's generally preferred over manual add+up for simple cases.
-                # Ensure use_sudo=True
-                connect_command = ['device', 'wifi', 'connect', ssid_or_uuid, 'password', password]
-                # Optionally add 'name' field to create a connection with a specific name based on SSID
-                # connect_command.extend(['name', ssid_or_uuid])
-                success, msg = self._run_nmcli_command(connect_command, use_sudo=True)
-                if success:
-                    logger.info(f"Successfully initiated connection to {ssid_or_uuid} with new/updated profile.")
-                else:
-                    logger.error(f"Failed to connect to {ssid_or_uuid} with password: {msg}")
-                return success, msg
-            
-            logger.error(f"Failed to connect to {ssid_or_uuid}. It might not be a saved connection or requires a password not provided. Last message: {msg}")
-            return False, msg
+        """Switch networks (leaving AP mode if needed) and wait for the outcome.
+        The web interface starts self.switcher directly and reports progress instead."""
+        switch, started = self.switcher.start(ssid_or_uuid, password)
+        if not started:
+            return False, f"Already switching to {switch['target']}"
+        switch = self.switcher.wait(switch['id'])
+        return switch['state'] == 'connected', switch['message']
 
     def save_network(self, ssid, password, autoconnect=True):
         connection_name = ssid # Use SSID as connection name by default
@@ -148,6 +188,11 @@ class NetworkManager:
         return success, msg
 
     def get_current_ssid(self):
+        if self.dbus:
+            try:
+                return self.dbus.device_status(AP_INTERFACE)['ssid']
+            except nm_dbus.NMDBusError as e:
+                logger.warning(f"D-Bus query failed, using nmcli: {e}")
         success, output = self._run_nmcli_command(['-t', '-f', 'ACTIVE,SSID', 'device', 'wifi'])
         if success and output:
             for line in output.split('\n'):
@@ -156,6 +201,16 @@ class NetworkManager:
         return None
 
     def get_active_connection_details(self):
+        if self.dbus:
+            # The subset of `nmcli connection show <name>` fields callers use
+            try:
+                device = self.dbus.device_status(AP_INTERFACE)
+                if not device['connection']:
+                    return None
+                return {'GENERAL.NAME': device['connection'], 'GENERAL.UUID': device['connection_uuid'],
+                        'GENERAL.INTERFACE': AP_INTERFACE, 'IP4.ADDRESS[1]': device['ip4_address'] or ''}
+            except nm_dbus.NMDBusError as e:
+                logger.warning(f"D-Bus query failed, using nmcli: {e}")
         # Get active connection name(s)
         success, output = self._run_nmcli_command(['-t', '-f', 'NAME,TYPE,DEVICE', 'connection', 'show', '--active'])
         active_wifi_connection = None
@@ -193,6 +248,162 @@ class NetworkManager:
             logger.error(f"Failed to bring down connection {name_or_uuid if name_or_uuid else 'active wlan0'}: {msg}")
         return success, msg
 
+    def _read_status(self):
+        """Query NetworkManager once for the wlan0 connection state"""
+        if self.dbus:
+            try:
+                device = self.dbus.device_status(AP_INTERFACE)
+                ap_active = (device['connection'] == DEFAULT_AP_NAME and
+                             (device['ip4_address'] or '').split('/')[0] == DEFAULT_AP_IP_CIDR.split('/')[0])
+                return {
+                    'connected': device['connected'],
+                    'connection': device['connection'],
+                    'ssid': None if ap_active else device['ssid'],
+                    'ap_active': ap_active,
+                    'ap_ssid': DEFAULT_AP_NAME if ap_active else None,
+                    'ip_address': get_lan_ip(),
+                    'nmcli_ok': True
+                }
+            except nm_dbus.NMDBusError as e:
+                logger.warning(f"D-Bus status query failed, using nmcli: {e}")
+        success, output = self._run_nmcli_command(
+            ['-t', '-f', 'GENERAL.STATE,GENERAL.CONNECTION,IP4.ADDRESS', 'device', 'show', AP_INTERFACE],
+            use_sudo=False)
+        fields = {}
+        if success and output:
+            for line in output.split('\n'):
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    fields.setdefault(key.strip(), value.strip())
+        connected = fields.get('GENERAL.STATE', '').startswith('100')
+        connection = (fields.get('GENERAL.CONNECTION') or None) if connected else None
+        wlan_ip = fields.get('IP4.ADDRESS[1]', '').split('/')[0]
+        ap_active = connection == DEFAULT_AP_NAME and wlan_ip == DEFAULT_AP_IP_CIDR.split('/')[0]
+
+        ssid = None
+        if connection and not ap_active:
+            # The profile name need not be the SSID; look it up once per profile
+            if connection not in self._ssid_cache:
+                ok, value = self._run_nmcli_command(
+                    ['-t', '-g', '802-11-wireless.ssid', 'connection', 'show', connection], use_sudo=False)
+                self._ssid_cache[connection] = value if ok and value else connection
+            ssid = self._ssid_cache[connection]
+
+        return {
+            'connected': connected,
+            'connection': connection,
+            'ssid': ssid,
+            'ap_active': ap_active,
+            'ap_ssid': DEFAULT_AP_NAME if ap_active else None,
+            'ip_address': get_lan_ip(),
+            'nmcli_ok': success
+        }
+
+    def refresh_status(self):
+        """Re-read the network state now and notify listeners if it changed"""
+        status = self._read_status()
+        with self._status_lock:
+            previous = self._status
+            status['updated_at'] = time.time()
+            self._status = status
+            self._status_lock.notify_all()
+        self._status_ready.set()
+        if previous is None or {k: v for k, v in previous.items() if k != 'updated_at'} != \
+                {k: v for k, v in status.items() if k != 'updated_at'}:
+            logger.debug(f"Network status changed: {status}")
+            for listener in list(self._status_listeners):
+                try:
+                    listener(dict(status))
+                except Exception as e:
+                    logger.error(f"Network status listener failed: {e}")
+        return dict(status)
+
+    def invalidate_status(self):
+        """Ask the background refresher to re-read the state right away"""
+        self._status_stale.set()
+
+    def wait_for_status(self, predicate, timeout):
+        """Wait until predicate(status) holds or timeout seconds pass; returns (status, matched).
+        Change events drive the refreshes, with one at least every second while waiting"""
+        deadline = time.monotonic() + timeout
+        self.start_status_refresh()
+        self.invalidate_status()
+        with self._status_lock:
+            while True:
+                status = dict(self._status) if self._status else None
+                if status and predicate(status):
+                    return status, True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return status, False
+                if not self._status_lock.wait(min(remaining, 1.0)):
+                    self.invalidate_status()
+
+    def add_status_listener(self, callback):
+        """Call callback(status) from the refresher whenever the state changes"""
+        self._status_listeners.append(callback)
+
+    def start_status_refresh(self):
+        """Start the background refresher (and change monitor) once"""
+        with self._status_lock:
+            if self._status_thread is not None:
+                return
+            self._status_thread = threading.Thread(target=self._refresh_loop, name='network-status', daemon=True)
+        self._status_thread.start()
+        if self.use_monitor:
+            threading.Thread(target=self._monitor_loop, name='nm-monitor', daemon=True).start()
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.refresh_status()
+            except Exception as e:
+                logger.error(f"Network status refresh failed: {e}")
+                self._status_ready.set()
+            self._status_stale.wait(self.status_ttl)
+            # Let a burst of monitor events settle into one refresh
+            time.sleep(0.2)
+            self._status_stale.clear()
+
+    def _monitor_loop(self):
+        """Refresh as soon as NetworkManager reports a change (D-Bus signals, else
+        `nmcli monitor`); TTL refreshes still run"""
+        if self.dbus:
+            try:
+                self.dbus.watch(self._on_nm_signal)
+            except nm_dbus.NMDBusError as e:
+                logger.warning(f"{e}; following `nmcli monitor` instead")
+        try:
+            self._monitor_process = subprocess.Popen(['nmcli', 'monitor'], stdout=subprocess.PIPE,
+                                                     stderr=subprocess.DEVNULL, text=True)
+        except (FileNotFoundError, OSError) as e:
+            logger.warning(f"nmcli monitor unavailable, refreshing network status every {self.status_ttl}s: {e}")
+            return
+        for line in self._monitor_process.stdout:
+            if line.strip():
+                self._status_stale.set()
+        logger.warning(f"nmcli monitor exited ({self._monitor_process.wait()}), "
+                       f"refreshing network status every {self.status_ttl}s")
+
+    def _on_nm_signal(self, path, member):
+        # Signal strength updates on access points don't change the status
+        if not path.startswith(nm_dbus.NM_PATH + '/AccessPoint'):
+            self._status_stale.set()
+
+    def get_status_snapshot(self, wait=3.0):
+        """Cached network status with its age in seconds; never runs nmcli itself.
+        Only the very first call waits (up to `wait` seconds) for the first refresh."""
+        self.start_status_refresh()
+        self._status_ready.wait(wait)
+        with self._status_lock:
+            if self._status is None:
+                return {'connected': False, 'connection': None, 'ssid': None, 'ap_active': False,
+                        'ap_ssid': None, 'ip_address': get_lan_ip(), 'nmcli_ok': False,
+                        'updated_at': None, 'age': None}
+            status = dict(self._status)
+        status['age'] = round(time.time() - status['updated_at'], 3)
+        return status
+
     def get_ap_mode_status(self):
         """Checks if the system is currently in the defined AP mode."""
         active_details = self.get_active_connection_details()
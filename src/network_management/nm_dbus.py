@@ -0,0 +1,251 @@
+"""
+NetworkManager D-Bus Client
+===========================
+Read-only queries against NetworkManager over one persistent D-Bus
+connection, instead of forking `sudo nmcli` and parsing its terse output.
+Devices, access points and connections come back as structured data, so
+SSIDs containing ':' need no unescaping. `watch()` follows NetworkManager's
+state-change signals.
+
+Uses the optional pure-Python `jeepney` package. Without it (or without a
+reachable NetworkManager), `open_client()` returns None and callers keep
+using nmcli. Changes to the network (connect, AP mode, profiles) still go
+through nmcli.
+
+`tools/nm_dbus_standin.py` serves a stand-in NetworkManager on a private bus
+for trying this out away from a Pi.
+"""
+
+import logging
+import queue
+import time
+from typing import Callable, List, Optional
+
+try:
+    from jeepney import DBusAddress, HeaderFields, MatchRule, new_method_call
+    from jeepney.bus_messages import message_bus
+    from jeepney.io.threading import DBusRouter, open_dbus_connection
+    from jeepney.wrappers import DBusErrorResponse, unwrap_msg
+    HAVE_JEEPNEY = True
+except ImportError:
+    HAVE_JEEPNEY = False
+
+NM_BUS_NAME = 'org.freedesktop.NetworkManager'
+NM_PATH = '/org/freedesktop/NetworkManager'
+NM_IFACE = 'org.freedesktop.NetworkManager'
+DEVICE_IFACE = NM_IFACE + '.Device'
+WIRELESS_IFACE = DEVICE_IFACE + '.Wireless'
+AP_IFACE = NM_IFACE + '.AccessPoint'
+ACTIVE_IFACE = NM_IFACE + '.Connection.Active'
+IP4_IFACE = NM_IFACE + '.IP4Config'
+SETTINGS_PATH = NM_PATH + '/Settings'
+SETTINGS_IFACE = NM_IFACE + '.Settings'
+CONNECTION_IFACE = SETTINGS_IFACE + '.Connection'
+PROPERTIES_IFACE = 'org.freedesktop.DBus.Properties'
+
+DEVICE_STATE_ACTIVATED = 100
+WIFI_CONNECTION_TYPE = '802-11-wireless'
+# NM_802_11_AP_FLAGS_PRIVACY and NM_802_11_AP_SEC_KEY_MGMT_SAE
+AP_FLAGS_PRIVACY = 0x1
+AP_SEC_KEY_MGMT_SAE = 0x400
+
+logger = logging.getLogger(__name__)
+
+
+class NMDBusError(Exception):
+    """A NetworkManager D-Bus call failed or the bus is unavailable"""
+
+
+def _ssid(raw) -> str:
+    return bytes(raw).decode('utf-8', errors='replace')
+
+
+def _security(flags: int, wpa_flags: int, rsn_flags: int) -> str:
+    """Security label in the style of nmcli's SECURITY column"""
+    parts = []
+    if wpa_flags:
+        parts.append('WPA1')
+    if rsn_flags:
+        parts.append('WPA3' if rsn_flags & AP_SEC_KEY_MGMT_SAE else 'WPA2')
+    if not parts and flags & AP_FLAGS_PRIVACY:
+        parts.append('WEP')
+    return ' '.join(parts) or 'Open'
+
+
+class NMDBusClient:
+    def __init__(self, bus: str = 'SYSTEM', timeout: float = 2.0):
+        """bus is 'SYSTEM', 'SESSION' or a D-Bus address such as unix:path=/run/x"""
+        if not HAVE_JEEPNEY:
+            raise NMDBusError("jeepney is not installed")
+        self.logger = logging.getLogger(__name__)
+        self.timeout = timeout
+        try:
+            self.connection = open_dbus_connection(bus=bus)
+        except Exception as e:
+            raise NMDBusError(f"Cannot connect to D-Bus ({bus}): {e}") from e
+        # Replies and signals are read on the router's own thread
+        self.router = DBusRouter(self.connection)
+        try:
+            self.version = self._get(NM_PATH, NM_IFACE, 'Version')
+        except NMDBusError:
+            self.close()
+            raise
+
+    def close(self):
+        self.router.close()
+        self.connection.close()
+
+    def _call(self, path: str, interface: str, method: str, signature: Optional[str] = None, body=()):
+        msg = new_method_call(DBusAddress(path, bus_name=NM_BUS_NAME, interface=interface),
+                              method, signature, tuple(body))
+        try:
+            return unwrap_msg(self.router.send_and_get_reply(msg, timeout=self.timeout))
+        except DBusErrorResponse as e:
+            raise NMDBusError(f"{interface}.{method} on {path}: {e.name}: {' '.join(map(str, e.data))}") from e
+        except Exception as e:
+            raise NMDBusError(f"{interface}.{method} on {path}: {e}") from e
+
+    def _get(self, path: str, interface: str, name: str):
+        (variant,) = self._call(path, PROPERTIES_IFACE, 'Get', 'ss', (interface, name))
+        return variant[1]
+
+    def _get_all(self, path: str, interface: str) -> dict:
+        (props,) = self._call(path, PROPERTIES_IFACE, 'GetAll', 's', (interface,))
+        return {name: variant[1] for name, variant in props.items()}
+
+    def device_path(self, ifname: str) -> str:
+        (path,) = self._call(NM_PATH, NM_IFACE, 'GetDeviceByIpIface', 's', (ifname,))
+        return path
+
+    def device_status(self, ifname: str) -> dict:
+        """State, active connection, SSID and IPv4 address of one device"""
+        path = self.device_path(ifname)
+        device = self._get_all(path, DEVICE_IFACE)
+        status = {
+            'interface': ifname,
+            'state': device.get('State', 0),
+            'connected': device.get('State', 0) == DEVICE_STATE_ACTIVATED,
+            'connection': None,
+            'connection_uuid': None,
+            'ssid': None,
+            'ip4_address': None
+        }
+        active = device.get('ActiveConnection', '/')
+        if active != '/':
+            props = self._get_all(active, ACTIVE_IFACE)
+            status['connection'] = props.get('Id') or None
+            status['connection_uuid'] = props.get('Uuid') or None
+        ip4 = device.get('Ip4Config', '/')
+        if ip4 != '/':
+            addresses = self._get(ip4, IP4_IFACE, 'AddressData')
+            if addresses:
+                first = addresses[0]
+                status['ip4_address'] = f"{first['address'][1]}/{first['prefix'][1]}"
+        access_point = self._get(path, WIRELESS_IFACE, 'ActiveAccessPoint')
+        if access_point != '/':
+            status['ssid'] = _ssid(self._get(access_point, AP_IFACE, 'Ssid')) or None
+        return status
+
+    def access_points(self, ifname: str) -> List[dict]:
+        """Visible networks from the device's last scan, strongest first, one per SSID"""
+        path = self.device_path(ifname)
+        (paths,) = self._call(path, WIRELESS_IFACE, 'GetAllAccessPoints')
+        networks = {}
+        for ap_path in paths:
+            try:
+                props = self._get_all(ap_path, AP_IFACE)
+            except NMDBusError:
+                # Access points come and go between the two calls
+                continue
+            ssid = _ssid(props.get('Ssid', b''))
+            if not ssid:
+                continue
+            signal = int(props.get('Strength', 0))
+            if ssid not in networks or signal > networks[ssid]['signal']:
+                networks[ssid] = {
+                    'ssid': ssid,
+                    'security': _security(props.get('Flags', 0), props.get('WpaFlags', 0), props.get('RsnFlags', 0)),
+                    'signal': signal
+                }
+        return sorted(networks.values(), key=lambda x: x['signal'], reverse=True)
+
+    def scan(self, ifname: str, timeout: float = 15.0) -> List[dict]:
+        """Ask for a rescan and wait until it completes (LastScan changes), then
+        return access_points(). A refused rescan returns the current list"""
+        path = self.device_path(ifname)
+        before = self._get(path, WIRELESS_IFACE, 'LastScan')
+        try:
+            self._call(path, WIRELESS_IFACE, 'RequestScan', 'a{sv}', ({},))
+        except NMDBusError as e:
+            self.logger.info(f"Rescan not started, using last results: {e}")
+            return self.access_points(ifname)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._get(path, WIRELESS_IFACE, 'LastScan') != before:
+                break
+            time.sleep(0.25)
+        else:
+            self.logger.warning(f"Rescan on {ifname} did not finish within {timeout}s")
+        return self.access_points(ifname)
+
+    def active_connections(self) -> List[dict]:
+        connections = []
+        for path in self._get(NM_PATH, NM_IFACE, 'ActiveConnections'):
+            try:
+                props = self._get_all(path, ACTIVE_IFACE)
+                devices = [self._get(d, DEVICE_IFACE, 'Interface') for d in props.get('Devices', [])]
+            except NMDBusError:
+                continue
+            connections.append({'name': props.get('Id'), 'uuid': props.get('Uuid'),
+                                'type': props.get('Type'), 'devices': devices})
+        return connections
+
+    def saved_connections(self, connection_type: Optional[str] = WIFI_CONNECTION_TYPE) -> List[dict]:
+        """Saved profiles as {'name', 'uuid', 'type'}, optionally of one type"""
+        (paths,) = self._call(SETTINGS_PATH, SETTINGS_IFACE, 'ListConnections')
+        connections = []
+        for path in paths:
+            try:
+                (settings,) = self._call(path, CONNECTION_IFACE, 'GetSettings')
+            except NMDBusError:
+                continue
+            conn = {k: v[1] for k, v in settings.get('connection', {}).items()}
+            if connection_type and conn.get('type') != connection_type:
+                continue
+            connections.append({'name': conn.get('id'), 'uuid': conn.get('uuid'), 'type': conn.get('type')})
+        return connections
+
+    def watch(self, callback: Callable[[str, str], None]):
+        """Call callback(path, member) for every NetworkManager state or property
+        change signal. Blocks; run it on its own thread"""
+        # The bus resolves the well-known sender name; locally the sender is the
+        # unique name, so the local filter matches on path only
+        bus_rule = MatchRule(type='signal', sender=NM_BUS_NAME, path_namespace=NM_PATH)
+        local_rule = MatchRule(type='signal', path_namespace=NM_PATH)
+        signals = queue.Queue()
+        with self.router.filter(local_rule, queue=signals):
+            try:
+                unwrap_msg(self.router.send_and_get_reply(message_bus.AddMatch(bus_rule), timeout=self.timeout))
+            except Exception as e:
+                raise NMDBusError(f"Cannot subscribe to NetworkManager signals: {e}") from e
+            while True:
+                msg = signals.get()
+                fields = msg.header.fields
+                try:
+                    callback(fields.get(HeaderFields.path, ''), fields.get(HeaderFields.member, ''))
+                except Exception as e:
+                    self.logger.error(f"NetworkManager signal callback failed: {e}")
+
+
+def open_client(bus: str = 'SYSTEM', timeout: float = 2.0) -> Optional[NMDBusClient]:
+    """An NMDBusClient, or None (with the reason logged) if D-Bus can't be used"""
+    if not HAVE_JEEPNEY:
+        logger.info("jeepney not installed; using nmcli for NetworkManager queries")
+        return None
+    try:
+        client = NMDBusClient(bus=bus or 'SYSTEM', timeout=timeout)
+    except NMDBusError as e:
+        logger.warning(f"NetworkManager D-Bus unavailable, using nmcli: {e}")
+        return None
+    logger.info(f"Querying NetworkManager {client.version} over D-Bus")
+    return client
@@ -0,0 +1,155 @@
+"""
+Wi-Fi Scanner
+=============
+Runs Wi-Fi scans in the background and keeps the latest results, so the web
+interface can list networks without waiting on the radio.
+
+- One scan at a time. A new scan starts no sooner than `min_interval` seconds
+  after the previous one, because NetworkManager refuses rescans that come
+  too soon after the last one.
+- `snapshot()` returns the cached results at once, with their age. If they
+  are older than `stale_after` seconds, it also starts a background scan.
+- Each SSID keeps its recent signal readings (`history` scans), so a caller
+  can show whether a network is steady or fading.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Tuple, Union
+
+# nmcli terse output escapes ':' and '\' inside values
+_TERSE_FIELD = re.compile(r'((?:\\.|[^\\:])*)(?::|$)')
+
+
+def split_terse(line: str) -> List[str]:
+    """Split one line of `nmcli -t` output into its unescaped fields"""
+    fields = [m.group(1) for m in _TERSE_FIELD.finditer(line)]
+    if fields and fields[-1] == '' and not line.endswith(':'):
+        fields.pop()
+    return [re.sub(r'\\(.)', r'\1', f) for f in fields]
+
+
+def parse_wifi_list(output: str) -> List[dict]:
+    """Networks from `nmcli -t -f SSID,SECURITY,SIGNAL device wifi list`, strongest first"""
+    networks = {}
+    for line in output.split('\n'):
+        fields = split_terse(line.strip())
+        if not fields or not fields[0]:
+            continue
+        ssid = fields[0]
+        security = fields[1] if len(fields) > 1 and fields[1] else 'Open'
+        try:
+            signal = int(fields[2]) if len(fields) > 2 and fields[2] else 0
+        except ValueError:
+            signal = 0
+        # Several access points may share an SSID; keep the strongest
+        if ssid not in networks or signal > networks[ssid]['signal']:
+            networks[ssid] = {'ssid': ssid, 'security': security, 'signal': signal}
+    return sorted(networks.values(), key=lambda x: x['signal'], reverse=True)
+
+
+class WifiScanner:
+    def __init__(self, scan: Callable[[], Tuple[bool, Union[List[dict], str]]], min_interval: float = 10.0,
+                 stale_after: float = 30.0, history: int = 20, forget_after: float = 600.0):
+        self.logger = logging.getLogger(__name__)
+        # Runs one blocking scan: (True, networks) or (False, error message)
+        self.scan = scan
+        self.min_interval = min_interval
+        self.stale_after = stale_after
+        self.forget_after = forget_after
+        self._history_len = history
+        self._lock = threading.Lock()
+        self._networks = []
+        self._history = {}
+        self._scanned_at = None
+        self._last_attempt = None
+        self._error = None
+        # Set while no scan is running
+        self._idle = threading.Event()
+        self._idle.set()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Call callback(snapshot) after every completed scan"""
+        self._listeners.append(callback)
+
+    def scan_now(self) -> list:
+        """Scan in the calling thread, waiting for the radio; returns the networks"""
+        with self._lock:
+            self._last_attempt = time.monotonic()
+        started = time.monotonic()
+        success, result = self.scan()
+        now = time.time()
+        with self._lock:
+            if success:
+                self._networks = [dict(n) for n in result]
+                self._scanned_at = now
+                self._error = None
+                for net in self._networks:
+                    readings = self._history.setdefault(net['ssid'], deque(maxlen=self._history_len))
+                    readings.append((now, net['signal']))
+                for ssid in [s for s, r in self._history.items() if now - r[-1][0] > self.forget_after]:
+                    del self._history[ssid]
+            else:
+                self._error = result
+            networks = [dict(n) for n in self._networks]
+        if success:
+            self.logger.info(f"Wi-Fi scan found {len(networks)} networks in {time.monotonic() - started:.1f}s")
+        else:
+            self.logger.warning(f"Wi-Fi scan failed: {result}")
+        return networks
+
+    def request_scan(self, force: bool = False) -> bool:
+        """Start a background scan unless one is running or the last was too recent.
+        Without force, only stale results are rescanned. Returns True if a scan started"""
+        with self._lock:
+            if not self._idle.is_set():
+                return False
+            if self._last_attempt is not None and time.monotonic() - self._last_attempt < self.min_interval:
+                return False
+            if not force and self._scanned_at is not None and time.time() - self._scanned_at < self.stale_after:
+                return False
+            self._idle.clear()
+        threading.Thread(target=self._run, name='wifi-scan', daemon=True).start()
+        return True
+
+    def _run(self):
+        try:
+            self.scan_now()
+        except Exception as e:
+            self.logger.error(f"Wi-Fi scan error: {e}")
+            self._error = str(e)
+        finally:
+            self._idle.set()
+        snapshot = self.snapshot(refresh=False)
+        for listener in list(self._listeners):
+            try:
+                listener(snapshot)
+            except Exception as e:
+                self.logger.error(f"Wi-Fi scan listener failed: {e}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a running scan to finish; True if none is running"""
+        return self._idle.wait(timeout)
+
+    def snapshot(self, refresh: bool = True, force: bool = False) -> dict:
+        """Latest results with their age (None before the first scan), starting a
+        background scan when they are stale (or on force, subject to the rate limit)"""
+        if refresh:
+            self.request_scan(force=force)
+        with self._lock:
+            now = time.time()
+            networks = []
+            for net in self._networks:
+                readings = self._history.get(net['ssid'], ())
+                networks.append(dict(net, history=[signal for _, signal in readings]))
+            return {
+                'networks': networks,
+                'scanned_at': self._scanned_at,
+                'age': round(now - self._scanned_at, 1) if self._scanned_at else None,
+                'scanning': not self._idle.is_set(),
+                'error': self._error
+            }
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Fleet Sync Demo
+===============
+Runs a leader and several follower units as local processes, each with its
+own deliberately offset clock, and fires synchronized starts through the
+leader. Each unit plays through the real AudioController, so aplay is spawned
+on its audio worker thread as on a figure. The demo puts a silent clip and a
+no-op `aplay` on PATH, so nothing is heard and no GPIO is touched.
+
+Because all processes share this machine's real monotonic clock, the demo can
+compare the skew the fleet reports with the true skew between the units.
+
+Usage: python tools/fleet_sync_demo.py [--units 4] [--rounds 5] [--max-offset 2.0]
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import socket
+import sys
+import os
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.performance_trace import TraceRecorder
+from src.hardware.audio_controller import AudioController
+
+DEMO_SECRET = 'fleet-demo'
+
+
+class RecordingEventHandler:
+    """Stands in for EventHandler without motors or LEDs; audio goes through
+    AudioController and the real aplay spawn time is reported"""
+
+    def __init__(self, config, results=None, unit=None):
+        self.audio_controller = AudioController(config)
+        self.traces = TraceRecorder()
+        self.results = results
+        self.unit = unit
+        self._next_id = 0
+
+    def prepare_performance(self, audio_file):
+        duration = self.audio_controller.get_audio_duration(audio_file)
+        return {'audio_file': audio_file, 'duration': duration} if duration else None
+
+    def start_prepared(self, audio_file, source, deadline):
+        self._next_id += 1
+        trace = self.traces.start(self._next_id, source, audio_file, deadline)
+        if not self.audio_controller.play_audio_file(audio_file, trace=trace):
+            return {'success': False, 'message': 'Failed to start audio playback'}
+        threading.Thread(target=self._report_spawn, args=(trace, deadline), daemon=True).start()
+        return {'success': True, 'message': 'Performance started', 'performance_id': self._next_id}
+
+    def _report_spawn(self, trace, deadline):
+        late = trace.wait_for_audio()
+        if self.results is not None and late is not None:
+            self.results.put((self.unit, deadline + late))
+
+
+def make_sound_dir() -> Path:
+    """A silent demo.wav and an `aplay` that exits at once, put first on PATH"""
+    sound_dir = Path(tempfile.mkdtemp(prefix='ghosthost-fleet-audio-'))
+    with wave.open(str(sound_dir / 'demo.wav'), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(8000)
+        wf.writeframes(b'\0\0' * 800)
+    aplay = sound_dir / 'aplay'
+    aplay.write_text('#!/bin/sh\nexit 0\n')
+    aplay.chmod(0o755)
+    os.environ['PATH'] = f"{sound_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    return sound_dir
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def make_config(fleet: dict, sound_dir: Path):
+    from src.core.config_manager import ConfigManager
+
+    config_file = Path(tempfile.mkdtemp(prefix='ghosthost-fleet-')) / 'config.yaml'
+    config_file.write_text(json.dumps({'fleet': fleet, 'audio': {'soundfiles_dir': str(sound_dir)}}))
+    return ConfigManager(str(config_file))
+
+
+def run_follower(unit: str, port: int, leader_port: int, clock_offset: float, sound_dir: Path, results, stop):
+    from src.core.fleet_sync import FleetSync
+
+    config = make_config({'unit_id': unit, 'port': port, 'leader': f'127.0.0.1:{leader_port}',
+                          'sync_interval': 1.0, 'secret': DEMO_SECRET}, sound_dir)
+    fleet = FleetSync(RecordingEventHandler(config, results, unit), config,
+                      clock=lambda: time.monotonic() + clock_offset)
+    fleet.start()
+    stop.wait()
+    fleet.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[4])
+    parser.add_argument('--units', type=int, default=4, help='units including the leader')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--max-offset', type=float, default=2.0, help='largest simulated clock offset (s)')
+    args = parser.parse_args()
+
+    from src.core.fleet_sync import FleetSync
+
+    sound_dir = make_sound_dir()
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    leader_port = free_port()
+    follower_ports = [free_port() for _ in range(args.units - 1)]
+
+    followers = []
+    for i, port in enumerate(follower_ports):
+        offset = random.uniform(-args.max_offset, args.max_offset)
+        print(f"unit-{i + 1}: clock offset {offset * 1000:+.1f}ms")
+        process = multiprocessing.Process(target=run_follower,
+                                          args=(f'unit-{i + 1}', port, leader_port, offset, sound_dir,
+                                                results, stop))
+        process.start()
+        followers.append(process)
+
+    config = make_config({'unit_id': 'leader', 'port': leader_port, 'secret': DEMO_SECRET,
+                          'peers': [f'127.0.0.1:{p}' for p in follower_ports]}, sound_dir)
+    leader = FleetSync(RecordingEventHandler(config, results, 'leader'), config)
+    leader.start()
+    time.sleep(1.5)  # let the followers take their first offset samples
+
+    true_skews, reported_skews = [], []
+    for _ in range(args.rounds):
+        started = leader.play('demo.wav', lead_seconds=0.5)
+        time.sleep(1.0)
+        starts = {}
+        while len(starts) < args.units and not results.empty():
+            unit, at = results.get()
+            starts[unit] = at
+        run = next(r for r in leader.get_status()['runs'] if r['start_id'] == started['start_id'])
+        true_skew = (max(starts.values()) - min(starts.values())) * 1000 if len(starts) > 1 else None
+        true_skews.append(true_skew)
+        reported_skews.append(run['skew_ms'])
+        print(f"start {started['start_id'][:8]}: {len(starts)}/{args.units} units started, "
+              f"reported skew {run['skew_ms']}ms (+/- {run['uncertainty_ms']}ms), "
+              f"true skew {true_skew:.3f}ms")
+
+    stop.set()
+    for process in followers:
+        process.join(timeout=2)
+    leader.stop()
+
+    worst = max(s for s in true_skews if s is not None)
+    print(f"worst true skew over {args.rounds} starts: {worst:.3f}ms")
+    sys.exit(0 if worst < 10 else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+NetworkManager D-Bus Stand-in
+=============================
+Serves a small fake NetworkManager on a private D-Bus bus, so the D-Bus
+backend (src/network_management/nm_dbus.py) can be tried without a Pi.
+
+It exposes wlan0 with a handful of access points (one SSID contains ':'),
+two saved Wi-Fi profiles, and an active connection that is either a client
+network or the GhostHostAP hotspot. `--flip N` switches between the two every
+N seconds and emits the StateChanged/PropertiesChanged signals NetworkManager
+would. RequestScan completes after `--scan-delay` seconds.
+
+--check starts the stand-in, then runs the NetworkManager class with the
+D-Bus backend against it and reports results and per-query latency. It
+checks them against the same queries through a fake nmcli (a shell script,
+so its timings say nothing about the real one), and confirms that a state
+change reaches the status cache through signals.
+
+Requires jeepney and dbus-daemon.
+
+Usage: python tools/nm_dbus_standin.py [--address unix:path=/tmp/nm.sock] [--mode client|ap]
+                                       [--flip 0] [--scan-delay 1.0] [--check]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jeepney import DBusAddress, HeaderFields, MessageType, new_error, new_method_return, new_signal
+from jeepney.bus_messages import message_bus
+from jeepney.io.blocking import open_dbus_connection
+
+from src.network_management import nm_dbus
+from src.network_management.ap_mode_manager import AP_CONNECTION_NAME, AP_IP_ADDRESS, AP_SSID
+
+NM = nm_dbus.NM_PATH
+DEVICE = NM + '/Devices/3'
+CLIENT_ACTIVE = NM + '/ActiveConnection/1'
+AP_ACTIVE = NM + '/ActiveConnection/2'
+IP4 = NM + '/IP4Config/5'
+SETTINGS = nm_dbus.SETTINGS_PATH
+ACCESS_POINTS = [
+    # SSID, strength, flags, wpa flags, rsn flags
+    ('HomeNet', 82, 1, 0, 0x188),
+    ('Cafe:Guest', 47, 0, 0, 0),
+    ('Neighbour', 35, 1, 0x188, 0x188),
+    ('HomeNet', 60, 1, 0, 0x188),
+]
+PROFILES = [('HomeNet', 'a3f1c2d4-0000-4000-8000-000000000001', '802-11-wireless'),
+            ('Wired connection 1', 'a3f1c2d4-0000-4000-8000-000000000002', '802-3-ethernet'),
+            ('Backup Hotspot', 'a3f1c2d4-0000-4000-8000-000000000003', '802-11-wireless')]
+
+
+class StandinNetworkManager:
+    def __init__(self, address: str, mode: str = 'client', scan_delay: float = 1.0):
+        self.conn = open_dbus_connection(bus=address)
+        self.send_lock = threading.Lock()
+        self.mode = mode
+        self.scan_delay = scan_delay
+        self.last_scan = 1000
+        reply = self.conn.send_and_get_reply(message_bus.RequestName(nm_dbus.NM_BUS_NAME))
+        if reply.body[0] != 1:
+            raise RuntimeError(f"Could not own {nm_dbus.NM_BUS_NAME} (reply {reply.body[0]})")
+
+    # Object model: path -> interface -> {property: (signature, value)}
+    def objects(self) -> dict:
+        ap_mode = self.mode == 'ap'
+        active = AP_ACTIVE if ap_mode else CLIENT_ACTIVE
+        ip = AP_IP_ADDRESS.split('/') if ap_mode else ['192.168.1.57', '24']
+        objects = {
+            NM: {nm_dbus.NM_IFACE: {
+                'Version': ('s', '1.42.4-standin'),
+                'State': ('u', 70),
+                'ActiveConnections': ('ao', [active])
+            }},
+            DEVICE: {
+                nm_dbus.DEVICE_IFACE: {
+                    'Interface': ('s', 'wlan0'),
+                    'State': ('u', 100),
+                    'ActiveConnection': ('o', active),
+                    'Ip4Config': ('o', IP4)
+                },
+                nm_dbus.WIRELESS_IFACE: {
+                    'ActiveAccessPoint': ('o', NM + ('/AccessPoint/99' if ap_mode else '/AccessPoint/1')),
+                    'LastScan': ('x', self.last_scan),
+                    'Mode': ('u', 3 if ap_mode else 2)
+                }
+            },
+            IP4: {nm_dbus.IP4_IFACE: {
+                'AddressData': ('aa{sv}', [{'address': ('s', ip[0]), 'prefix': ('u', int(ip[1]))}])
+            }},
+            CLIENT_ACTIVE: {nm_dbus.ACTIVE_IFACE: {
+                'Id': ('s', 'HomeNet'), 'Uuid': ('s', PROFILES[0][1]),
+                'Type': ('s', '802-11-wireless'), 'Devices': ('ao', [DEVICE])
+            }},
+            AP_ACTIVE: {nm_dbus.ACTIVE_IFACE: {
+                'Id': ('s', AP_CONNECTION_NAME), 'Uuid': ('s', 'a3f1c2d4-0000-4000-8000-0000000000aa'),
+                'Type': ('s', '802-11-wireless'), 'Devices': ('ao', [DEVICE])
+            }},
+            SETTINGS: {nm_dbus.SETTINGS_IFACE: {}},
+            NM + '/AccessPoint/99': {nm_dbus.AP_IFACE: {
+                'Ssid': ('ay', AP_SSID.encode()), 'Strength': ('y', 100),
+                'Flags': ('u', 1), 'WpaFlags': ('u', 0), 'RsnFlags': ('u', 0x188)
+            }}
+        }
+        for i in range(1, len(PROFILES) + 1):
+            objects[f'{SETTINGS}/{i}'] = {nm_dbus.CONNECTION_IFACE: {}}
+        for i, (ssid, strength, flags, wpa, rsn) in enumerate(ACCESS_POINTS, start=1):
+            objects[f'{NM}/AccessPoint/{i}'] = {nm_dbus.AP_IFACE: {
+                'Ssid': ('ay', ssid.encode()), 'Strength': ('y', strength),
+                'Flags': ('u', flags), 'WpaFlags': ('u', wpa), 'RsnFlags': ('u', rsn)
+            }}
+        return objects
+
+    def send(self, msg):
+        with self.send_lock:
+            self.conn.send(msg)
+
+    def handle(self, msg):
+        fields = msg.header.fields
+        path = fields.get(HeaderFields.path)
+        interface = fields.get(HeaderFields.interface)
+        member = fields.get(HeaderFields.member)
+        objects = self.objects()
+        if path not in objects:
+            return new_error(msg, 'org.freedesktop.DBus.Error.UnknownObject', 's', (f'No object {path}',))
+        if interface == nm_dbus.PROPERTIES_IFACE and member in ('Get', 'GetAll'):
+            props = objects[path].get(msg.body[0])
+            if props is None:
+                return new_error(msg, 'org.freedesktop.DBus.Error.UnknownInterface', 's', (msg.body[0],))
+            if member == 'GetAll':
+                return new_method_return(msg, 'a{sv}', (props,))
+            if msg.body[1] not in props:
+                return new_error(msg, 'org.freedesktop.DBus.Error.UnknownProperty', 's', (msg.body[1],))
+            return new_method_return(msg, 'v', (props[msg.body[1]],))
+        if (path, member) == (NM, 'GetDeviceByIpIface'):
+            if msg.body[0] != 'wlan0':
+                return new_error(msg, 'org.freedesktop.NetworkManager.UnknownDevice', 's', ('No such device',))
+            return new_method_return(msg, 'o', (DEVICE,))
+        if (path, member) == (DEVICE, 'GetAllAccessPoints'):
+            return new_method_return(msg, 'ao', ([f'{NM}/AccessPoint/{i}' for i in range(1, len(ACCESS_POINTS) + 1)],))
+        if (path, member) == (DEVICE, 'RequestScan'):
+            threading.Timer(self.scan_delay, self.finish_scan).start()
+            return new_method_return(msg)
+        if (path, member) == (SETTINGS, 'ListConnections'):
+            return new_method_return(msg, 'ao', ([f'{SETTINGS}/{i}' for i in range(1, len(PROFILES) + 1)],))
+        if path.startswith(SETTINGS + '/') and member == 'GetSettings':
+            name, uuid, kind = PROFILES[int(path.rsplit('/', 1)[1]) - 1]
+            return new_method_return(msg, 'a{sa{sv}}', ({'connection': {
+                'id': ('s', name), 'uuid': ('s', uuid), 'type': ('s', kind)}},))
+        return new_error(msg, 'org.freedesktop.DBus.Error.UnknownMethod', 's', (f'{interface}.{member}',))
+
+    def finish_scan(self):
+        self.last_scan += int(self.scan_delay * 1000) + 1
+        self.properties_changed(DEVICE, nm_dbus.WIRELESS_IFACE, {'LastScan': ('x', self.last_scan)})
+
+    def properties_changed(self, path, interface, changed):
+        self.send(new_signal(DBusAddress(path, interface=nm_dbus.PROPERTIES_IFACE), 'PropertiesChanged',
+                             'sa{sv}as', (interface, changed, [])))
+
+    def set_mode(self, mode):
+        """Switch between client and AP, signalling like NetworkManager does"""
+        self.mode = mode
+        active = AP_ACTIVE if mode == 'ap' else CLIENT_ACTIVE
+        self.send(new_signal(DBusAddress(DEVICE, interface=nm_dbus.DEVICE_IFACE), 'StateChanged',
+                             'uuu', (100, 30, 0)))
+        self.properties_changed(DEVICE, nm_dbus.DEVICE_IFACE, {'ActiveConnection': ('o', active)})
+        self.properties_changed(NM, nm_dbus.NM_IFACE, {'ActiveConnections': ('ao', [active])})
+
+    def serve_forever(self):
+        while True:
+            msg = self.conn.receive()
+            if msg.header.message_type == MessageType.method_call:
+                self.send(self.handle(msg))
+
+
+def start_bus():
+    """Start a private dbus-daemon; returns (process, address)"""
+    config = Path(tempfile.mkdtemp(prefix='nm-standin-')) / 'bus.conf'
+    config.write_text(f"""<busconfig>
+  <type>session</type>
+  <listen>unix:path={config.parent / 'bus.sock'}</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+""")
+    process = subprocess.Popen(['dbus-daemon', f'--config-file={config}', '--nofork', '--print-address'],
+                               stdout=subprocess.PIPE, text=True)
+    return process, process.stdout.readline().strip()
+
+
+def timed(fn, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def fake_nmcli_dir(mode):
+    """A directory holding fake nmcli/sudo scripts answering like the stand-in"""
+    directory = Path(tempfile.mkdtemp(prefix='nmcli-standin-'))
+    name, ip = (AP_CONNECTION_NAME, AP_IP_ADDRESS) if mode == 'ap' else ('HomeNet', '192.168.1.57/24')
+    ssid = AP_SSID if mode == 'ap' else 'HomeNet'
+    (directory / 'nmcli').write_text(f"""#!/bin/sh
+case "$*" in
+  *"device show"*) printf 'GENERAL.STATE:100 (connected)\\nGENERAL.CONNECTION:{name}\\nIP4.ADDRESS[1]:{ip}\\n' ;;
+  *"802-11-wireless.ssid"*) echo {ssid} ;;
+  *"ACTIVE,SSID"*) printf 'yes:{ssid}\\nno:Neighbour\\n' ;;
+  *"--active"*) echo '{name}:802-11-wireless:wlan0' ;;
+  *"NAME,UUID,TYPE"*) printf 'HomeNet:{PROFILES[0][1]}:802-11-wireless\\nWired connection 1:{PROFILES[1][1]}:802-3-ethernet\\nBackup Hotspot:{PROFILES[2][1]}:802-11-wireless\\n' ;;
+  *"connection show"*) printf 'GENERAL.NAME:{name}\\nGENERAL.INTERFACE:wlan0\\nIP4.ADDRESS[1]:{ip}\\n' ;;
+  *"wifi list"*) printf 'HomeNet:WPA2:82\\nCafe\\\\:Guest::47\\nNeighbour:WPA1 WPA2:35\\nHomeNet:WPA2:60\\n' ;;
+esac
+""")
+    (directory / 'sudo').write_text('#!/bin/sh\nexec "$@"\n')
+    for script in ('nmcli', 'sudo'):
+        os.chmod(directory / script, 0o755)
+    return directory
+
+
+def check(address, args):
+    from src.network_management.network_manager import NetworkManager
+
+    nm = NetworkManager(backend='dbus', dbus_address=address, status_ttl=60)
+    if not nm.dbus:
+        print("FAIL: could not open the D-Bus backend")
+        return 1
+    ok = True
+    print(f"Connected to {nm.dbus.version}")
+    rows = []
+    for label, fn in [('current SSID', nm.get_current_ssid),
+                      ('AP mode status', nm.get_ap_mode_status),
+                      ('saved networks', nm.get_saved_networks),
+                      ('access points', lambda: nm.dbus.access_points('wlan0'))]:
+        result, ms = timed(fn)
+        rows.append((label, result, ms))
+
+    os.environ['PATH'] = f"{fake_nmcli_dir(args.mode)}{os.pathsep}{os.environ['PATH']}"
+    cli = NetworkManager(backend='nmcli', status_ttl=60)
+    for i, (label, fn) in enumerate([('current SSID', cli.get_current_ssid),
+                                     ('AP mode status', cli.get_ap_mode_status),
+                                     ('saved networks', cli.get_saved_networks),
+                                     ('access points', cli.scanner.scan)]):
+        result, ms = timed(fn, repeat=5)
+        if label == 'access points':
+            result = result[1]
+        print(f"{label:<16} dbus {rows[i][2]:6.1f} ms   fake nmcli {ms:6.1f} ms   {rows[i][1]}")
+        if rows[i][1] != result:
+            print(f"  MISMATCH: nmcli gave {result}")
+            ok = False
+
+    started = time.perf_counter()
+    scanned = nm.scanner.scan_now()
+    print(f"rescan           {(time.perf_counter() - started) * 1000:6.0f} ms   {len(scanned)} networks")
+    ok &= any(n['ssid'] == 'Cafe:Guest' for n in scanned)
+
+    status = nm.get_status_snapshot()
+    print(f"status snapshot  {status['connection']} ap_active={status['ap_active']}")
+    changed = threading.Event()
+    nm.add_status_listener(lambda s: changed.set())
+    flipped = time.perf_counter()
+    args.server.set_mode('client' if args.server.mode == 'ap' else 'ap')
+    if changed.wait(5):
+        status = nm.get_status_snapshot()
+        print(f"after flip       {status['connection']} ap_active={status['ap_active']} "
+              f"(cache updated {(time.perf_counter() - flipped) * 1000:.0f} ms after the signal)")
+    else:
+        print("FAIL: status cache did not follow the state-change signal")
+        ok = False
+    nm.dbus.close()
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[4])
+    parser.add_argument('--address', help='D-Bus address to serve on (default: start a private bus)')
+    parser.add_argument('--mode', choices=['client', 'ap'], default='client')
+    parser.add_argument('--flip', type=float, default=0, help='switch client/AP every N seconds')
+    parser.add_argument('--scan-delay', type=float, default=1.0, help='seconds a RequestScan takes')
+    parser.add_argument('--check', action='store_true', help='exercise the D-Bus backend against the stand-in')
+    args = parser.parse_args()
+
+    bus_process = None
+    address = args.address
+    if not address:
+        bus_process, address = start_bus()
+    try:
+        server = StandinNetworkManager(address, args.mode, args.scan_delay)
+        args.server = server
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        if args.check:
+            return check(address, args)
+        print(f"Stand-in NetworkManager on {address}")
+        print(f"Point the web interface at it with network.dbus_address: '{address}'")
+        while True:
+            if args.flip:
+                time.sleep(args.flip)
+                server.set_mode('client' if server.mode == 'ap' else 'ap')
+                print(f"Switched to {server.mode} mode")
+            else:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        if bus_process:
+            bus_process.terminate()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
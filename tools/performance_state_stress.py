@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Performance State Machine Stress Test
+=====================================
+Fires thousands of concurrent triggers at the performance state machine and
+verifies that exactly one performance wins every round.
+
+Usage: python tools/performance_state_stress.py [rounds] [threads] [triggers_per_thread]
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.performance_state import PerformanceStateMachine, PerformanceState
+
+SOURCES = ['sensor_port_left', 'sensor_port_right', 'network', 'test']
+
+def run_round(machine: PerformanceStateMachine, threads: int, per_thread: int) -> list:
+    """Fire threads * per_thread triggers at once; return the admitted performance ids"""
+    barrier = threading.Barrier(threads)
+    winners = []
+    winners_lock = threading.Lock()
+
+    def fire(source):
+        barrier.wait()
+        for _ in range(per_thread):
+            admitted, snapshot = machine.try_begin(source)
+            if admitted:
+                with winners_lock:
+                    winners.append(snapshot.performance_id)
+
+    workers = [threading.Thread(target=fire, args=(SOURCES[i % len(SOURCES)],)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return winners
+
+def finish_performance(machine: PerformanceStateMachine, performance_id: int, cooldown: float):
+    """Walk the winning performance through the rest of its lifecycle"""
+    assert machine.mark_performing(performance_id, 0.0)
+    assert machine.begin_stop(performance_id)
+    assert machine.finish_stop(performance_id, cooldown)
+    if cooldown:
+        # Triggers during cooldown must all be refused
+        admitted, snapshot = machine.try_begin('network')
+        assert not admitted and snapshot.busy_reason() == 'In cooldown period'
+        assert machine.end_cooldown(performance_id)
+    assert machine.snapshot.state is PerformanceState.IDLE
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    per_thread = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+
+    # Switch threads as often as possible to provoke races
+    sys.setswitchinterval(1e-6)
+
+    machine = PerformanceStateMachine()
+    failures = 0
+    total_triggers = 0
+    for round_number in range(rounds):
+        winners = run_round(machine, threads, per_thread)
+        total_triggers += threads * per_thread
+        if len(winners) != 1:
+            failures += 1
+            print(f"Round {round_number}: {len(winners)} performances admitted ({winners})")
+            continue
+        finish_performance(machine, winners[0], cooldown=60 if round_number % 2 else 0)
+
+    print(f"{rounds} rounds, {total_triggers} triggers, {failures} rounds without exactly one winner")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Trigger Server Benchmark
+========================
+Drives the network trigger endpoint from many concurrent keep-alive clients
+and reports sustained triggers per second and latency percentiles.
+
+By default an in-process TriggerServer is started on a free port with a
+temporary config and an event handler that answers every trigger with
+"Performance already active" (the common case while a show is running), so no
+GPIO or audio is touched. Use --url to benchmark a running Ghost Host instead.
+
+Usage: python tools/trigger_server_bench.py [--clients 100] [--requests 50]
+                                            [--stalled 5] [--url http://host:5055 --trigger ID --token T]
+"""
+
+import argparse
+import http.client
+import json
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.performance_trace import percentile
+
+BENCH_TRIGGER_ID = 'bench-trigger'
+BENCH_SECRET = 'bench-secret'
+
+
+class BusyEventHandler:
+    """Stands in for EventHandler: every trigger finds a performance running"""
+
+    def trigger_network_performance(self, audio_file=None, trigger_time=None):
+        return {'success': False, 'message': 'Performance already active'}
+
+
+def start_local_server():
+    """Start a TriggerServer on a free port; return (host, port, trigger_id, token)"""
+    from src.core.config_manager import ConfigManager
+    from src.core.trigger_server import TriggerServer
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+
+    config_dir = Path(tempfile.mkdtemp(prefix='ghosthost-bench-'))
+    config_file = config_dir / 'config.yaml'
+    config_file.write_text(json.dumps({
+        'audio': {'default_file': 'bench.wav'},
+        # Measure the server itself, not the rate limiter
+        'network_trigger': {'enabled': True, 'port': port, 'rate_limit': {'enabled': False}},
+        'network_triggers': [{'id': BENCH_TRIGGER_ID, 'name': 'bench', 'audio_file': 'bench.wav',
+                              'secret': BENCH_SECRET, 'enabled': True}]
+    }))
+    server = TriggerServer(BusyEventHandler(), ConfigManager(str(config_file)))
+    server.start()
+    return '127.0.0.1', port, BENCH_TRIGGER_ID, BENCH_SECRET
+
+
+def stall(host: str, port: int, stop: threading.Event):
+    """Open a connection, send half a request and go quiet"""
+    try:
+        sock = socket.create_connection((host, port))
+        sock.sendall(b'POST /api/trigger/')
+        stop.wait()
+        sock.close()
+    except OSError:
+        pass
+
+
+def client(host, port, path, headers, count, barrier, latencies, statuses, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    barrier.wait()
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            conn.request('POST', path, body=b'', headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(1)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[4])
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=50, help='requests per client')
+    parser.add_argument('--stalled', type=int, default=5, help='clients that send half a request and hang')
+    parser.add_argument('--url', help='benchmark a running trigger server instead')
+    parser.add_argument('--trigger', help='trigger id (with --url)')
+    parser.add_argument('--token', default='', help='trigger secret (with --url)')
+    args = parser.parse_args()
+
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port, trigger_id, token = parsed.hostname, parsed.port or 5055, args.trigger, args.token
+        if not trigger_id:
+            parser.error('--trigger is required with --url')
+    else:
+        host, port, trigger_id, token = start_local_server()
+
+    path = f'/api/trigger/{trigger_id}/play'
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+    stop_stalling = threading.Event()
+    for _ in range(args.stalled):
+        threading.Thread(target=stall, args=(host, port, stop_stalling), daemon=True).start()
+    time.sleep(0.2)
+
+    latencies, statuses, errors = [], {}, []
+    barrier = threading.Barrier(args.clients + 1)
+    workers = [threading.Thread(target=client, args=(host, port, path, headers, args.requests,
+                                                     barrier, latencies, statuses, errors))
+               for _ in range(args.clients)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    stop_stalling.set()
+
+    ms = [l * 1000 for l in latencies]
+    print(f"{args.clients} clients x {args.requests} requests ({args.stalled} stalled connections) "
+          f"against {host}:{port}")
+    print(f"  completed: {len(latencies)} in {elapsed:.2f}s, errors: {len(errors)}")
+    print(f"  status codes: {dict(sorted(statuses.items()))}")
+    print(f"  throughput: {len(latencies) / elapsed:.0f} triggers/s")
+    if ms:
+        print(f"  latency ms: p50 {percentile(ms, 50):.2f}  p95 {percentile(ms, 95):.2f}  "
+              f"p99 {percentile(ms, 99):.2f}  max {max(ms):.2f}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Web Interface Load Test
+=======================
+Simulates several users refreshing the control panel at once and reports
+page and API latency percentiles per endpoint.
+
+By default the web app is started in-process on a free port with the chosen
+server (`pooled`, the production server, or `development`, Flask's threaded
+development server), and `--slow N` extra clients keep a deliberately slow
+endpoint (2 s per request) busy to show whether other requests stay fast.
+Use --url to load-test a running Ghost Host instead (--slow is ignored).
+
+Usage: python tools/web_load_test.py [--users 20] [--duration 10] [--slow 4]
+                                     [--server pooled|development] [--url http://host:8000]
+"""
+
+import argparse
+import http.client
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.performance_trace import percentile
+
+ENDPOINTS = ['/', '/api/status', '/api/audio/files', '/api/audio/volume',
+             '/api/config/cooldown', '/api/idle_behavior', '/api/network_triggers']
+SLOW_PATH = '/_load_test/slow'
+
+
+def start_local_server(kind: str):
+    """Start the web app on a free port; return (host, port)"""
+    from web_interface.app import app
+
+    def slow():
+        time.sleep(2)
+        return 'ok'
+    app.add_url_rule(SLOW_PATH, 'load_test_slow', slow)
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    if kind == 'pooled':
+        from src.core.config_manager import config
+        from web_interface.server import PooledWSGIServer
+        server = PooledWSGIServer('127.0.0.1', port, app,
+                                  workers=int(config.get('web.workers', 8)),
+                                  backlog=int(config.get('web.backlog', 32)),
+                                  request_timeout=float(config.get('web.request_timeout', 30)))
+    else:
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return '127.0.0.1', port
+
+
+def fetch(host, port, path, timeout=30):
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def user(host, port, paths, stop, results, errors):
+    while not stop.is_set():
+        for path in paths:
+            started = time.perf_counter()
+            try:
+                status = fetch(host, port, path)
+            except (OSError, http.client.HTTPException):
+                errors[path] = errors.get(path, 0) + 1
+                continue
+            results.setdefault(path, []).append((time.perf_counter() - started, status))
+            if stop.is_set():
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[4])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--slow', type=int, default=4, help='clients hammering a 2s endpoint (in-process only)')
+    parser.add_argument('--server', choices=['pooled', 'development'], default='pooled')
+    parser.add_argument('--url', help='load-test a running web interface instead')
+    args = parser.parse_args()
+
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 8000
+        slow = 0
+    else:
+        host, port = start_local_server(args.server)
+        slow = args.slow
+
+    stop = threading.Event()
+    results, errors = {}, {}
+    threads = [threading.Thread(target=user, args=(host, port, ENDPOINTS, stop, results, errors))
+               for _ in range(args.users)]
+    threads += [threading.Thread(target=user, args=(host, port, [SLOW_PATH], stop, results, errors))
+                for _ in range(slow)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    label = args.url or f'{args.server} server'
+    print(f"{args.users} users + {slow} slow clients for {elapsed:.1f}s against {label}")
+    print(f"{'endpoint':<24} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'non-200':>8} {'errors':>7}")
+    total = 0
+    for path in ENDPOINTS + ([SLOW_PATH] if slow else []):
+        samples = results.get(path, [])
+        total += len(samples)
+        ms = [s[0] * 1000 for s in samples]
+        non_ok = sum(1 for s in samples if s[1] != 200)
+        if ms:
+            print(f"{path:<24} {len(ms):>6} {percentile(ms, 50):>8.1f} {percentile(ms, 95):>8.1f} "
+                  f"{percentile(ms, 99):>8.1f} {max(ms):>8.1f} {non_ok:>8} {errors.get(path, 0):>7}")
+        else:
+            print(f"{path:<24} {0:>6} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {0:>8} {errors.get(path, 0):>7}")
+    print(f"throughput: {total / elapsed:.0f} requests/s")
+
+
+if __name__ == '__main__':
+    main()
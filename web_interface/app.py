@@ -1,54 +1,214 @@
 import sys
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_from_directory
-import socket
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, stream_with_context
 import os
 import subprocess
 import logging
+import threading
+import functools
+import time
 
 # Add project root to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.core.config_manager import config
-from src.hardware.audio_controller import AudioController
-from src.network_management.network_manager import NetworkManager
+from src.core.event_bus import bus, sse_stream, EventRelay
+from src.core.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from web_interface.jobs import JobRunner
 from src.network_management.ap_mode_manager import AP_SSID as DEFAULT_AP_SETUP_SSID
-import requests
+from src.network_management.ap_mode_manager import AP_IP_ADDRESS as DEFAULT_AP_IP_CIDR
 import uuid
 
-audio_controller = AudioController(config)
-network_manager = NetworkManager()
+# Controllers are created on first use so the web server starts listening
+# without waiting on them
+_audio_controller = None
+_network_manager = None
+
+def get_audio_controller():
+    global _audio_controller
+    if _audio_controller is None:
+        from src.hardware.audio_controller import AudioController
+        _audio_controller = AudioController(config)
+    return _audio_controller
+
+def get_network_manager():
+    global _network_manager
+    if _network_manager is None:
+        from src.network_management.network_manager import NetworkManager
+        _network_manager = NetworkManager(status_ttl=float(config.get('network.status_ttl', 10)),
+                                          use_monitor=bool(config.get('network.status_monitor', True)),
+                                          scan_min_interval=float(config.get('network.scan_min_interval', 10)),
+                                          scan_stale_after=float(config.get('network.scan_stale_seconds', 30)),
+                                          scan_history=int(config.get('network.scan_history', 20)),
+                                          backend=config.get('network.backend', 'auto'),
+                                          dbus_address=config.get('network.dbus_address', ''),
+                                          connect_timeout=float(config.get('network.connect_timeout', 45)))
+        _network_manager.add_status_listener(lambda _: bus.publish('network', network_status(), changed_only=True))
+        _network_manager.scanner.add_listener(lambda scan: bus.publish('wifi', scan))
+        _network_manager.switcher.add_listener(lambda switch: bus.publish('network_switch', switch))
+    return _network_manager
 
 app = Flask(__name__)
+# Uploads larger than this are refused before they are read
+app.config['MAX_CONTENT_LENGTH'] = int(config.get('web.max_upload_mb', 50)) * 1024 * 1024
+
+# Slow work (timestamp generation) runs here, off the request threads
+jobs = JobRunner()
+
+# --- HTTP CACHING ---
+# Cacheable GETs carry a strong ETag built from what their data depends on:
+# the SoundFiles directory mtime for the library, the config version for
+# settings. A matching If-None-Match gets 304 before the view runs, and a
+# changed-but-already-computed resource is served from the last response.
+
+CACHE_REQUESTS = metrics.counter('ghosthost_http_cache_requests_total',
+                                 'Cacheable web API requests by resource and result', ['resource', 'result'])
+# Config versions restart with the process, so tag ETags with the start time
+_CACHE_EPOCH = format(int(time.time()), 'x')
+_response_cache = {}
+_cached_resources = []
+
+def _cache_hit_ratios():
+    ratios = []
+    for resource in _cached_resources:
+        hits = sum(CACHE_REQUESTS.value(resource=resource, result=r) for r in ('not_modified', 'memo'))
+        total = hits + CACHE_REQUESTS.value(resource=resource, result='computed')
+        ratios.append(({'resource': resource}, hits / total if total else 0.0))
+    return ratios
+
+metrics.gauge('ghosthost_http_cache_hit_ratio', 'Share of cacheable requests answered without recomputing',
+              ['resource'], callback=_cache_hit_ratios)
+
+def config_version():
+    return str(config.version)
+
+def library_version():
+    try:
+        mtime = os.stat(config.snapshot.audio.soundfiles_dir).st_mtime_ns
+    except OSError:
+        mtime = 0
+    # The listing also flags the default clip, which lives in config
+    return f'{mtime}-{config.version}'
+
+def cached(resource, version):
+    """Serve a GET view with a strong ETag from version(); unchanged data is never recomputed"""
+    _cached_resources.append(resource)
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = f'{resource}-{_CACHE_EPOCH}-{version()}'
+            if request.if_none_match.contains_weak(etag):
+                CACHE_REQUESTS.inc(resource=resource, result='not_modified')
+                response = Response(status=304)
+            else:
+                memo = _response_cache.get(resource)
+                if memo and memo[0] == etag:
+                    CACHE_REQUESTS.inc(resource=resource, result='memo')
+                    response = Response(memo[1], mimetype='application/json')
+                else:
+                    CACHE_REQUESTS.inc(resource=resource, result='computed')
+                    response = app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    _response_cache[resource] = (etag, response.get_data())
+            response.set_etag(etag)
+            # Always revalidate; the ETag makes that a cheap 304
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+@app.route('/metrics')
+def metrics_api():
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
 # Configure basic logging for the app if not already present
 if not app.debug:
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- LIVE UPDATES (Server-Sent Events) ---
+# Changes are computed once here and pushed to every open page:
+#   config       volume, default clip, cooldown and idle settings
+#   library      the audio file listing, after uploads, deletes and timestamp runs
+#   network      the /api/status network fields, whenever the cached network state changes
+#   wifi         Wi-Fi scan results, after each background scan
+#   network_switch  progress of a Wi-Fi network switch, stage by stage
+#   performance  relayed from the main process's trigger server
+
+_event_sources_started = False
+_event_sources_lock = threading.Lock()
+
+def publish_config(cfg=config):
+    bus.publish('config', {
+        'volume': cfg.get('audio.volume'),
+        'default_audio_file': cfg.get('audio.default_file', ''),
+        'cooldown_period': cfg.get('sensors.cooldown_period', 30),
+        'idle_behavior': cfg.get_idle_behavior_settings()
+    }, changed_only=True)
+
+config.subscribe(publish_config)
+
+def publish_library():
+    bus.publish('library', audio_library(), changed_only=True)
+
+def start_event_sources():
+    """Start the publishers behind /api/events on the first subscriber"""
+    global _event_sources_started
+    with _event_sources_lock:
+        if _event_sources_started:
+            return
+        _event_sources_started = True
+    # Follow edits saved by the main process too
+    config.start_watching(config.get('config_reload.interval_seconds', 1.0))
+    publish_config()
+    EventRelay(bus, '127.0.0.1', int(config.get('network_trigger.port', 5055)), ('performance',)).start()
+    get_network_manager().start_status_refresh()
+
+@app.route('/api/events')
+def events_api():
+    start_event_sources()
+    # Each open stream holds a thread for as long as the page is open
+    if bus.subscriber_count >= int(config.get('web.max_event_streams', 8)):
+        return jsonify({'error': 'Too many open event streams'}), 503, {'Retry-After': '30'}
+    last_id = request.headers.get('Last-Event-ID', '')
+    subscription = bus.subscribe(last_event_id=int(last_id) if last_id.isdigit() else None)
+    # Library and network are computed on demand, so a first viewer gets them at once
+    if bus.latest('library') is None:
+        publish_library()
+    if bus.latest('network') is None:
+        bus.publish('network', network_status(), changed_only=True)
+    return Response(stream_with_context(sse_stream(subscription)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/')
 def home():
-    is_ap_mode, ap_ssid = network_manager.get_ap_mode_status()
-    return render_template('index.html', is_ap_mode=is_ap_mode, ap_ssid=ap_ssid or DEFAULT_AP_SETUP_SSID)
+    network = get_network_manager().get_status_snapshot()
+    return render_template('index.html', is_ap_mode=network['ap_active'],
+                           ap_ssid=network['ap_ssid'] or DEFAULT_AP_SETUP_SSID)
 
 # --- AUDIO MANAGEMENT API ---
 
-@app.route('/api/audio/files', methods=['GET'])
-def list_audio_files_api():
-    files = audio_controller.list_audio_files()
+def audio_library():
+    files = get_audio_controller().list_audio_files()
     default_file = config.get('audio.default_file', '')
     file_infos = []
     for filename in files:
-        info = audio_controller.get_audio_info(filename)
+        info = get_audio_controller().get_audio_info(filename)
         file_infos.append({
             'filename': filename,
             'is_default': filename == default_file,
             'has_timestamps': info.get('has_timestamps', False) if info else False
         })
-    return jsonify({'files': file_infos, 'default': default_file})
+    return {'files': file_infos, 'default': default_file}
+
+@app.route('/api/audio/files', methods=['GET'])
+@cached('audio_files', library_version)
+def list_audio_files_api():
+    return jsonify(audio_library())
 
 @app.route('/api/audio/info/<path:filename>', methods=['GET'])
 def get_audio_info_api(filename):
-    info = audio_controller.get_audio_info(filename)
+    info = get_audio_controller().get_audio_info(filename)
     if info:
         return jsonify(info)
     return jsonify({'error': 'File not found'}), 404
@@ -68,15 +228,17 @@ def upload_audio_file_api():
 
     file_data = file.read()
     
-    success = audio_controller.upload_audio_file(file_data, filename)
+    success = get_audio_controller().upload_audio_file(file_data, filename)
     if success:
+        publish_library()
         return jsonify({'success': True, 'filename': filename})
     return jsonify({'error': 'Upload failed'}), 500
 
 @app.route('/api/audio/delete/<path:filename>', methods=['DELETE'])
 def delete_audio_file_api(filename):
-    success = audio_controller.delete_audio_file(filename)
+    success = get_audio_controller().delete_audio_file(filename)
     if success:
+        publish_library()
         return jsonify({'success': True})
     return jsonify({'error': 'Delete failed'}), 500
 
@@ -86,26 +248,28 @@ def set_default_audio_api():
     filename = data.get('filename')
     if not filename:
         return jsonify({'error': 'No filename provided'}), 400
-    if filename not in audio_controller.list_audio_files():
+    if filename not in get_audio_controller().list_audio_files():
         return jsonify({'error': 'File not found or invalid'}), 404
 
-    config.set('audio.default_file', filename)
-    config.save_config()
+    with config.transaction():
+        config.set('audio.default_file', filename)
+    publish_library()
     return jsonify({'success': True, 'default': filename})
 
 @app.route('/api/audio/volume', methods=['GET', 'POST'])
 def audio_volume_api():
     if request.method == 'GET':
-        volume = audio_controller.get_volume()
+        volume = get_audio_controller().get_volume()
         return jsonify({'volume': volume})
     else:
         data = request.get_json()
         volume = data.get('volume')
         if volume is None or not isinstance(volume, int) or not (0 <= volume <= 100):
             return jsonify({'error': 'Invalid volume provided (must be int 0-100)'}), 400
-        success = audio_controller.set_volume(int(volume))
+        success = get_audio_controller().set_volume(int(volume))
         if success:
-            config.save_config()
+            # Slider drags send bursts of updates; write once they settle
+            config.schedule_save()
             return jsonify({'success': True, 'volume': int(volume)})
         return jsonify({'error': 'Failed to set volume'}), 500
 
@@ -113,15 +277,19 @@ def audio_volume_api():
 def generate_timestamps_api(filename):
     app.logger.info(f"Received request to generate timestamps for: {filename}")
     safe_filename = os.path.basename(filename)
-    if safe_filename != filename or safe_filename not in audio_controller.list_audio_files():
+    if safe_filename != filename or safe_filename not in get_audio_controller().list_audio_files():
         app.logger.error(f"Timestamp generation rejected for invalid/non-existent file: {filename}")
         return jsonify({'error': 'Invalid or non-existent audio file provided'}), 400
 
+    # The speech-to-text run takes up to two minutes; keep it off the request threads
+    job = jobs.active('timestamps', safe_filename) or \
+        jobs.submit('timestamps', safe_filename, lambda: generate_timestamps(safe_filename))
+    return jsonify({'success': True, 'job': job}), 202
+
+def generate_timestamps(safe_filename):
+    """Run the timestamp script for one clip; returns the job result"""
     script_path = os.path.join(Path(__file__).parent.parent, "tools", "elevenlabs_stt_timestamps.py")
     soundfiles_dir = config.get('audio.soundfiles_dir', 'SoundFiles')
-    audio_file_path_in_soundfiles = os.path.join(soundfiles_dir, safe_filename)
-
-    env = os.environ.copy()
 
     try:
         app.logger.info(f"Executing timestamp script: {sys.executable} {script_path} '{safe_filename}'")
@@ -135,23 +303,31 @@ def generate_timestamps_api(filename):
         expected_json_path = os.path.join(Path(__file__).parent.parent, soundfiles_dir, expected_json_filename)
 
         if os.path.exists(expected_json_path):
-            return jsonify({'success': True, 'message': f'Timestamps generated for {safe_filename}', 'output': process.stdout})
+            publish_library()
+            return {'success': True, 'message': f'Timestamps generated for {safe_filename}', 'output': process.stdout}
         else:
             app.logger.error(f"Timestamp script ran but JSON file not found: {expected_json_path}")
             app.logger.error(f"Script stderr: {process.stderr}")
-            return jsonify({'success': False, 'error': 'Timestamp generation script ran but output file not found.', 'details': process.stderr}), 500
+            return {'success': False, 'error': 'Timestamp generation script ran but output file not found.', 'details': process.stderr}
 
     except subprocess.CalledProcessError as e:
         app.logger.error(f"Timestamp script execution failed for {safe_filename}. Return code: {e.returncode}")
         app.logger.error(f"Stdout: {e.stdout}")
         app.logger.error(f"Stderr: {e.stderr}")
-        return jsonify({'error': 'Timestamp generation script failed.', 'details': e.stderr or e.stdout}), 500
+        return {'success': False, 'error': 'Timestamp generation script failed.', 'details': e.stderr or e.stdout}
     except subprocess.TimeoutExpired:
         app.logger.error(f"Timestamp script timed out for {safe_filename}.")
-        return jsonify({'error': 'Timestamp generation timed out.'}), 500
+        return {'success': False, 'error': 'Timestamp generation timed out.'}
     except Exception as e:
         app.logger.error(f"An unexpected error occurred during timestamp generation for {safe_filename}: {str(e)}")
-        return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
+        return {'success': False, 'error': f'An unexpected error occurred: {str(e)}'}
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_api(job_id):
+    job = jobs.get(job_id)
+    if job:
+        return jsonify(job)
+    return jsonify({'error': 'Job not found'}), 404
 
 # Serve audio files for playback/download
 @app.route('/SoundFiles/<path:filename>')
@@ -160,42 +336,38 @@ def serve_audio_file(filename):
     project_root_soundfiles = os.path.join(app.root_path, '..', audio_dir)
     return send_from_directory(os.path.abspath(project_root_soundfiles), filename)
 
-@app.route('/api/status', methods=['GET'])
-def get_status():
-    status = {}
-    def get_lan_ip():
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.settimeout(0.1)
-            s.connect(('8.8.8.8', 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception as e:
-            app.logger.warning(f"Could not get LAN IP: {e}")
-            return 'Unavailable'
-            
-    status['ip_address'] = get_lan_ip()
-    status['current_network_ssid'] = network_manager.get_current_ssid() or "Not Connected"
-    
-    is_ap_active, ap_mode_ssid = network_manager.get_ap_mode_status()
-    status['ap_mode_active'] = is_ap_active
-    status['ap_mode_ssid'] = ap_mode_ssid if is_ap_active else None
-    if is_ap_active:
+def network_status():
+    """The /api/status fields, from the network manager's cached snapshot"""
+    network = get_network_manager().get_status_snapshot()
+    status = {
+        'ip_address': network['ip_address'] or 'Unavailable',
+        'current_network_ssid': network['ssid'] or "Not Connected",
+        'ap_mode_active': network['ap_active'],
+        'ap_mode_ssid': network['ap_ssid']
+    }
+    if network['ap_active']:
         status['ap_mode_ip'] = DEFAULT_AP_IP_CIDR.split('/')[0]
 
     status['cooldown_period'] = config.get('app.cooldown_period', 30)
     status['default_audio_file'] = config.get('audio.default_file', 'N/A')
+    return status
 
+@app.route('/api/status', methods=['GET'])
+def get_status():
+    status = network_status()
+    status['network_status_age'] = get_network_manager().get_status_snapshot()['age']
     return jsonify(status)
 
 # --- WIFI/NETWORK MANAGEMENT API (using NetworkManager) ---
 
 @app.route('/api/networks', methods=['GET'])
 def list_networks_api():
-    available = network_manager.scan_wifi_networks()
-    saved = network_manager.get_saved_networks()
-    return jsonify({'available_networks': available, 'saved_networks': saved})
+    # Cached scan results; a stale cache (or ?refresh=1) starts a background scan,
+    # whose results arrive as a `wifi` event or on the next request
+    scan = get_network_manager().scanner.snapshot(force=request.args.get('refresh') == '1')
+    saved = get_network_manager().get_saved_networks()
+    return jsonify({'available_networks': scan['networks'], 'saved_networks': saved,
+                    'scan_age': scan['age'], 'scanning': scan['scanning'], 'scan_error': scan['error']})
 
 @app.route('/api/networks/connect', methods=['POST'])
 def connect_network_api():
@@ -205,8 +377,20 @@ def connect_network_api():
     if not ssid_or_uuid:
         return jsonify({'success': False, 'message': 'SSID or UUID required'}), 400
     
-    success, msg = network_manager.connect_network(ssid_or_uuid, password)
-    return jsonify({'success': success, 'message': msg})
+    # The switch runs in the background; follow it at /api/networks/connect/<id>
+    # or as `network_switch` events
+    switch, started = get_network_manager().switcher.start(ssid_or_uuid, password)
+    if not started:
+        return jsonify({'success': False, 'message': f"Already switching to {switch['target']}",
+                        'switch': switch}), 409
+    return jsonify({'success': True, 'message': switch['message'], 'switch': switch}), 202
+
+@app.route('/api/networks/connect/<switch_id>', methods=['GET'])
+def network_switch_status(switch_id):
+    switch = get_network_manager().switcher.get(switch_id)
+    if not switch:
+        return jsonify({'error': 'Unknown switch'}), 404
+    return jsonify(switch)
 
 @app.route('/api/networks/save', methods=['POST'])
 def save_network_api():
@@ -217,7 +401,7 @@ def save_network_api():
     if not ssid or not password:
         return jsonify({'success': False, 'message': 'SSID and password required'}), 400
     
-    success, msg = network_manager.save_network(ssid, password, autoconnect)
+    success, msg = get_network_manager().save_network(ssid, password, autoconnect)
     return jsonify({'success': success, 'message': msg})
 
 @app.route('/api/networks/delete', methods=['POST'])
@@ -227,14 +411,15 @@ def delete_network_api():
     if not name_or_uuid:
         return jsonify({'success': False, 'message': 'Name or UUID required'}), 400
     
-    success, msg = network_manager.delete_network(name_or_uuid)
+    success, msg = get_network_manager().delete_network(name_or_uuid)
     return jsonify({'success': success, 'message': msg})
 
 @app.route('/api/networks/disconnect', methods=['POST'])
 def disconnect_network_api():
     data = request.get_json()
     name_or_uuid = data.get('name_or_uuid', None)
-    success, msg = network_manager.disconnect_network(name_or_uuid)
+    success, msg = get_network_manager().disconnect_network(name_or_uuid)
+    get_network_manager().invalidate_status()
     return jsonify({'success': success, 'message': msg})
 
 # --- SYSTEM COMMANDS ---
@@ -254,6 +439,7 @@ def system_reboot():
         return jsonify({'success': False, 'message': f'An unexpected error occurred: {str(e)}'}), 500
 
 @app.route('/api/config/cooldown', methods=['GET'])
+@cached('cooldown', config_version)
 def get_cooldown_api():
     cooldown = config.get('sensors.cooldown_period', 30)
     return jsonify({'cooldown_period': cooldown})
@@ -264,11 +450,12 @@ def set_cooldown_api():
     cooldown = data.get('cooldown_period')
     if cooldown is None or not isinstance(cooldown, int) or cooldown < 0 or cooldown > 600:
         return jsonify({'error': 'Invalid cooldown value (must be int 0-600 seconds)'}), 400
-    config.set('sensors.cooldown_period', cooldown)
-    config.save_config()
+    with config.transaction():
+        config.set('sensors.cooldown_period', cooldown)
     return jsonify({'success': True, 'cooldown_period': cooldown})
 
 @app.route('/api/idle_behavior', methods=['GET'])
+@cached('idle_behavior', config_version)
 def get_idle_behavior_api():
     settings = config.get_idle_behavior_settings()
     return jsonify(settings)
@@ -286,15 +473,16 @@ def set_idle_behavior_api():
         return jsonify({'error': 'Interval must be 10-3600 seconds'}), 400
     if not isinstance(duration, int) or duration < 1 or duration > 60:
         return jsonify({'error': 'Duration must be 1-60 seconds'}), 400
-    config.set('idle_behavior.enabled', enabled)
-    config.set('idle_behavior.interval_seconds', interval)
-    config.set('idle_behavior.duration_seconds', duration)
-    config.save_config()
+    with config.transaction():
+        config.set('idle_behavior.enabled', enabled)
+        config.set('idle_behavior.interval_seconds', interval)
+        config.set('idle_behavior.duration_seconds', duration)
     return jsonify({'success': True, 'idle_behavior': config.get_idle_behavior_settings()})
 
 # --- NETWORK TRIGGERS MANAGEMENT API ---
 
 @app.route('/api/network_triggers', methods=['GET'])
+@cached('network_triggers', config_version)
 def list_network_triggers():
     triggers = config.get('network_triggers', []) or []
     # Hide secrets in listing; expose presence only
@@ -317,7 +505,7 @@ def create_network_trigger():
     audio_file = data.get('audio_file')
     secret = (data.get('secret') or '').strip()
     enabled = bool(data.get('enabled', True))
-    if not audio_file or audio_file not in audio_controller.list_audio_files():
+    if not audio_file or audio_file not in get_audio_controller().list_audio_files():
         return jsonify({'error': 'Invalid or missing audio_file'}), 400
     new_trigger = {
         'id': str(uuid.uuid4()),
@@ -328,8 +516,8 @@ def create_network_trigger():
     }
     triggers = config.get('network_triggers', []) or []
     triggers.append(new_trigger)
-    config.set('network_triggers', triggers)
-    config.save_config()
+    with config.transaction():
+        config.set('network_triggers', triggers)
     return jsonify({'success': True, 'trigger': {k: v for k, v in new_trigger.items() if k != 'secret'}})
 
 @app.route('/api/network_triggers/<trigger_id>', methods=['PUT'])
@@ -342,7 +530,7 @@ def update_network_trigger(trigger_id):
                 t['name'] = data.get('name') or t.get('name')
             if 'audio_file' in data:
                 af = data.get('audio_file')
-                if af and af in audio_controller.list_audio_files():
+                if af and af in get_audio_controller().list_audio_files():
                     t['audio_file'] = af
                 else:
                     return jsonify({'error': 'Invalid audio_file'}), 400
@@ -350,8 +538,8 @@ def update_network_trigger(trigger_id):
                 t['enabled'] = bool(data.get('enabled'))
             if 'secret' in data:
                 t['secret'] = (data.get('secret') or '').strip()
-            config.set('network_triggers', triggers)
-            config.save_config()
+            with config.transaction():
+                config.set('network_triggers', triggers)
             rt = dict(t)
             rt.pop('secret', None)
             return jsonify({'success': True, 'trigger': rt})
@@ -363,8 +551,8 @@ def delete_network_trigger(trigger_id):
     new_list = [t for t in triggers if str(t.get('id')) != str(trigger_id)]
     if len(new_list) == len(triggers):
         return jsonify({'error': 'Trigger not found'}), 404
-    config.set('network_triggers', new_list)
-    config.save_config()
+    with config.transaction():
+        config.set('network_triggers', new_list)
     return jsonify({'success': True})
 
 @app.route('/api/network_triggers/<trigger_id>/fire', methods=['POST'])
@@ -381,6 +569,7 @@ def fire_network_trigger(trigger_id):
     if secret:
         headers['Authorization'] = f'Bearer {secret}'
     try:
+        import requests
         resp = requests.post(url, headers=headers, timeout=5)
         return jsonify(resp.json()), resp.status_code
     except Exception as e:
@@ -388,6 +577,13 @@ def fire_network_trigger(trigger_id):
         return jsonify({'error': 'Failed to fire trigger'}), 500
 
 if __name__ == '__main__':
-    app.run(host=config.get('web.host', '0.0.0.0'), 
-            port=config.get('web.port', 8000), 
-            debug=config.get('web.debug', True))
+    # ETags follow the config version, so pick up edits saved by other processes
+    config.start_watching(config.get('config_reload.interval_seconds', 1.0))
+    if config.get('web.debug', False):
+        # Flask's development server with the reloader and debugger; never on a show floor
+        app.run(host=config.get('web.host', '0.0.0.0'),
+                port=config.get('web.port', 8000),
+                debug=True)
+    else:
+        from web_interface.server import serve
+        serve(app, config)
@@ -0,0 +1,69 @@
+"""
+Background Jobs for the Web Interface
+=====================================
+Runs slow work (timestamp generation) on a small pool of its own, so the
+request returns at once with a job ID. Job state changes are published on
+the event bus as `job` events, and can also be fetched from /api/jobs/<id>.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from src.core.event_bus import bus
+
+
+class JobRunner:
+    def __init__(self, workers: int = 1, keep: int = 50):
+        self.logger = logging.getLogger(__name__)
+        self.keep = keep
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='web-job')
+
+    def submit(self, kind: str, target: str, fn: Callable[[], dict]) -> dict:
+        """Queue fn; its return dict becomes the job result. Returns the job"""
+        job = {'id': str(uuid.uuid4()), 'kind': kind, 'target': target, 'state': 'queued',
+               'submitted': time.time(), 'result': None}
+        with self._lock:
+            self._jobs[job['id']] = job
+            while len(self._jobs) > self.keep:
+                self._jobs.popitem(last=False)
+        self._publish(job)
+        self._pool.submit(self._run, job, fn)
+        return dict(job)
+
+    def _run(self, job: dict, fn: Callable[[], dict]):
+        self._update(job, state='running', started=time.time())
+        try:
+            result = fn()
+            self._update(job, state='done' if result.get('success') else 'failed', result=result)
+        except Exception as e:
+            self.logger.error(f"Job {job['kind']} for {job['target']} failed: {e}")
+            self._update(job, state='failed', result={'success': False, 'error': str(e)})
+
+    def _update(self, job: dict, **changes):
+        with self._lock:
+            job.update(changes)
+            if job['state'] in ('done', 'failed'):
+                job['finished'] = time.time()
+        self._publish(job)
+
+    def _publish(self, job: dict):
+        bus.publish('job', dict(job))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def active(self, kind: str, target: str) -> Optional[dict]:
+        """A queued or running job for the same work, so repeats don't pile up"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job['kind'] == kind and job['target'] == target and job['state'] in ('queued', 'running'):
+                    return dict(job)
+        return None
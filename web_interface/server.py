@@ -0,0 +1,131 @@
+"""
+Web Interface Server
+====================
+Serves the Flask app from a bounded pool of worker threads instead of
+Flask's development server.
+
+- At most `web.workers` requests run at once; up to `web.backlog` more
+  connections wait for a worker, and anything beyond that is answered
+  immediately with 503 and Retry-After rather than piling up.
+- Each connection gets a socket timeout of `web.request_timeout` seconds, so
+  a stalled client (e.g. an upload that stops mid-body) frees its worker.
+- Connections close after each response (HTTP/1.0), so idle keep-alive
+  connections never hold a worker.
+- Event streams (GET /api/events) last as long as the page is open, so they
+  are handed to their own threads, at most `web.max_event_streams`, and
+  never occupy a pool worker. Any beyond that go through the pool, where the
+  app answers 503 at once.
+"""
+
+import logging
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+BUSY_RESPONSE = (b'HTTP/1.0 503 Service Unavailable\r\n'
+                 b'Retry-After: 1\r\n'
+                 b'Content-Type: text/plain\r\n'
+                 b'Content-Length: 12\r\n\r\n'
+                 b'Server busy\n')
+# Request line prefix of the long-lived requests served off the pool
+EVENT_STREAM_REQUEST = b'GET /api/events'
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    multithread = True
+    # Accept queue in the kernel; the worker backlog is bounded separately
+    request_queue_size = 64
+
+    def __init__(self, host: str, port: int, app, workers: int = 8, backlog: int = 32,
+                 request_timeout: float = 30.0, max_event_streams: int = 8):
+        handler = type('PooledRequestHandler', (WSGIRequestHandler,), {
+            'protocol_version': 'HTTP/1.0',
+            'timeout': request_timeout
+        })
+        super().__init__(host, port, app, handler=handler)
+        self.logger = logging.getLogger(__name__)
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='web')
+        # Running plus waiting requests; acquiring fails when both are full
+        self._slots = threading.BoundedSemaphore(workers + backlog)
+        self.request_timeout = request_timeout
+        self._stream_slots = threading.BoundedSemaphore(max_event_streams)
+        self.rejected = 0
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            self.logger.warning(f"Web server saturated, refusing {client_address[0]}")
+            try:
+                request.sendall(BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        handed_off = False
+        try:
+            handed_off = self._start_event_stream(request, client_address)
+            if not handed_off:
+                self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            if not handed_off:
+                self.shutdown_request(request)
+            self._slots.release()
+
+    def _is_event_stream(self, request) -> bool:
+        """Peek at the request line without consuming it"""
+        request.settimeout(self.request_timeout)
+        try:
+            head = request.recv(len(EVENT_STREAM_REQUEST) + 1, socket.MSG_PEEK | socket.MSG_WAITALL)
+        except OSError:
+            return False
+        return head[:-1] == EVENT_STREAM_REQUEST and head[-1:] in (b' ', b'?')
+
+    def _start_event_stream(self, request, client_address) -> bool:
+        """Serve an event stream on its own thread, freeing this worker; False if
+        the request isn't one or the stream threads are all taken"""
+        if not self._is_event_stream(request) or not self._stream_slots.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._serve_event_stream, args=(request, client_address),
+                         name='web-events', daemon=True).start()
+        return True
+
+    def _serve_event_stream(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._stream_slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+
+def serve(app, config):
+    """Serve app with the settings under `web`; blocks until interrupted"""
+    host = config.get('web.host', '0.0.0.0')
+    port = int(config.get('web.port', 8000))
+    server = PooledWSGIServer(
+        host, port, app,
+        workers=int(config.get('web.workers', 8)),
+        backlog=int(config.get('web.backlog', 32)),
+        request_timeout=float(config.get('web.request_timeout', 30)),
+        max_event_streams=int(config.get('web.max_event_streams', 8))
+    )
+    logging.getLogger(__name__).info(f"Web interface on http://{host}:{port} ({server.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
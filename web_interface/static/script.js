@@ -91,71 +91,73 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         fetch('/api/audio/files')
             .then(res => res.json())
-            .then(data => {
-                if(audioFileList) audioFileList.innerHTML = '';
-                if(selectDefaultAudio) selectDefaultAudio.innerHTML = '';
-                
-                data.files.forEach(fileInfo => {
-                    const { filename, is_default, has_timestamps } = fileInfo;
-                    if (audioFileList) {
-                        const li = document.createElement('li');
-                        li.className = 'list-group-item d-flex justify-content-between align-items-center flex-wrap';
-                        
-                        let fileLabel = filename;
-                        if (is_default) {
-                            fileLabel += ' <span class="badge bg-primary ms-1">Default</span>';
-                        }
-                        
-                        const fileSpan = document.createElement('span');
-                        fileSpan.innerHTML = fileLabel; // Use innerHTML for badges
-
-                        const buttonGroup = document.createElement('div');
-                        buttonGroup.className = 'btn-group mt-1 mt-md-0'; // Responsive margin
-
-                        if (!has_timestamps) {
-                            const generateBtn = document.createElement('button');
-                            generateBtn.className = 'btn btn-sm btn-info me-1 btn-generate-timestamps';
-                            generateBtn.textContent = 'Gen Timestamps';
-                            generateBtn.dataset.filename = filename;
-                            generateBtn.onclick = function() { generateTimestamps(filename); };
-                            buttonGroup.appendChild(generateBtn);
-                        } else {
-                            const timestampsBadge = document.createElement('span');
-                            timestampsBadge.className = 'badge bg-info me-1 align-self-center';
-                            timestampsBadge.textContent = 'Has Timestamps';
-                            buttonGroup.appendChild(timestampsBadge);
-                        }
-
-                        const delBtn = document.createElement('button');
-                        delBtn.className = 'btn btn-sm btn-danger btn-delete-audio';
-                        delBtn.textContent = 'Delete';
-                        delBtn.dataset.filename = filename;
-                        delBtn.onclick = function() { deleteAudioFile(filename); };
-                        buttonGroup.appendChild(delBtn);
-
-                        li.appendChild(fileSpan);
-                        li.appendChild(buttonGroup);
-                        audioFileList.appendChild(li);
-                    }
-
-                    if (selectDefaultAudio) {
-                        const opt = document.createElement('option');
-                        opt.value = filename;
-                        opt.textContent = filename;
-                        if (is_default) opt.selected = true;
-                        selectDefaultAudio.appendChild(opt);
-                    }
-                });
-                if (currentDefaultAudio) {
-                    currentDefaultAudio.textContent = data.default || 'None';
-                }
-            })
+            .then(renderAudioFiles)
             .catch(err => {
                 if(audioFileList) audioFileList.innerHTML = '<li class="list-group-item text-danger">Error loading audio files.</li>';
                 console.error("Error loading audio files:", err);
             });
     }
 
+    function renderAudioFiles(data) {
+        if(audioFileList) audioFileList.innerHTML = '';
+        if(selectDefaultAudio) selectDefaultAudio.innerHTML = '';
+        
+        data.files.forEach(fileInfo => {
+            const { filename, is_default, has_timestamps } = fileInfo;
+            if (audioFileList) {
+                const li = document.createElement('li');
+                li.className = 'list-group-item d-flex justify-content-between align-items-center flex-wrap';
+                
+                let fileLabel = filename;
+                if (is_default) {
+                    fileLabel += ' <span class="badge bg-primary ms-1">Default</span>';
+                }
+                
+                const fileSpan = document.createElement('span');
+                fileSpan.innerHTML = fileLabel; // Use innerHTML for badges
+
+                const buttonGroup = document.createElement('div');
+                buttonGroup.className = 'btn-group mt-1 mt-md-0'; // Responsive margin
+
+                if (!has_timestamps) {
+                    const generateBtn = document.createElement('button');
+                    generateBtn.className = 'btn btn-sm btn-info me-1 btn-generate-timestamps';
+                    generateBtn.textContent = 'Gen Timestamps';
+                    generateBtn.dataset.filename = filename;
+                    generateBtn.onclick = function() { generateTimestamps(filename); };
+                    buttonGroup.appendChild(generateBtn);
+                } else {
+                    const timestampsBadge = document.createElement('span');
+                    timestampsBadge.className = 'badge bg-info me-1 align-self-center';
+                    timestampsBadge.textContent = 'Has Timestamps';
+                    buttonGroup.appendChild(timestampsBadge);
+                }
+
+                const delBtn = document.createElement('button');
+                delBtn.className = 'btn btn-sm btn-danger btn-delete-audio';
+                delBtn.textContent = 'Delete';
+                delBtn.dataset.filename = filename;
+                delBtn.onclick = function() { deleteAudioFile(filename); };
+                buttonGroup.appendChild(delBtn);
+
+                li.appendChild(fileSpan);
+                li.appendChild(buttonGroup);
+                audioFileList.appendChild(li);
+            }
+
+            if (selectDefaultAudio) {
+                const opt = document.createElement('option');
+                opt.value = filename;
+                opt.textContent = filename;
+                if (is_default) opt.selected = true;
+                selectDefaultAudio.appendChild(opt);
+            }
+        });
+        if (currentDefaultAudio) {
+            currentDefaultAudio.textContent = data.default || 'None';
+        }
+    }
+
     // Set default audio file
     btnSetDefaultAudio.addEventListener('click', function() {
         const filename = selectDefaultAudio.value;
@@ -266,6 +268,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const inputAvailablePassword = document.getElementById('input-available-password');
     const btnConnectAvailable = document.getElementById('btn-connect-available');
     const selectSavedNetworks = document.getElementById('select-saved-networks');
+    const wifiScanAge = document.getElementById('wifi-scan-age');
     const btnConnectSaved = document.getElementById('btn-connect-saved');
     const btnDisconnectNetwork = document.getElementById('btn-disconnect-network');
     const btnDeleteSaved = document.getElementById('btn-delete-saved');
@@ -326,24 +329,41 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    async function loadWiFiNetworks() {
+    function renderAvailableNetworks(networks, scanAge, scanning) {
+        if (!selectAvailableNetworks) return;
+        const selected = selectAvailableNetworks.value;
+        selectAvailableNetworks.innerHTML = '<option value="">Select an available network...</option>';
+        if (networks && networks.length > 0) {
+            networks.forEach(net => {
+                const opt = document.createElement('option');
+                opt.value = net.ssid;
+                opt.textContent = `${net.ssid} (${net.signal}%, ${net.security || 'Open'})`;
+                if (net.history && net.history.length > 1) {
+                    opt.title = `Signal over recent scans: ${net.history.join(', ')}%`;
+                }
+                selectAvailableNetworks.appendChild(opt);
+            });
+            if (networks.some(net => net.ssid === selected)) selectAvailableNetworks.value = selected;
+        } else {
+            selectAvailableNetworks.innerHTML = scanning
+                ? '<option value="">Scanning...</option>'
+                : '<option value="">No networks found, try refresh.</option>';
+        }
+        if (wifiScanAge) {
+            if (scanning) wifiScanAge.textContent = 'Scanning...';
+            else if (scanAge !== null && scanAge !== undefined) wifiScanAge.textContent = `Scanned ${Math.round(scanAge)}s ago`;
+            else wifiScanAge.textContent = '';
+        }
+    }
+
+    async function loadWiFiNetworks(refresh = false) {
         try {
-            const response = await fetch('/api/networks');
+            const response = await fetch(refresh === true ? '/api/networks?refresh=1' : '/api/networks');
             const data = await response.json();
 
-            if (selectAvailableNetworks) {
-                selectAvailableNetworks.innerHTML = '<option value="">Select an available network...</option>';
-                if (data.available_networks && data.available_networks.length > 0) {
-                    data.available_networks.forEach(net => {
-                        const opt = document.createElement('option');
-                        opt.value = net.ssid;
-                        opt.textContent = `${net.ssid} (${net.signal}%, ${net.security || 'Open'})`;
-                        selectAvailableNetworks.appendChild(opt);
-                    });
-                } else {
-                    selectAvailableNetworks.innerHTML = '<option value="">No networks found, try refresh.</option>';
-                }
-            }
+            renderAvailableNetworks(data.available_networks, data.scan_age, data.scanning);
+            // Without live updates, pick up the background scan's results ourselves
+            if (data.scanning && !window.EventSource) setTimeout(loadWiFiNetworks, 5000);
 
             if (selectSavedNetworks && !IS_AP_MODE) { // Only populate if not in AP mode
                 selectSavedNetworks.innerHTML = '<option value="">Select a saved network...</option>';
@@ -366,7 +386,36 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    btnRefreshWifiLists.addEventListener('click', loadWiFiNetworks);
+    btnRefreshWifiLists.addEventListener('click', () => loadWiFiNetworks(true));
+
+    const SWITCH_STAGES = {
+        checking: 'Checking current connection...',
+        scanning: 'Scanning for the network...',
+        leaving_ap: 'Turning off setup hotspot...',
+        activating: 'Connecting...',
+        confirming: 'Waiting for the connection to come up...',
+        restoring: 'Connection failed, restoring the previous network...'
+    };
+
+    // Follow a background network switch until it connects or fails
+    function waitForSwitch(sw) {
+        return new Promise((resolve, reject) => {
+            const check = () => {
+                fetch(`/api/networks/connect/${sw.id}`)
+                    .then(res => res.json())
+                    .then(current => {
+                        if (current.state !== 'running') {
+                            resolve({ success: current.state === 'connected', message: current.message });
+                        } else {
+                            displayWifiMessage(SWITCH_STAGES[current.stage] || current.message, false);
+                            setTimeout(check, 1000);
+                        }
+                    })
+                    .catch(reject);
+            };
+            setTimeout(check, 500);
+        });
+    }
 
     async function handleNetworkConnection(endpoint, payload) {
         displayWifiMessage('Processing network request...', false);
@@ -376,7 +425,11 @@ document.addEventListener('DOMContentLoaded', function() {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify(payload)
             });
-            const result = await response.json();
+            let result = await response.json();
+            // In AP mode the hotspot goes down mid-switch, so there is nothing to follow
+            if (response.status === 202 && result.switch && !IS_AP_MODE) {
+                result = await waitForSwitch(result.switch);
+            }
             if (result.success) {
                 displayWifiMessage(result.message || 'Network operation successful!', false);
                 // If AP mode was active and we just connected, the page might reload or redirect
@@ -576,6 +629,22 @@ document.addEventListener('DOMContentLoaded', function() {
     // Call loadIdleBehavior on page load
     loadIdleBehavior();
 
+    // Slow work runs as a background job on the server; resolve with its result
+    function waitForJob(job) {
+        return new Promise((resolve, reject) => {
+            const check = () => {
+                fetch(`/api/jobs/${job.id}`)
+                    .then(res => res.json())
+                    .then(current => {
+                        if (current.state === 'done' || current.state === 'failed') resolve(current.result);
+                        else setTimeout(check, 2000);
+                    })
+                    .catch(reject);
+            };
+            setTimeout(check, 1000);
+        });
+    }
+
     function generateTimestamps(filename) {
         console.log("generateTimestamps called for:", filename);
         if (!filename) return;
@@ -603,6 +672,7 @@ document.addEventListener('DOMContentLoaded', function() {
             }
             return res.json();
         })
+        .then(data => waitForJob(data.job))
         .then(data => {
             if (data.success) {
                 if (statusElement) displayMessage(statusElement, `Timestamps generated for ${filename}. Output: ${data.output || ''}`, true);
@@ -805,4 +875,59 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Load triggers on page load
     loadTriggers();
+
+    // --- LIVE UPDATES ---
+    // The server pushes changes over /api/events; poll only while that is unavailable
+    const statusPerformance = document.getElementById('status-performance');
+    let pollTimer = null;
+
+    function startPolling() {
+        if (pollTimer) return;
+        pollTimer = setInterval(() => { loadStatus(); loadVolume(); }, 10000);
+    }
+
+    function stopPolling() {
+        if (pollTimer) { clearInterval(pollTimer); pollTimer = null; }
+    }
+
+    function updatePerformanceUI(data) {
+        if (!statusPerformance) return;
+        let text = data.state.charAt(0).toUpperCase() + data.state.slice(1);
+        if (data.state === 'performing' && data.audio_file) text += ` ${data.audio_file} (${data.source})`;
+        if (data.state === 'cooldown' && data.cooldown_seconds) text += ` for ${Math.round(data.cooldown_seconds)}s`;
+        statusPerformance.textContent = text;
+        statusPerformance.className = data.state === 'idle' ? 'text-muted' : 'text-success';
+    }
+
+    if (window.EventSource) {
+        const events = new EventSource('/api/events');
+        events.addEventListener('open', stopPolling);
+        // EventSource reconnects on its own; keep the page fresh meanwhile
+        events.addEventListener('error', startPolling);
+        events.addEventListener('network', e => updateStatusUI(JSON.parse(e.data)));
+        events.addEventListener('wifi', e => {
+            const scan = JSON.parse(e.data);
+            renderAvailableNetworks(scan.networks, scan.age, scan.scanning);
+        });
+        events.addEventListener('performance', e => updatePerformanceUI(JSON.parse(e.data)));
+        events.addEventListener('library', e => {
+            if (!IS_AP_MODE) { renderAudioFiles(JSON.parse(e.data)); loadTriggers(); }
+        });
+        events.addEventListener('config', e => {
+            const data = JSON.parse(e.data);
+            if (data.volume !== null && data.volume !== undefined) {
+                if (audioVolumeSlider && document.activeElement !== audioVolumeSlider) audioVolumeSlider.value = data.volume;
+                if (audioVolumeValue && document.activeElement !== audioVolumeSlider) audioVolumeValue.textContent = data.volume;
+                if (currentVolumeSpan) currentVolumeSpan.textContent = data.volume + '%';
+            }
+            if (currentDefaultAudio) currentDefaultAudio.textContent = data.default_audio_file || 'None';
+            if (cooldownInput && document.activeElement !== cooldownInput) cooldownInput.value = data.cooldown_period;
+            const idle = data.idle_behavior || {};
+            if (idleEnabled) idleEnabled.checked = !!idle.enabled;
+            if (idleInterval && document.activeElement !== idleInterval) idleInterval.value = idle.interval_seconds;
+            if (idleDuration && document.activeElement !== idleDuration) idleDuration.value = idle.duration_seconds;
+        });
+    } else {
+        startPolling();
+    }
 }); 
\ No newline at end of file